@@ -0,0 +1 @@
+# Benchmarks package - standalone performance scripts, run from backend/ with `python -m benchmarks.<name>`
@@ -0,0 +1,65 @@
+"""Wall-clock comparison of sequential vs concurrent lesson plan day generation.
+
+Uses a fake LlmChat with a fixed latency, so no LLM key or database is needed.
+All days belong to one teacher, so the scheduler's per-teacher cap
+(LLM_PER_USER_CONCURRENCY, 4 by default) bounds the speedup: concurrency
+above it stays flat. `--per-user-cap` sets the cap for the run.
+
+Usage (from backend/):
+    python -m benchmarks.concurrent_generation [--days 10] [--latency 0.2] [--per-user-cap 4]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fakes import install_fake_llm
+
+FakeLlmChat = install_fake_llm()
+
+import utils.llm as llm  # noqa: E402
+from models.lesson_plan import LessonPlanCreate  # noqa: E402
+from utils.helpers import get_weekdays_between  # noqa: E402
+from utils.lesson_generation import generate_daily_plans  # noqa: E402
+from utils.llm_scheduler import LlmScheduler, LLM_MAX_CONCURRENCY, LLM_PER_USER_CONCURRENCY  # noqa: E402
+
+
+async def time_generation(plan_data, weekdays, concurrency: int) -> float:
+    start = time.perf_counter()
+    await generate_daily_plans(plan_data, weekdays, "benchmark_user", concurrency=concurrency)
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=10, help='number of weekdays in the plan')
+    parser.add_argument('--latency', type=float, default=0.2, help='fake LLM latency per call, in seconds')
+    parser.add_argument('--per-user-cap', type=int, default=LLM_PER_USER_CONCURRENCY,
+                        help='LLM calls one teacher may have in flight (LLM_PER_USER_CONCURRENCY)')
+    args = parser.parse_args()
+
+    FakeLlmChat.latency = args.latency
+    llm.llm_scheduler = LlmScheduler(max_concurrency=max(LLM_MAX_CONCURRENCY, args.days), per_user_concurrency=args.per_user_cap)
+
+    # Two school weeks starting on a Monday covers 10 weekdays; extend as needed
+    weekdays = get_weekdays_between("2025-01-06", "2026-12-31")[:args.days]
+    plan_data = LessonPlanCreate(
+        textbook="Life Science",
+        start_date=weekdays[0]['date'],
+        end_date=weekdays[-1]['date'],
+        lesson_range="Chapter 1, Lessons 1-4",
+        next_major_assessment="Chapter 1 Test",
+        state_standards="7.L.1"
+    )
+
+    print(f"{args.days} days, {args.latency * 1000:.0f} ms per LLM call, "
+          f"per-teacher LLM cap {args.per_user_cap} (concurrency above it runs no faster)")
+    print(f"{'concurrency':>12} {'seconds':>10} {'speedup':>10}")
+    baseline = None
+    for concurrency in (1, 2, 4, 8, args.days):
+        elapsed = await time_generation(plan_data, weekdays, concurrency)
+        baseline = baseline or elapsed
+        print(f"{concurrency:>12} {elapsed:>10.2f} {baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
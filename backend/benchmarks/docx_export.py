@@ -0,0 +1,108 @@
+"""Event loop responsiveness while DOCX exports are rendering.
+
+Starts `--exports` concurrent exports of a `--days`-day plan and, alongside
+them, a stream of tiny "other requests" due every `--interval` seconds. How
+late each one runs shows how long the event loop was blocked. Rendering inline (the old export handler) stalls them
+for the whole export; rendering in DocxExporter's pool keeps them fast.
+
+Usage (from backend/):
+    python -m benchmarks.docx_export [--days 90] [--exports 4] [--workers 4]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import fakes  # noqa: F401  (sets the env that importing utils needs)
+from utils.docx_export import DocxExporter, render_lesson_plan_docx
+
+SECTION_FIELDS = [
+    'learner_outcomes', 'standards', 'materials_needed', 'anticipatory_set', 'teaching_lesson',
+    'modeling', 'instructional_strategies', 'check_understanding', 'guided_practice',
+    'independent_practice', 'closure', 'summative_assessment', 'formative_assessment',
+    'extended_activities', 'review_reteach', 'early_finishers'
+]
+
+
+def make_plan(days: int) -> dict:
+    return {
+        'id': 'benchmark-plan',
+        'textbook': 'Life Science',
+        'lesson_range': 'Chapters 1-12',
+        'start_date': '2025-01-06',
+        'end_date': '2025-06-06',
+        'next_major_assessment': 'Semester exam',
+        'daily_plans': [
+            {
+                'day_name': 'Monday',
+                'day_date': f"day-{idx + 1}",
+                **{field: f"{field.replace('_', ' ').capitalize()} for day {idx + 1}. " * 6 for field in SECTION_FIELDS}
+            }
+            for idx in range(days)
+        ]
+    }
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def probe(stop: asyncio.Event, interval: float, latencies: list):
+    """A small request every `interval`: how late the loop got to it"""
+    while not stop.is_set():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        latencies.append(time.perf_counter() - due)
+
+
+async def run(render, exports: int, interval: float) -> dict:
+    stop = asyncio.Event()
+    latencies = []
+    prober = asyncio.create_task(probe(stop, interval, latencies))
+    await asyncio.sleep(interval)
+
+    start = time.perf_counter()
+    files = await asyncio.gather(*(render() for _ in range(exports)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await prober
+
+    for file in files:
+        file.close()
+    return {'elapsed': elapsed, 'latencies': latencies}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=90, help='days in the exported plan')
+    parser.add_argument('--exports', type=int, default=4, help='concurrent exports')
+    parser.add_argument('--workers', type=int, default=4, help='export pool size')
+    parser.add_argument('--interval', type=float, default=0.005, help='seconds between probe requests')
+    args = parser.parse_args()
+
+    plan = make_plan(args.days)
+    print(f"{args.exports} concurrent exports of a {args.days}-day plan, probe every {args.interval * 1000:.0f} ms")
+    print(f"{'mode':>10} {'export s':>9} {'requests':>9} {'p50 late ms':>12} {'p99 late ms':>12} {'max late ms':>12}")
+
+    async def inline():
+        return render_lesson_plan_docx(plan)
+
+    modes = [('inline', inline, None)]
+    for kind in ('thread', 'process'):
+        exporter = DocxExporter(executor=kind, workers=args.workers)
+        modes.append((kind, lambda exporter=exporter: exporter.render(plan), exporter))
+
+    for label, render, exporter in modes:
+        if exporter is not None:
+            # Start the pool (process workers import python-docx) before timing
+            (await exporter.render(make_plan(1))).close()
+        result = await run(render, args.exports, args.interval)
+        latencies = result['latencies']
+        print(f"{label:>10} {result['elapsed']:>9.2f} {len(latencies):>9} "
+              + ' '.join(f"{value * 1000:>12.1f}" for value in (percentile(latencies, 0.5), percentile(latencies, 0.99), max(latencies))))
+        if exporter is not None:
+            exporter.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
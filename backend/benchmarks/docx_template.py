@@ -0,0 +1,111 @@
+"""Template-based DOCX rendering vs building each document from scratch.
+
+Compares utils.docx_export (prototype paragraphs cloned from a template
+loaded once) against the original export code, which called add_heading /
+add_paragraph for every element and bolded headings marked with '**'.
+Documents per second are measured for 5-, 20- and 90-day plans; that both
+renderers produce the same paragraphs is covered by tests/test_docx_export.py.
+
+Usage (from backend/):
+    python -m benchmarks.docx_template [--days 5 20 90] [--seconds 2]
+"""
+import argparse
+import io
+import time
+
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+
+from benchmarks.docx_export import make_plan
+from utils.docx_export import render_lesson_plan_docx, get_docx_template
+
+
+def legacy_build_document(plan: dict) -> Document:
+    """The original export handler's document builder, kept verbatim as the reference"""
+    doc = Document()
+
+    # Title
+    title = doc.add_heading('Lesson Plan', 0)
+    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+
+    # Basic info
+    doc.add_paragraph(f"Textbook: {plan['textbook']}")
+    doc.add_paragraph(f"Lesson Range: {plan['lesson_range']}")
+    doc.add_paragraph(f"Date Range: {plan['start_date']} to {plan['end_date']}")
+    doc.add_paragraph(f"Next Major Assessment: {plan['next_major_assessment']}")
+    doc.add_paragraph('')
+
+    # Daily plans
+    for day_plan in plan.get('daily_plans', []):
+        doc.add_heading(f"{day_plan['day_name']} - {day_plan['day_date']}", level=1)
+
+        sections = [
+            ('Learner Outcomes/Objectives', day_plan.get('learner_outcomes', '')),
+            ('Standards', day_plan.get('standards', '')),
+            ('Materials Needed', day_plan.get('materials_needed', '')),
+            ('Anticipatory Set', day_plan.get('anticipatory_set', '')),
+            ('Teaching the Lesson', day_plan.get('teaching_lesson', '')),
+            ('Modeling', day_plan.get('modeling', '')),
+            ('Instructional Strategies', day_plan.get('instructional_strategies', '')),
+            ('Check for Understanding', day_plan.get('check_understanding', '')),
+            ('Guided Practice/Monitoring', day_plan.get('guided_practice', '')),
+            ('Independent Practice', day_plan.get('independent_practice', '')),
+            ('Closure', day_plan.get('closure', '')),
+            ('Summative Assessment', day_plan.get('summative_assessment', '')),
+            ('Formative Assessment', day_plan.get('formative_assessment', '')),
+            ('**Extended Activities**', day_plan.get('extended_activities', '')),
+            ('**Review and Reteach Activities**', day_plan.get('review_reteach', '')),
+            ('**Early Finishers Activities**', day_plan.get('early_finishers', ''))
+        ]
+
+        for section_title, section_content in sections:
+            heading = doc.add_heading(section_title, level=2)
+            if '**' in section_title:
+                heading.runs[0].bold = True
+            doc.add_paragraph(section_content or 'N/A')
+
+        doc.add_page_break()
+
+    return doc
+
+
+def legacy_render(plan: dict) -> io.BytesIO:
+    file_stream = io.BytesIO()
+    legacy_build_document(plan).save(file_stream)
+    file_stream.seek(0)
+    return file_stream
+
+
+def documents_per_second(render, plan: dict, seconds: float) -> float:
+    count = 0
+    start = time.perf_counter()
+    while True:
+        result = render(plan)
+        result.close()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= seconds:
+            return count / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, nargs='+', default=[5, 20, 90], help='plan lengths to render')
+    parser.add_argument('--seconds', type=float, default=2, help='time spent rendering each case')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    get_docx_template()
+    print(f"template loaded once in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print()
+    print(f"{'days':>6} {'original docs/s':>16} {'template docs/s':>16} {'speedup':>8}")
+    for days in args.days:
+        plan = make_plan(days)
+        legacy = documents_per_second(legacy_render, plan, args.seconds)
+        current = documents_per_second(render_lesson_plan_docx, plan, args.seconds)
+        print(f"{days:>6} {legacy:>16.1f} {current:>16.1f} {current / legacy:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Fake stand-ins used by the benchmarks so they run without a database or LLM key"""
+import asyncio
+import os
+import sys
+import types
+
+# utils.database builds a Motor client on import; it never connects unless queried
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'lesson_plan_benchmarks')
+# Benchmarks repeat identical prompts, so the LLM response cache would hide the work being timed
+os.environ.setdefault('LLM_CACHE_ENABLED', 'false')
+
+SAMPLE_DAY_RESPONSE = """## 1. Learner Outcomes/Objectives
+- Students will identify the parts of a cell
+- Students will compare plant and animal cells
+
+## 2. Standards
+- 7.L.1: Cells are the basic unit of life
+
+## 3. Materials Needed
+Microscopes, prepared slides, worksheets
+
+## 4. Anticipatory Set
+Show a zoomed-in photo of onion skin and ask what it is.
+
+## 5. Teaching the Lesson
+Walk through the cell diagram and label each organelle.
+
+## 6. Modeling
+Teacher labels a slide under the document camera.
+
+## 7. Instructional Strategies
+Think-pair-share, graphic organizers
+
+## 8. Check for Understanding
+Thumbs up / thumbs down on organelle functions.
+
+## 9. Guided Practice/Monitoring
+Pairs label a blank diagram while the teacher circulates.
+
+## 10. Independent Practice
+Students draw and label their own cell.
+
+## 11. Closure
+Exit ticket: name two differences between plant and animal cells.
+
+## 12. Summative Assessment
+Not applicable today.
+
+## 13. Formative Assessment
+Exit ticket review.
+
+## 14. Extended Activities
+Build a 3D cell model at home.
+
+## 15. Review and Reteach Activities
+Small group review of organelle vocabulary.
+
+## 16. Early Finishers Activities
+Cell crossword puzzle.
+"""
+
+
+class UserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeLlmChat:
+    """Mimics emergentintegrations' LlmChat with a fixed response latency"""
+    latency = 0.2
+    response = SAMPLE_DAY_RESPONSE
+    calls = 0
+
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider, model):
+        return self
+
+    async def send_message(self, message):
+        type(self).calls += 1
+        await asyncio.sleep(type(self).latency)
+        return type(self).response
+
+
+def install_fake_llm(latency: float = 0.2):
+    """Register FakeLlmChat as emergentintegrations.llm.chat (imported lazily by the emergent backend)"""
+    FakeLlmChat.latency = latency
+    FakeLlmChat.calls = 0
+
+    chat_module = types.ModuleType('emergentintegrations.llm.chat')
+    chat_module.LlmChat = FakeLlmChat
+    chat_module.UserMessage = UserMessage
+
+    sys.modules.setdefault('emergentintegrations', types.ModuleType('emergentintegrations'))
+    sys.modules.setdefault('emergentintegrations.llm', types.ModuleType('emergentintegrations.llm'))
+    sys.modules['emergentintegrations.llm.chat'] = chat_module
+
+    return FakeLlmChat
@@ -0,0 +1,78 @@
+"""Latency seen by a small request while another teacher runs a large one.
+
+Teacher A generates a long lesson plan (`--big` calls) and, a moment later,
+teacher B asks for a few quiz questions (`--small` calls). Both go through the
+same global cap. With a plain FIFO semaphore B waits behind all of A's calls;
+with LlmScheduler the slots alternate between the two teachers.
+
+Usage (from backend/):
+    python -m benchmarks.llm_fairness [--big 20] [--small 3] [--cap 4] [--latency 0.1]
+"""
+import argparse
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from benchmarks.fakes import install_fake_llm
+
+install_fake_llm()
+
+from utils.llm_scheduler import LlmScheduler  # noqa: E402
+
+
+class FifoLimiter:
+    """Global cap only: first come, first served"""
+
+    def __init__(self, cap: int):
+        self.semaphore = asyncio.Semaphore(cap)
+
+    @asynccontextmanager
+    async def slot(self, user_id: str = None):
+        async with self.semaphore:
+            yield
+
+
+async def fake_call(limiter, user_id: str, latency: float):
+    async with limiter.slot(user_id):
+        await asyncio.sleep(latency)
+
+
+async def run_workload(limiter, args) -> dict:
+    async def teacher(user_id: str, calls: int, delay: float) -> float:
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await asyncio.gather(*(fake_call(limiter, user_id, args.latency) for _ in range(calls)))
+        return time.perf_counter() - start
+
+    big, small = await asyncio.gather(
+        teacher("teacher_a", args.big, 0),
+        teacher("teacher_b", args.small, args.latency / 10)
+    )
+    return {'big': big, 'small': small}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--big', type=int, default=20, help="LLM calls in teacher A's request")
+    parser.add_argument('--small', type=int, default=3, help="LLM calls in teacher B's request")
+    parser.add_argument('--cap', type=int, default=4, help='global LLM concurrency')
+    parser.add_argument('--latency', type=float, default=0.1, help='fake LLM latency per call, in seconds')
+    args = parser.parse_args()
+
+    print(f"teacher A: {args.big} calls, teacher B: {args.small} calls, cap {args.cap}, {args.latency * 1000:.0f} ms per call")
+    print(f"{'limiter':>12} {'A seconds':>10} {'B seconds':>10}")
+
+    fifo = await run_workload(FifoLimiter(args.cap), args)
+    print(f"{'fifo':>12} {fifo['big']:>10.2f} {fifo['small']:>10.2f}")
+
+    scheduler = LlmScheduler(max_concurrency=args.cap, per_user_concurrency=args.cap)
+    fair = await run_workload(scheduler, args)
+    print(f"{'scheduler':>12} {fair['big']:>10.2f} {fair['small']:>10.2f}")
+
+    stats = scheduler.get_stats()
+    print(f"teacher B finished {fifo['small'] / fair['small']:.1f}x sooner; "
+          f"max queue depth {stats['max_queue_depth']}, max wait {stats['max_wait_seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""Deadlines, retries and hedging in utils/llm_resilience.py against a fake provider.
+
+The fake provider answers in `--latency` seconds, except for a `--tail`
+fraction of calls that take `--tail-latency`, and a `--failure-rate`
+fraction that raise. The script sends `--calls` requests with and without
+hedging and prints the latency percentiles of each. The policy's behaviour
+(deadline, retry, give-up, hedge) is covered by tests/test_llm_resilience.py.
+
+Usage (from backend/):
+    python -m benchmarks.llm_resilience [--calls 300] [--tail 0.03] [--tail-latency 1.0]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.fakes import install_fake_llm
+
+install_fake_llm()
+
+from utils.llm_metrics import LlmMetrics  # noqa: E402
+from utils.llm_resilience import LlmCallPolicy, call_with_policy  # noqa: E402
+
+
+class FakeProvider:
+    """Provider stand-in with injected latency and failures"""
+
+    def __init__(self, latency: float, tail: float = 0, tail_latency: float = 0, failure_rate: float = 0, seed: int = 7):
+        self.latency = latency
+        self.tail = tail
+        self.tail_latency = tail_latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.script = []  # optional per-call (delay, fail) overrides, consumed in order
+
+    async def send(self):
+        self.calls += 1
+        if self.script:
+            delay, fail = self.script.pop(0)
+        else:
+            delay = self.tail_latency if self.random.random() < self.tail else self.latency
+            fail = self.random.random() < self.failure_rate
+        await asyncio.sleep(delay)
+        if fail:
+            raise ConnectionError("injected provider failure")
+        return "ok"
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def run_load(provider: FakeProvider, policy: LlmCallPolicy, metrics: LlmMetrics, calls: int, concurrency: int, hedge: bool) -> list:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    def on_attempt(seconds, wait_seconds, response, error):
+        metrics.record_call('benchmark', seconds, wait_seconds, 'prompt', response, error)
+
+    async def one():
+        async with semaphore:
+            hedge_delay = None
+            if hedge:
+                hedge_delay = policy.hedge_delay(metrics.percentile('benchmark', policy.hedge_percentile, policy.hedge_min_samples))
+            start = time.perf_counter()
+            await call_with_policy(provider.send, policy, hedge_delay=hedge_delay, on_attempt=on_attempt)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=300, help='requests per run')
+    parser.add_argument('--concurrency', type=int, default=20, help='requests in flight at once')
+    parser.add_argument('--latency', type=float, default=0.05, help='normal provider latency, in seconds')
+    parser.add_argument('--tail', type=float, default=0.03, help='fraction of calls that hit the slow tail')
+    parser.add_argument('--tail-latency', type=float, default=1.0, help='latency of a tail call, in seconds')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fraction of calls that raise (retried)')
+    args = parser.parse_args()
+
+    print(f"{args.calls} calls, concurrency {args.concurrency}, {args.latency * 1000:.0f} ms normally, "
+          f"{args.tail:.0%} at {args.tail_latency * 1000:.0f} ms")
+    print(f"{'mode':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'provider calls':>15}")
+
+    for hedge in (False, True):
+        provider = FakeProvider(args.latency, args.tail, args.tail_latency, args.failure_rate)
+        policy = LlmCallPolicy(timeout=30, max_retries=2, base_delay=0.01, max_delay=0.1, hedge=hedge, hedge_min_samples=20, hedge_min_delay=0.01)
+        metrics = LlmMetrics()
+        # Warm-up so the hedge delay has a p95 to work from
+        await run_load(provider, policy, metrics, 50, args.concurrency, hedge=False)
+        provider.calls = 0
+
+        latencies = await run_load(provider, policy, metrics, args.calls, args.concurrency, hedge)
+        print(f"{'hedged' if hedge else 'plain':>10} "
+              + ' '.join(f"{percentile(latencies, q) * 1000:>8.0f}" for q in (0.5, 0.95, 0.99))
+              + f" {max(latencies) * 1000:>8.0f} {provider.calls:>15}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
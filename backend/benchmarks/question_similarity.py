@@ -0,0 +1,179 @@
+"""MinHash LSH near-duplicate lookups vs comparing every pair, at question bank scale.
+
+Builds a synthetic bank of `--questions` random questions (wording plus four
+options), with `--planted` near-duplicates derived from bank questions by
+one small edit each: a word replaced, inserted or dropped, punctuation and
+case changed, or the options shuffled. Then:
+1. The bank is indexed in bulk, and `--inserts` more questions are added one
+   at a time the way add_to_question_bank does (duplicate check, then add).
+2. Each planted variant is looked up with the LSH index, with a scan of all
+   signatures, and (for a sample) with exact shingle Jaccard against every
+   question, the pairwise approach the index replaces.
+3. Recall: how many variants find their source as a duplicate (estimated
+   similarity >= QUESTION_DUPLICATE_THRESHOLD) among those whose exact
+   Jaccard is above the threshold, and how many find it at all.
+
+Usage (from backend/):
+    python -m benchmarks.question_similarity [--questions 100000] [--planted 1000]
+"""
+import argparse
+import random
+import string
+import time
+
+import numpy as np
+
+from benchmarks import fakes  # noqa: F401  (sets the env that importing utils needs)
+from utils.question_similarity import (  # noqa: E402
+    QuestionSimilarityIndex, question_similarity_text, question_numbers, shingle_hashes, jaccard,
+    QUESTION_DUPLICATE_THRESHOLD, QUESTION_SIMILAR_THRESHOLD
+)
+
+
+def make_vocabulary(rng: random.Random, size: int = 5000) -> list:
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(size)]
+
+
+def make_question(rng: random.Random, vocabulary: list) -> dict:
+    words = rng.choices(vocabulary, k=rng.randint(8, 16))
+    if rng.random() < 0.3:
+        words.insert(rng.randrange(len(words)), str(rng.randint(1, 99)))
+    return {
+        'question_text': ' '.join(words).capitalize() + '?',
+        'options': [' '.join(rng.choices(vocabulary, k=rng.randint(1, 3))) for _ in range(4)],
+        'correct_answer': rng.randrange(4),
+    }
+
+
+def make_variant(rng: random.Random, vocabulary: list, question: dict) -> dict:
+    words = question['question_text'].rstrip('?').split(' ')
+    options = list(question['options'])
+    edit = rng.choice(['replace', 'insert', 'drop', 'punctuation', 'shuffle'])
+    word_positions = [idx for idx, word in enumerate(words) if not word.isdigit()]
+    if edit == 'replace':
+        words[rng.choice(word_positions)] = rng.choice(vocabulary)
+    elif edit == 'insert':
+        words.insert(rng.randrange(len(words) + 1), rng.choice(vocabulary))
+    elif edit == 'drop' and len(word_positions) > 1:
+        words.pop(rng.choice(word_positions))
+    elif edit == 'punctuation':
+        words = [word.upper() if rng.random() < 0.2 else word for word in words]
+        words[rng.randrange(len(words))] += ','
+    else:
+        rng.shuffle(options)
+    return {**question, 'question_text': ' '.join(words) + '.', 'options': options}
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def exact_scan(query: dict, shingle_sets: list) -> list:
+    """Exact Jaccard of the query against every question: the pairwise approach"""
+    hashes = set(shingle_hashes(question_similarity_text(query)).tolist())
+    scores = []
+    for idx, other in enumerate(shingle_sets):
+        union = len(hashes | other)
+        scores.append((len(hashes & other) / union if union else 0.0, idx))
+    return sorted(scores, reverse=True)[:10]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--questions', type=int, default=100000, help='questions in the synthetic bank')
+    parser.add_argument('--planted', type=int, default=1000, help='near-duplicate variants to look up')
+    parser.add_argument('--inserts', type=int, default=2000, help='questions added one at a time after the bulk load')
+    parser.add_argument('--exact-sample', type=int, default=20, help='lookups also timed with exact pairwise Jaccard')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(rng)
+    bank = [make_question(rng, vocabulary) for _ in range(args.questions)]
+    sources = rng.sample(range(args.questions), args.planted)
+    variants = [make_variant(rng, vocabulary, bank[idx]) for idx in sources]
+    extra = [make_question(rng, vocabulary) for _ in range(args.inserts)]
+
+    print(f"{args.questions} questions, {args.planted} planted near-duplicates, "
+          f"duplicate threshold {QUESTION_DUPLICATE_THRESHOLD}, similar threshold {QUESTION_SIMILAR_THRESHOLD}")
+
+    index = QuestionSimilarityIndex()
+    start = time.perf_counter()
+    signatures = index.compute_signatures(bank)
+    hashed = time.perf_counter() - start
+    start = time.perf_counter()
+    index.add_signatures(list(range(args.questions)), signatures, numbers=[question_numbers(q) for q in bank])
+    tabled = time.perf_counter() - start
+    stats = index.get_stats()
+    print(f"bulk index: signatures {hashed:.2f} s ({args.questions / hashed:,.0f} questions/s), "
+          f"band tables {tabled:.2f} s, {stats['memory_bytes'] / 2**20:.1f} MiB "
+          f"({stats['bands']} bands x {stats['rows_per_band']} rows)")
+
+    insert_times = []
+    duplicates_on_insert = 0
+    for offset, question in enumerate(extra):
+        start = time.perf_counter()
+        if index.find_duplicate(question) is None:
+            index.add(args.questions + offset, question)
+        else:
+            duplicates_on_insert += 1
+        insert_times.append(time.perf_counter() - start)
+    print(f"insert with duplicate check: median {percentile(insert_times, 0.5) * 1000:.2f} ms, "
+          f"p99 {percentile(insert_times, 0.99) * 1000:.2f} ms ({duplicates_on_insert} of {args.inserts} random "
+          f"questions flagged as duplicates)")
+    print()
+
+    lsh_times = []
+    scan_times = []
+    candidate_counts = []
+    found_duplicate = found_similar = expected_duplicate = duplicate_hits = false_duplicates = 0
+    for source, variant in zip(sources, variants):
+        start = time.perf_counter()
+        signature = index.signature(variant)
+        matches = index.query_signature(signature, QUESTION_SIMILAR_THRESHOLD)
+        lsh_times.append(time.perf_counter() - start)
+        duplicate = index.find_duplicate_signature(signature, question_numbers(variant))
+        candidate_counts.append(len(index._candidates(signature)))
+
+        start = time.perf_counter()
+        scores = (signatures == signature).mean(axis=1)
+        np.argsort(-scores)[:10]
+        scan_times.append(time.perf_counter() - start)
+
+        true_similarity = jaccard(
+            shingle_hashes(question_similarity_text(variant)), shingle_hashes(question_similarity_text(bank[source]))
+        )
+        found_similar += any(key == source for key, _ in matches)
+        found_duplicate += duplicate == source
+        if duplicate is not None and duplicate != source:
+            false_duplicates += 1
+        if true_similarity >= QUESTION_DUPLICATE_THRESHOLD:
+            expected_duplicate += 1
+            duplicate_hits += duplicate == source
+
+    shingle_sets = [set(shingle_hashes(question_similarity_text(q)).tolist()) for q in bank]
+    exact_times = []
+    for variant in variants[:args.exact_sample]:
+        start = time.perf_counter()
+        exact_scan(variant, shingle_sets)
+        exact_times.append(time.perf_counter() - start)
+
+    print(f"{'lookup':>28} {'median ms':>10} {'p99 ms':>10} {'vs LSH':>8}")
+    lsh_median = percentile(lsh_times, 0.5)
+    for name, times in (('LSH index', lsh_times), ('scan all signatures', scan_times),
+                        ('exact pairwise Jaccard', exact_times)):
+        median = percentile(times, 0.5)
+        print(f"{name:>28} {median * 1000:>10.2f} {percentile(times, 0.99) * 1000:>10.2f} {median / lsh_median:>7.1f}x")
+    print(f"LSH candidates scored per lookup: mean {sum(candidate_counts) / len(candidate_counts):.1f}, "
+          f"max {max(candidate_counts)} of {len(index)}")
+    print()
+
+    print(f"source found as similar (>= {QUESTION_SIMILAR_THRESHOLD}): {found_similar}/{args.planted}")
+    print(f"source found as duplicate: {found_duplicate}/{args.planted} "
+          f"({duplicate_hits}/{expected_duplicate} of variants with exact Jaccard >= {QUESTION_DUPLICATE_THRESHOLD}); "
+          f"{false_duplicates} matched the wrong question")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""A class opening an assigned quiz at once: cached student payloads vs a Mongo read per request.
+
+Simulates `--students` requests for the same quiz arriving within
+`--spread` seconds, against a fake quizzes collection whose reads take
+`--latency` seconds with at most `--pool` in flight (the Motor connection
+pool). Each request produces the response body, as GET /quizzes/{id} does:
+1. uncached: find_one, strip the answers, render JSON, per request;
+2. cached, cold: the first misses are coalesced into one read;
+3. cached, pre-warmed: the quiz was loaded when it was assigned.
+
+Usage (from backend/):
+    python -m benchmarks.quiz_cache [--students 30] [--questions 40] [--latency 0.02]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks import fakes  # noqa: F401  (sets the env that importing utils needs)
+from utils.quiz_cache import QuizCache  # noqa: E402
+
+
+class FakeQuizzes:
+    """quizzes collection stand-in: find_one with a fixed latency behind a connection pool"""
+
+    def __init__(self, quiz: dict, latency: float, pool: int):
+        self.quiz = quiz
+        self.latency = latency
+        self.pool = asyncio.Semaphore(pool)
+        self.reads = 0
+
+    async def find_one(self, query: dict, projection: dict = None):
+        async with self.pool:
+            self.reads += 1
+            await asyncio.sleep(self.latency)
+            return dict(self.quiz) if query.get('id') == self.quiz['id'] else None
+
+
+class FakeDb:
+    def __init__(self, quizzes: FakeQuizzes):
+        self.quizzes = quizzes
+
+
+def make_quiz(rng: random.Random, questions: int) -> dict:
+    return {
+        'id': 'quiz-1', 'title': 'Unit 3 check', 'teacher_id': 't1', 'lesson_plan_id': 'p1', 'status': 'published',
+        'created_at': '2025-01-06T00:00:00+00:00',
+        'questions': [
+            {
+                'id': f'q{i}',
+                'question_text': f"Question {i}: " + ' '.join(rng.choice(['area', 'scale', 'ratio', 'angle']) for _ in range(20)),
+                'options': [f"Option {c} for {i}" for c in 'ABCD'],
+                'correct_answer': rng.randrange(4),
+                'skill': '7.G.1'
+            }
+            for i in range(questions)
+        ]
+    }
+
+
+async def run_class(cache: QuizCache, db: FakeDb, students: int, spread: float, rng: random.Random):
+    async def student(delay):
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        await cache.get(db, 'quiz-1')
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*[student(rng.uniform(0, spread)) for _ in range(students)])
+
+
+async def scenario(name: str, args, quiz: dict, enabled: bool, warm: bool):
+    rng = random.Random(args.seed)
+    db = FakeDb(FakeQuizzes(quiz, args.latency, args.pool))
+    cache = QuizCache(enabled=enabled)
+    if warm:
+        await cache.warm(db, 'quiz-1')
+        db.quizzes.reads = 0
+    results = await run_class(cache, db, args.students, args.spread, rng)
+    latencies = sorted(results)
+    print(f"{name:>16} {db.quizzes.reads:>6} {latencies[len(latencies) // 2] * 1000:>10.2f} "
+          f"{latencies[-1] * 1000:>9.2f} {cache.get_stats()['coalesced']:>10}")
+
+
+async def main_async(args):
+    quiz = make_quiz(random.Random(args.seed), args.questions)
+    print(f"{args.students} students within {args.spread}s, {args.questions} questions, "
+          f"{args.latency * 1000:.0f} ms reads, pool of {args.pool}")
+    print(f"{'':>16} {'reads':>6} {'median ms':>10} {'max ms':>9} {'coalesced':>10}")
+    await scenario('uncached', args, quiz, enabled=False, warm=False)
+    await scenario('cached, cold', args, quiz, enabled=True, warm=False)
+    await scenario('cached, warmed', args, quiz, enabled=True, warm=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--questions', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per Mongo read')
+    parser.add_argument('--pool', type=int, default=10, help='reads in flight at once')
+    parser.add_argument('--spread', type=float, default=0.0, help='seconds over which the requests arrive')
+    parser.add_argument('--seed', type=int, default=7)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Wall-clock comparison of sequential vs concurrent quiz question generation.
+
+Generates `--count` questions for each of `--standards` standards through
+the offline fake LLM provider, one standard at a time and then concurrently.
+Concurrent runs are shown under the default per-teacher LLM cap and with the
+cap raised to the number of standards, since the scheduler bounds how many
+calls one teacher can have in flight.
+
+Usage (from backend/):
+    python -m benchmarks.quiz_generation [--standards 10] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import fakes  # noqa: F401  (sets the env that importing utils needs)
+import utils.llm as llm  # noqa: E402
+from utils.llm_providers import FakeLlmProvider  # noqa: E402
+from utils.llm_scheduler import LlmScheduler, LLM_MAX_CONCURRENCY, LLM_PER_USER_CONCURRENCY  # noqa: E402
+from utils.quiz_generation import generate_questions_for_standards  # noqa: E402
+
+
+async def time_generation(standards: list, count: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    await generate_questions_for_standards(
+        standards, count, "benchmark_teacher", "quiz_benchmark", concurrency=concurrency
+    )
+    return time.perf_counter() - start
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--standards', type=int, default=10, help='number of selected standards')
+    parser.add_argument('--count', type=int, default=3, help='questions per standard')
+    parser.add_argument('--latency', type=float, default=0.2, help='fake LLM latency per call, in seconds')
+    args = parser.parse_args()
+
+    llm.llm_provider = FakeLlmProvider(latency=f"fixed:{args.latency}")
+    standards = [f"7.L.{idx + 1}" for idx in range(args.standards)]
+
+    print(f"{args.standards} standards x {args.count} questions, {args.latency * 1000:.0f} ms per LLM call")
+    print(f"{'mode':>34} {'seconds':>8} {'speedup':>8}")
+
+    llm.llm_scheduler = LlmScheduler(max_concurrency=max(LLM_MAX_CONCURRENCY, args.standards), per_user_concurrency=LLM_PER_USER_CONCURRENCY)
+    sequential = await time_generation(standards, args.count, concurrency=1)
+    print(f"{'sequential':>34} {sequential:>8.2f} {1:>7.1f}x")
+
+    concurrent = await time_generation(standards, args.count, concurrency=None)
+    print(f"{f'concurrent, per-teacher cap {LLM_PER_USER_CONCURRENCY}':>34} {concurrent:>8.2f} {sequential / concurrent:>7.1f}x")
+
+    llm.llm_scheduler = LlmScheduler(max_concurrency=max(LLM_MAX_CONCURRENCY, args.standards), per_user_concurrency=args.standards)
+    uncapped = await time_generation(standards, args.count, concurrency=None)
+    print(f"{f'concurrent, per-teacher cap {args.standards}':>34} {uncapped:>8.2f} {sequential / uncapped:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
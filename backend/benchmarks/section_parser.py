@@ -0,0 +1,159 @@
+"""Section parser micro-benchmark.
+
+Times utils.lesson_parser against the original nested-loop parser on large
+(10k-line by default) responses: the corpus in benchmarks/parser_corpus/
+repeated end to end, and a random mix of header and body lines. That both
+parsers agree, and that every corpus response still produces the sections
+recorded in parser_corpus/expected.json, is covered by
+tests/test_lesson_parser.py.
+
+Usage (from backend/):
+    python -m benchmarks.section_parser [--lines 10000] [--repeat 5]
+    python -m benchmarks.section_parser --update-expected   # re-record expected.json
+"""
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+from benchmarks import fakes  # noqa: F401  (sets the env that importing utils needs)
+from utils.lesson_parser import SECTION_MAPPING, parse_lesson_plan_response
+
+CORPUS_DIR = Path(__file__).parent / 'parser_corpus'
+EXPECTED_FILE = CORPUS_DIR / 'expected.json'
+
+
+def legacy_parse_lesson_plan_response(response_text: str) -> dict:
+    """The original nested-loop parser, kept verbatim as the reference implementation"""
+    sections = {
+        'learner_outcomes': '',
+        'standards': '',
+        'materials_needed': '',
+        'anticipatory_set': '',
+        'teaching_lesson': '',
+        'modeling': '',
+        'instructional_strategies': '',
+        'check_understanding': '',
+        'guided_practice': '',
+        'independent_practice': '',
+        'closure': '',
+        'summative_assessment': '',
+        'formative_assessment': '',
+        'extended_activities': '',
+        'review_reteach': '',
+        'early_finishers': ''
+    }
+
+    section_mapping = {
+        'learner outcomes': 'learner_outcomes',
+        'objectives': 'learner_outcomes',
+        'standards': 'standards',
+        'materials needed': 'materials_needed',
+        'anticipatory set': 'anticipatory_set',
+        'teaching the lesson': 'teaching_lesson',
+        'modeling': 'modeling',
+        'instructional strategies': 'instructional_strategies',
+        'check for understanding': 'check_understanding',
+        'guided practice': 'guided_practice',
+        'monitoring': 'guided_practice',
+        'independent practice': 'independent_practice',
+        'closure': 'closure',
+        'summative assessment': 'summative_assessment',
+        'formative assessment': 'formative_assessment',
+        'extended activities': 'extended_activities',
+        'review and reteach': 'review_reteach',
+        'reteach activities': 'review_reteach',
+        'early finishers': 'early_finishers'
+    }
+
+    lines = response_text.split('\n')
+    current_section = None
+    current_text = []
+
+    for line in lines:
+        line_lower = line.lower().strip()
+        found_section = False
+
+        # Check if this line is a section header
+        for keyword, section_key in section_mapping.items():
+            if keyword in line_lower and (line.startswith('#') or line.startswith('**') or line.endswith(':') or len(line) < 50):
+                if current_section and current_text:
+                    sections[current_section] = '\n'.join(current_text).strip()
+                current_section = section_key
+                current_text = []
+                found_section = True
+                break
+
+        if not found_section and current_section:
+            current_text.append(line)
+
+    # Save any remaining section
+    if current_section and current_text:
+        sections[current_section] = '\n'.join(current_text).strip()
+
+    # If parsing failed, store everything in teaching_lesson
+    if not any(sections.values()):
+        sections['teaching_lesson'] = response_text
+
+    return sections
+
+
+def load_corpus() -> dict:
+    return {path.name: path.read_text() for path in sorted(CORPUS_DIR.glob('*.md'))}
+
+
+def random_response(rng: random.Random, lines: int) -> str:
+    """Assemble a response from header-like and body-like lines"""
+    keywords = list(SECTION_MAPPING)
+    body_words = "students will practice the skill with a partner and then check their work against the key".split()
+    out = []
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < 0.15:
+            style = rng.choice(['## {}', '**{}**', '{}:', '### 12. {}', '{} and more notes', '- {}'])
+            words = rng.sample(keywords, rng.choice([1, 1, 1, 2]))
+            out.append(style.format(' / '.join(w.title() if rng.random() < 0.5 else w for w in words)))
+        elif roll < 0.2:
+            out.append('')
+        else:
+            n = rng.choice([3, 6, 12, 20])
+            out.append(' '.join(rng.choice(body_words) for _ in range(n)))
+    return '\n'.join(out)
+
+
+def best_time(fn, text: str, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lines', type=int, default=10000, help='lines in the timed response')
+    parser.add_argument('--repeat', type=int, default=5, help='timing repetitions (best is reported)')
+    parser.add_argument('--update-expected', action='store_true', help='re-record expected.json with the original parser')
+    args = parser.parse_args()
+
+    if args.update_expected:
+        expected = {name: legacy_parse_lesson_plan_response(text) for name, text in load_corpus().items()}
+        EXPECTED_FILE.write_text(json.dumps(expected, indent=2, ensure_ascii=False) + '\n')
+        print(f"recorded {len(expected)} responses to {EXPECTED_FILE}")
+        return
+
+    corpus_lines = '\n'.join(load_corpus().values()).split('\n')
+    workloads = {
+        'corpus': '\n'.join((corpus_lines * (args.lines // len(corpus_lines) + 1))[:args.lines]),
+        'random': random_response(random.Random(42), args.lines),
+    }
+    for name, text in workloads.items():
+        legacy = best_time(legacy_parse_lesson_plan_response, text, args.repeat)
+        current = best_time(parse_lesson_plan_response, text, args.repeat)
+        print(f"{name} {args.lines} lines: original {legacy * 1000:.1f} ms, lesson_parser {current * 1000:.1f} ms ({legacy / current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
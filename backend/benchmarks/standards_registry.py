@@ -0,0 +1,103 @@
+"""Coverage gaps and prefix rollups from the standards trie vs scanning the catalog.
+
+Builds a synthetic registry catalog of `--grades` grades, each with
+`--domains` domains of `--per-domain` numbered standards (7.G.1, 7.G.2, ...),
+marks a random `--assessed` fraction as assessed, with messy spellings
+('7.g.1 ', '**7.G.1**') the way quiz skills arrive, and then times:
+1. compute_standards_coverage over a grade and over one domain prefix, which
+   walks only the subtree the prefix selects;
+2. the same numbers found by scanning every catalog code with a string prefix
+   test per rollup group, the approach the trie replaces.
+That both agree, and that messy spellings land on their catalog codes, is
+covered by tests/test_standards.py.
+
+Usage (from backend/):
+    python -m benchmarks.standards_registry [--grades 13] [--domains 12] [--per-domain 40]
+"""
+import argparse
+import random
+import time
+
+from benchmarks import fakes  # noqa: F401  (sets the env that importing utils needs)
+from utils.standards import (  # noqa: E402
+    StandardsCatalog, compute_standards_coverage, canonical_standard_code, standard_code_sort_key
+)
+
+DOMAINS = ['G', 'RP', 'NS', 'EE', 'SP', 'F', 'NBT', 'OA', 'MD', 'RL', 'RI', 'W', 'SL', 'L', 'RH', 'WHST']
+
+
+def make_catalog(rng: random.Random, grades: int, domains: int, per_domain: int) -> list:
+    entries = []
+    for grade in ['K'] + [str(g) for g in range(1, grades)]:
+        for domain in DOMAINS[:domains]:
+            for number in range(1, per_domain + 1):
+                entries.append({'grade': grade, 'code': f"{grade}.{domain}.{number}", 'description': ''})
+    return entries
+
+
+def messy(rng: random.Random, code: str) -> str:
+    return rng.choice([code, code.lower() + ' ', f"**{code}**", f" {code}: description", f"[{code}]"])
+
+
+def scan_coverage(assessed: dict, catalog_codes: list, prefix: str) -> dict:
+    """Gaps and rollups by testing every catalog code against the prefix and each group"""
+    under = [code for code in catalog_codes if code == prefix or code.startswith(prefix + '.') or not prefix]
+    not_assessed = [code for code in under if code not in assessed]
+    depth = len(prefix.split('.')) if prefix else 0
+    groups = sorted({'.'.join(code.split('.')[:depth + 1]) for code in under}, key=standard_code_sort_key)
+    # A grade-wide view (prefix '7') groups by domain, one level further down
+    if len(groups) == 1 and groups[0] not in catalog_codes:
+        depth += 1
+        groups = sorted({'.'.join(code.split('.')[:depth + 1]) for code in under}, key=standard_code_sort_key)
+    rollups = []
+    for group in groups:
+        members = [code for code in catalog_codes if code == group or code.startswith(group + '.')]
+        rollups.append((group, len(members), sum(1 for code in members if code in assessed)))
+    return {'not_assessed': len(not_assessed), 'catalog_count': len(under), 'rollups': rollups}
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return result, sorted(times)[len(times) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grades', type=int, default=13, help='grades in the catalog (K plus 1..n-1)')
+    parser.add_argument('--domains', type=int, default=12, help=f'domains per grade (at most {len(DOMAINS)})')
+    parser.add_argument('--per-domain', type=int, default=40, help='standards per domain')
+    parser.add_argument('--assessed', type=float, default=0.4, help='fraction of standards assessed')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entries = make_catalog(rng, args.grades, min(args.domains, len(DOMAINS)), args.per_domain)
+    start = time.perf_counter()
+    catalog = StandardsCatalog('MS', entries)
+    built = time.perf_counter() - start
+    print(f"catalog: {len(entries)} standards, {len(catalog.grades)} grades, built in {built * 1000:.1f} ms")
+
+    grade = '7' if '7' in catalog.grades else catalog.grades[-1]
+    grade_codes = [entry['code'] for entry in entries if entry['grade'] == grade]
+    assessed = {}
+    for code in rng.sample(grade_codes, int(len(grade_codes) * args.assessed)):
+        skill = canonical_standard_code(messy(rng, code))
+        assessed[skill] = {'times_assessed': 1, 'total_score': 75, 'count': 1}
+    trie = catalog.trie([grade])
+    ordered_codes = trie.codes()
+
+    print(f"{'view':>14} {'trie ms':>9} {'scan ms':>9} {'speedup':>8} {'gaps':>6} {'groups':>7}")
+    for prefix in (grade, f"{grade}.{DOMAINS[0]}"):
+        coverage, trie_time = timed(lambda: compute_standards_coverage(assessed, trie, prefix), args.repeat)
+        scanned, scan_time = timed(lambda: scan_coverage(assessed, ordered_codes, prefix), args.repeat)
+        print(f"{prefix:>14} {trie_time * 1000:>9.3f} {scan_time * 1000:>9.3f} {scan_time / trie_time:>7.1f}x "
+              f"{coverage['not_assessed_count']:>6} {len(coverage['rollups']):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 # Models package - Pydantic models for LessonPlan AI
 from .user import User, UserRegister, UserLogin, UserDetail, ChangePassword
-from .lesson_plan import LessonPlan, LessonPlanCreate, DayPlan
+from .lesson_plan import LessonPlan, LessonPlanCreate, DayPlan, LessonPlanJob, BulkLessonPlanCreate, DayPlanSections, PlanExtraction
 from .quiz import QuizTest, Question, Assignment, StudentAnswer, Submission
 from .student import Student, StudentSession, Class
 from .admin import InvitationCode, CreateInvitationCode, AdminStats
+from .standard import Standard
@@ -1,6 +1,6 @@
 """Lesson Plan models"""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Dict, Literal
 from datetime import datetime, timezone
 import uuid
 
@@ -27,6 +27,26 @@ class DayPlan(BaseModel):
     early_finishers: str
 
 
+class DayPlanSections(BaseModel):
+    """The sections of a day, as returned by the LLM in JSON output mode"""
+    learner_outcomes: str
+    standards: str
+    materials_needed: str
+    anticipatory_set: str
+    teaching_lesson: str
+    modeling: str
+    instructional_strategies: str
+    check_understanding: str
+    guided_practice: str
+    independent_practice: str
+    closure: str
+    summative_assessment: str
+    formative_assessment: str
+    extended_activities: str
+    review_reteach: str
+    early_finishers: str
+
+
 class LessonPlanCreate(BaseModel):
     """Request model for creating a lesson plan"""
     textbook: str
@@ -35,6 +55,29 @@ class LessonPlanCreate(BaseModel):
     lesson_range: str
     next_major_assessment: str
     state_standards: Optional[str] = None
+    bypass_cache: bool = False  # Skip cached LLM responses and generate fresh content
+    output_format: Optional[Literal["markdown", "json"]] = None  # LESSON_PLAN_OUTPUT_FORMAT when unset
+
+
+class BulkLessonPlanCreate(LessonPlanCreate):
+    """Admin request to generate the same lesson plan for several teachers"""
+    teacher_ids: List[str]
+    standards_by_teacher: Dict[str, str] = {}  # Optional per-teacher state_standards override
+
+
+class PlanObjective(BaseModel):
+    """Learner outcome pulled from one day of a plan"""
+    text: str
+    day: str
+    date: str
+
+
+class PlanExtraction(BaseModel):
+    """Objectives and standard codes extracted from a plan, for building quizzes"""
+    plan_version: int  # LessonPlan.version the extraction was made from
+    parser_version: int  # utils.plan_extraction.PLAN_EXTRACTION_PARSER_VERSION at the time
+    objectives: List[PlanObjective] = []
+    standards: List[str] = []  # Deduplicated, sorted standard codes
 
 
 class LessonPlan(BaseModel):
@@ -48,6 +91,8 @@ class LessonPlan(BaseModel):
     end_date: str
     lesson_range: str
     next_major_assessment: str
+    state_standards: Optional[str] = None
+    output_format: str = "markdown"  # How day sections were requested from the LLM: markdown or json
     daily_plans: List[DayPlan]
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     submission_status: str = "draft"  # draft, pending, approved, rejected
@@ -55,3 +100,25 @@ class LessonPlan(BaseModel):
     reviewed_at: Optional[datetime] = None
     admin_feedback: Optional[str] = None
     reviewed_by: Optional[str] = None
+    generation_state: str = "complete"  # generating, partial (some days failed), complete
+    generation_errors: Dict[str, str] = {}  # {day_date: error} for days that failed to generate
+    version: int = 0  # Bumped by every update; keys cached DOCX exports and their ETag
+    extracted: Optional[PlanExtraction] = None  # Stored by utils.plan_extraction; current when plan_version == version
+
+
+class LessonPlanJob(BaseModel):
+    """Background lesson plan generation job"""
+    model_config = ConfigDict(extra="ignore")
+    
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    user_id: str
+    request: LessonPlanCreate
+    status: str = "queued"  # queued, running, completed, failed
+    days_total: int
+    days_completed: int = 0
+    lesson_plan_id: Optional[str] = None
+    error: Optional[str] = None
+    owner: Optional[str] = None  # Process that claimed the job (see utils.jobs)
+    lease_until: Optional[datetime] = None  # The claim lapses after this unless renewed
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
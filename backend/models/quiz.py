@@ -55,3 +55,12 @@ class Submission(BaseModel):
     score: float
     skills_breakdown: Dict[str, Dict[str, Any]]  # {skill: {correct: int, total: int, percentage: float}}
     submitted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SimilarQuestionsRequest(BaseModel):
+    """Draft question to look up in the question bank"""
+    question_text: str = ""
+    options: List[str] = []
+    standard: Optional[str] = None
+    limit: int = 10  # clamped to 1-50
+    threshold: Optional[float] = Field(default=None, ge=0, le=1)  # defaults to QUESTION_SIMILAR_THRESHOLD
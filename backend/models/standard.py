@@ -0,0 +1,19 @@
+"""Standards registry models"""
+from pydantic import BaseModel, Field, ConfigDict
+from typing import Optional
+from datetime import datetime, timezone
+import uuid
+
+
+class Standard(BaseModel):
+    """One standard in the registry, unique per (state, grade, code)"""
+    model_config = ConfigDict(extra="ignore")
+
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    state: str  # Canonical state, e.g. "MS" (see utils.standards.canonical_state)
+    grade: str  # Canonical grade, e.g. "7" or "K"
+    code: str  # Canonical code, e.g. "7.G.1" (see utils.standards.canonical_standard_code)
+    description: str = ""
+    subject: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
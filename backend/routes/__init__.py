@@ -6,3 +6,4 @@ from .quizzes import router as quizzes_router
 from .submissions import router as submissions_router
 from .analytics import router as analytics_router
 from .admin import router as admin_router
+from .standards import router as standards_router
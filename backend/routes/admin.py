@@ -1,12 +1,24 @@
 """Admin routes"""
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from datetime import datetime, timezone
+from typing import Optional
+import logging
 import uuid
 
 from models.admin import InvitationCode, CreateInvitationCode, AdminStats
 from models.user import UserDetail
+from models.lesson_plan import BulkLessonPlanCreate
 from utils.database import db
 from utils.auth import get_admin_user
+from utils.helpers import get_weekdays_between
+from utils.lesson_generation import bulk_generate_lesson_plans
+from utils.llm import llm_cache, llm_clients, llm_scheduler, llm_metrics
+from utils.quiz_cache import quiz_cache
+from utils.docx_export import stream_lesson_plans_zip, ZIP_MEDIA_TYPE
+from utils.question_bank import backfill_question_bank
+from utils.plan_extraction import backfill_plan_extractions, update_plan_status
+from utils.standards import parse_standards_file, import_standards, canonical_standard_code
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -27,6 +39,71 @@ async def get_admin_stats(admin_user: dict = Depends(get_admin_user)):
     )
 
 
+@router.get("/llm-cache/stats")
+async def get_llm_cache_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get LLM response cache hit/miss counters"""
+    return llm_cache.get_stats()
+
+
+@router.get("/quiz-cache/stats")
+async def get_quiz_cache_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get student quiz cache hit/miss counters"""
+    return quiz_cache.get_stats()
+
+
+@router.get("/llm-clients/stats")
+async def get_llm_client_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get LLM client counters (chats created, models in use)"""
+    return llm_clients.get_stats()
+
+
+@router.get("/llm-scheduler/stats")
+async def get_llm_scheduler_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get LLM concurrency, per-teacher queue depth and wait times"""
+    return llm_scheduler.get_stats()
+
+
+@router.get("/llm-metrics")
+async def get_llm_metrics(format: str = "json", admin_user: dict = Depends(get_admin_user)):
+    """LLM latency/token histograms and error rates per call site; ?format=prometheus for scraping"""
+    if format == "prometheus":
+        return PlainTextResponse(llm_metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+    return llm_metrics.get_stats()
+
+
+@router.post("/question-bank/backfill")
+async def backfill_question_bank_from_quizzes(admin_user: dict = Depends(get_admin_user)):
+    """Add the questions of every saved quiz to the question bank (safe to repeat)"""
+    result = await backfill_question_bank(db)
+    result['bank_size'] = await db.question_bank.count_documents({})
+    return result
+
+
+@router.post("/lesson-plans/backfill-objectives")
+async def backfill_lesson_plan_objectives(admin_user: dict = Depends(get_admin_user)):
+    """Store extracted objectives and standards on every plan missing them (safe to repeat)"""
+    return await backfill_plan_extractions(db)
+
+
+@router.post("/standards/import")
+async def import_standards_file(file: UploadFile = File(...), state: Optional[str] = Form(None), grade: Optional[str] = Form(None),
+                                subject: Optional[str] = Form(None), replace: bool = Form(False),
+                                admin_user: dict = Depends(get_admin_user)):
+    """Import standards from a CSV or JSON file into the registry"""
+    file_format = 'json' if (file.filename or '').lower().endswith('.json') or file.content_type == 'application/json' else 'csv'
+    try:
+        standards, errors = parse_standards_file(await file.read(), file_format, state, grade, subject)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read standards file: {str(e)}")
+    if not standards:
+        raise HTTPException(status_code=400, detail=f"No valid standards in file ({len(errors)} rows rejected)")
+    
+    result = await import_standards(db, standards, replace=replace)
+    result['rejected'] = len(errors)
+    result['errors'] = errors[:100]
+    return result
+
+
 @router.get("/users")
 async def get_all_users(admin_user: dict = Depends(get_admin_user)):
     """Get all teacher users"""
@@ -194,6 +271,79 @@ async def get_all_lesson_plans(admin_user: dict = Depends(get_admin_user)):
     return all_plans
 
 
+@router.get("/lesson-plans/export")
+async def export_lesson_plans_zip(
+    status: Optional[str] = None,
+    teacher_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """Download a ZIP of Word exports for the plans matching the filters"""
+    admin = await db.users.find_one({"id": admin_user['id']}, {"_id": 0})
+    supervised_ids = admin.get('supervised_teacher_ids', [])
+    
+    query = {}
+    if supervised_ids:
+        query["user_id"] = {"$in": supervised_ids}
+    if teacher_id:
+        if supervised_ids and teacher_id not in supervised_ids:
+            raise HTTPException(status_code=403, detail="You can only export plans of teachers you supervise")
+        query["user_id"] = teacher_id
+    if status:
+        if status not in ['draft', 'pending', 'approved', 'rejected']:
+            raise HTTPException(status_code=400, detail="Invalid status")
+        query["submission_status"] = status
+    # Plans whose date range overlaps [start_date, end_date]
+    if start_date:
+        query["end_date"] = {"$gte": start_date}
+    if end_date:
+        query["start_date"] = {"$lte": end_date}
+    
+    if not await db.lesson_plans.count_documents(query):
+        raise HTTPException(status_code=404, detail="No lesson plans match the filters")
+    
+    filename = f"lesson_plans_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_lesson_plans_zip(db, query),
+        media_type=ZIP_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
+@router.post("/lesson-plans/bulk-generate")
+async def bulk_generate_lesson_plans_for_teachers(plan_data: BulkLessonPlanCreate, admin_user: dict = Depends(get_admin_user)):
+    """Generate the same lesson plan for several teachers, sharing identical day prompts"""
+    teacher_ids = list(dict.fromkeys(plan_data.teacher_ids))
+    if not teacher_ids:
+        raise HTTPException(status_code=400, detail="teacher_ids is required")
+    
+    teachers = await db.users.find({"id": {"$in": teacher_ids}, "role": "teacher"}, {"_id": 0, "id": 1}).to_list(len(teacher_ids))
+    unknown = sorted(set(teacher_ids) - {t['id'] for t in teachers})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown teacher ids: {', '.join(unknown)}")
+    
+    # Admins with a supervision list can only generate for their own teachers
+    admin = await db.users.find_one({"id": admin_user['id']}, {"_id": 0})
+    supervised_ids = admin.get('supervised_teacher_ids', []) if admin else []
+    if supervised_ids and not set(teacher_ids) <= set(supervised_ids):
+        raise HTTPException(status_code=403, detail="You can only generate plans for teachers you supervise")
+    
+    try:
+        weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD dates")
+    
+    if not weekdays:
+        raise HTTPException(status_code=400, detail="No weekdays found in the date range")
+    
+    try:
+        return await bulk_generate_lesson_plans(db, plan_data, weekdays, admin_user['id'])
+    except Exception as e:
+        logging.error(f"Error bulk generating lesson plans: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating lesson plans: {str(e)}")
+
+
 @router.post("/lesson-plans/{plan_id}/review")
 async def review_lesson_plan(
     plan_id: str, 
@@ -211,15 +361,12 @@ async def review_lesson_plan(
     if status not in ['approved', 'rejected']:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    await db.lesson_plans.update_one(
-        {"id": plan_id},
-        {"$set": {
-            "submission_status": status,
-            "admin_feedback": feedback,
-            "reviewed_at": datetime.now(timezone.utc).isoformat(),
-            "reviewed_by": admin_user['id']
-        }}
-    )
+    await update_plan_status(db, plan_id, {
+        "submission_status": status,
+        "admin_feedback": feedback,
+        "reviewed_at": datetime.now(timezone.utc).isoformat(),
+        "reviewed_by": admin_user['id']
+    })
     
     return {"message": f"Lesson plan {status}"}
 
@@ -346,6 +493,7 @@ async def get_test_results_reports(admin_user: dict = Depends(get_admin_user)):
             standards_data = {}
             for sub in student_submissions:
                 for standard, breakdown in sub.get('skills_breakdown', {}).items():
+                    standard = canonical_standard_code(standard) or standard
                     if standard not in standards_data:
                         standards_data[standard] = {'correct': 0, 'total': 0}
                     standards_data[standard]['correct'] += breakdown['correct']
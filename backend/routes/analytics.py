@@ -1,12 +1,14 @@
 """Analytics routes"""
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timezone
-import os
-
-from emergentintegrations.llm.chat import LlmChat, UserMessage
+from typing import Optional
 
 from utils.database import db
 from utils.auth import get_current_user
+from utils.llm import send_llm_message
+from utils.standards import (
+    standards_registry, compute_standards_coverage, canonical_standard_code, canonical_grade, standard_code_prefix
+)
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -107,14 +109,6 @@ async def get_remediation_suggestions(data: dict, current_user: dict = Depends(g
     skill = data.get('skill')
     student_names = data.get('student_names', [])
     
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=f"remediation_{current_user['id']}_{datetime.now(timezone.utc).isoformat()}",
-        system_message="You are an expert education interventionist providing targeted remediation strategies."
-    )
-    chat.with_model("anthropic", "claude-3-7-sonnet-20250219")
-    
     prompt = f"""Provide exactly 5 specific, actionable remediation activities for students struggling with the following standard/skill:
 
 Standard/Skill: {skill}
@@ -131,9 +125,14 @@ Requirements for EACH of the 5 activities:
 
 Format: Return exactly 5 activities as a clear numbered list (1-5). Each activity should be 2-3 sentences."""
 
-    user_message = UserMessage(text=prompt)
-    response = await chat.send_message(user_message)
-    response_text = response if isinstance(response, str) else str(response)
+    response_text = await send_llm_message(
+        session_id=f"remediation_{current_user['id']}_{datetime.now(timezone.utc).isoformat()}",
+        system_message="You are an expert education interventionist providing targeted remediation strategies.",
+        prompt=prompt,
+        bypass_cache=data.get('bypass_cache', False),
+        user_id=current_user['id'],
+        call_site="remediation"
+    )
     
     return {"skill": skill, "suggestions": response_text}
 
@@ -355,7 +354,7 @@ async def get_student_profile(student_id: str, current_user: dict = Depends(get_
 
 
 @router.get("/groupings/{class_id}")
-async def get_groupings(class_id: str, current_user: dict = Depends(get_current_user)):
+async def get_groupings(class_id: str, level: Optional[int] = None, current_user: dict = Depends(get_current_user)):
     """Get student groupings based on performance"""
     class_data = await db.classes.find_one({"id": class_id}, {"_id": 0})
     if not class_data:
@@ -370,9 +369,11 @@ async def get_groupings(class_id: str, current_user: dict = Depends(get_current_
     student_map = {s['id']: s for s in students}
     
     # Calculate standards performance per student
+    # Codes are canonicalized ("7.g.1 " is 7.G.1); `level` rolls them up to a prefix (level=2 groups by 7.G)
     standards_data = {}
     for sub in submissions:
         for standard, breakdown in sub.get('skills_breakdown', {}).items():
+            standard = (standard_code_prefix(standard, level) if level else canonical_standard_code(standard)) or standard
             if standard not in standards_data:
                 standards_data[standard] = {}
             
@@ -423,47 +424,41 @@ async def get_groupings(class_id: str, current_user: dict = Depends(get_current_
 
 
 @router.get("/standards-coverage")
-async def get_standards_coverage(timeframe: str = 'quarter', current_user: dict = Depends(get_current_user)):
-    """Track which standards have been assessed"""
-    quizzes = await db.quizzes.find({"teacher_id": current_user['id']}, {"_id": 0}).to_list(1000)
+async def get_standards_coverage(timeframe: str = 'quarter', grade: Optional[str] = None, state: Optional[str] = None,
+                                 prefix: str = '', current_user: dict = Depends(get_current_user)):
+    """Track which standards have been assessed, and the gaps against the standards registry"""
+    quizzes = await db.quizzes.find({"teacher_id": current_user['id']}, {"_id": 0, "id": 1, "questions.skill": 1}).to_list(1000)
     
     assessed_standards = {}
     for quiz in quizzes:
         for question in quiz.get('questions', []):
-            standard = question.get('skill')
+            standard = canonical_standard_code(question.get('skill'))
             if standard:
                 if standard not in assessed_standards:
                     assessed_standards[standard] = {'times_assessed': 0, 'total_score': 0, 'count': 0}
                 assessed_standards[standard]['times_assessed'] += 1
     
     quiz_ids = [q['id'] for q in quizzes]
-    submissions = await db.submissions.find({"test_id": {"$in": quiz_ids}}, {"_id": 0}).to_list(10000)
+    submissions = await db.submissions.find({"test_id": {"$in": quiz_ids}}, {"_id": 0, "skills_breakdown": 1}).to_list(10000)
     
     for sub in submissions:
         for standard, breakdown in sub.get('skills_breakdown', {}).items():
+            standard = canonical_standard_code(standard)
             if standard in assessed_standards:
                 percentage = (breakdown['correct'] / breakdown['total'] * 100) if breakdown['total'] > 0 else 0
                 assessed_standards[standard]['total_score'] += percentage
                 assessed_standards[standard]['count'] += 1
     
-    assessed_list = []
-    for standard, data in assessed_standards.items():
-        avg_score = (data['total_score'] / data['count']) if data['count'] > 0 else 0
-        assessed_list.append({
-            'standard': standard,
-            'times_assessed': data['times_assessed'],
-            'average_score': avg_score
-        })
-    
-    assessed_list.sort(key=lambda x: x['standard'])
+    # Gaps are measured against the registry for the teacher's state; without a grade,
+    # against the grades whose standards the teacher has assessed
+    catalog = await standards_registry.get_catalog(db, state if state is not None else current_user.get('state'))
+    grades = [canonical_grade(grade)] if grade else catalog.grades_for(assessed_standards)
+    trie = catalog.trie(grades) if grades else None
     
-    return {
-        'assessed': assessed_list,
-        'assessed_count': len(assessed_list),
-        'not_assessed': [],
-        'not_assessed_count': 0,
-        'coverage_percentage': 100
-    }
+    coverage = compute_standards_coverage(assessed_standards, trie, prefix)
+    coverage['state'] = catalog.state
+    coverage['grades'] = grades
+    return coverage
 
 
 @router.get("/at-risk-students")
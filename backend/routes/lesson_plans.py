@@ -1,27 +1,39 @@
 """Lesson plan routes"""
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
 from datetime import datetime, timezone
-from typing import List
+from typing import List, Optional
+import asyncio
 import logging
-import os
-import io
 
-from docx import Document
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-
-from models.lesson_plan import LessonPlan, LessonPlanCreate, DayPlan
+from models.lesson_plan import LessonPlan, LessonPlanCreate
 from utils.database import db
-from utils.auth import get_current_user, get_admin_user
+from utils.auth import get_current_user
 from utils.helpers import get_weekdays_between
+from utils.lesson_generation import (
+    create_draft_plan, generate_plan_days, plan_request_from_plan, stream_lesson_plan_events,
+    regenerate_day_plan, clone_lesson_plan, LessonPlanGenerationError
+)
+from utils.jobs import LessonPlanJobQueue, JobQueueFull
+from utils.plan_extraction import refresh_plan_extraction, update_plan_status
+from utils.docx_export import (
+    docx_cache, get_lesson_plan_docx, docx_etag, etag_matches, iter_file, file_size, DOCX_MEDIA_TYPE
+)
 
 router = APIRouter(prefix="/lesson-plans", tags=["Lesson Plans"])
 
 
+# Background generation jobs (see utils/jobs.py); the app that mounts this router starts and stops the queue
+job_queue = LessonPlanJobQueue(db)
+
+
 @router.post("")
-async def create_lesson_plan(plan_data: LessonPlanCreate, current_user: dict = Depends(get_current_user)):
-    """Create a new AI-generated lesson plan"""
+async def create_lesson_plan(plan_data: LessonPlanCreate, background: bool = False, current_user: dict = Depends(get_current_user)):
+    """Create a new AI-generated lesson plan.
+
+    With `?background=true` the plan is generated by the job queue and a job id
+    is returned immediately; poll `GET /lesson-plans/jobs/{job_id}` for progress.
+    """
     try:
         # Get weekdays between start and end date
         weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
@@ -29,173 +41,67 @@ async def create_lesson_plan(plan_data: LessonPlanCreate, current_user: dict = D
         if not weekdays:
             raise HTTPException(status_code=400, detail="No weekdays found in the date range")
         
-        # Initialize Claude chat
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        
-        daily_plans = []
+        if background:
+            job = await job_queue.submit(current_user['id'], plan_data, len(weekdays))
+            return JSONResponse(status_code=202, content={
+                "job_id": job.id,
+                "status": job.status,
+                "days_total": job.days_total
+            })
         
-        # Generate plan for each day
-        for idx, day_info in enumerate(weekdays):
-            chat = LlmChat(
-                api_key=api_key,
-                session_id=f"lesson_plan_{current_user['id']}_{day_info['date']}",
-                system_message="You are an expert education consultant helping teachers create detailed daily lesson plans."
-            )
-            chat.with_model("anthropic", "claude-3-7-sonnet-20250219")
-            
-            state_standards_text = f"\nState Standards to Align With: {plan_data.state_standards}" if plan_data.state_standards else ""
-            
-            prompt = f"""Create a detailed lesson plan for {day_info['day_name']}, {day_info['date']} (Day {idx+1} of {len(weekdays)}) based on:
-
-Textbook: {plan_data.textbook}
-Lesson Range: {plan_data.lesson_range}
-Overall Date Range: {plan_data.start_date} to {plan_data.end_date}
-Next Major Assessment: {plan_data.next_major_assessment}{state_standards_text}
-
-Provide specific, actionable content for THIS DAY ONLY for each section:
-
-1. Learner Outcomes/Objectives
-2. Standards (include the relevant state standards provided above, formatted clearly)
-3. Materials Needed
-4. Anticipatory Set
-5. Teaching the Lesson
-6. Modeling
-7. Instructional Strategies
-8. Check for Understanding
-9. Guided Practice/Monitoring
-10. Independent Practice
-11. Closure
-12. Summative Assessment
-13. Formative Assessment
-14. Extended Activities
-15. Review and Reteach Activities
-16. Early Finishers Activities
-
-Make each section detailed and specific to day {idx+1}."""
-            
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
-            response_text = response if isinstance(response, str) else str(response)
-            
-            # Parse AI response into sections
-            sections = parse_lesson_plan_response(response_text)
-            
-            day_plan = DayPlan(
-                day_name=day_info['day_name'],
-                day_date=day_info['date'],
-                learner_outcomes=sections['learner_outcomes'] or 'Content will be generated',
-                standards=sections['standards'] or 'Content will be generated',
-                materials_needed=sections['materials_needed'] or 'Content will be generated',
-                anticipatory_set=sections['anticipatory_set'] or 'Content will be generated',
-                teaching_lesson=sections['teaching_lesson'] or response_text,
-                modeling=sections['modeling'] or 'Content will be generated',
-                instructional_strategies=sections['instructional_strategies'] or 'Content will be generated',
-                check_understanding=sections['check_understanding'] or 'Content will be generated',
-                guided_practice=sections['guided_practice'] or 'Content will be generated',
-                independent_practice=sections['independent_practice'] or 'Content will be generated',
-                closure=sections['closure'] or 'Content will be generated',
-                summative_assessment=sections['summative_assessment'] or 'Not applicable for today (next major assessment: ' + plan_data.next_major_assessment + ')',
-                formative_assessment=sections['formative_assessment'] or 'Content will be generated',
-                extended_activities=sections['extended_activities'] or 'Content will be generated',
-                review_reteach=sections['review_reteach'] or 'Content will be generated',
-                early_finishers=sections['early_finishers'] or 'Content will be generated'
-            )
-            daily_plans.append(day_plan)
+        # Save an empty draft first so every generated day is checkpointed into it;
+        # if some days fail, POST /lesson-plans/{plan_id}/resume finishes the rest
+        lesson_plan = await create_draft_plan(db, current_user['id'], plan_data)
+        plan = await generate_plan_days(db, lesson_plan.id, plan_data, weekdays, current_user['id'])
         
-        # Create lesson plan
-        lesson_plan = LessonPlan(
-            user_id=current_user['id'],
-            textbook=plan_data.textbook,
-            start_date=plan_data.start_date,
-            end_date=plan_data.end_date,
-            lesson_range=plan_data.lesson_range,
-            next_major_assessment=plan_data.next_major_assessment,
-            daily_plans=daily_plans
+        return LessonPlan(**plan)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Lesson plan generation queue is full, please try again shortly",
+            headers={"Retry-After": "30"}
         )
-        
-        plan_dict = lesson_plan.model_dump()
-        plan_dict['created_at'] = plan_dict['created_at'].isoformat()
-        
-        await db.lesson_plans.insert_one(plan_dict)
-        
-        return lesson_plan
+    except LessonPlanGenerationError as e:
+        logging.error(f"Error creating lesson plan: {str(e)}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"Error generating lesson plan: {str(e)}",
+            "failed_days": e.failures,
+            "lesson_plan_id": e.plan_id
+        })
     except Exception as e:
         logging.error(f"Error creating lesson plan: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
 
 
-def parse_lesson_plan_response(response_text: str) -> dict:
-    """Parse AI response into lesson plan sections"""
-    sections = {
-        'learner_outcomes': '',
-        'standards': '',
-        'materials_needed': '',
-        'anticipatory_set': '',
-        'teaching_lesson': '',
-        'modeling': '',
-        'instructional_strategies': '',
-        'check_understanding': '',
-        'guided_practice': '',
-        'independent_practice': '',
-        'closure': '',
-        'summative_assessment': '',
-        'formative_assessment': '',
-        'extended_activities': '',
-        'review_reteach': '',
-        'early_finishers': ''
-    }
-    
-    section_mapping = {
-        'learner outcomes': 'learner_outcomes',
-        'objectives': 'learner_outcomes',
-        'standards': 'standards',
-        'materials needed': 'materials_needed',
-        'anticipatory set': 'anticipatory_set',
-        'teaching the lesson': 'teaching_lesson',
-        'modeling': 'modeling',
-        'instructional strategies': 'instructional_strategies',
-        'check for understanding': 'check_understanding',
-        'guided practice': 'guided_practice',
-        'monitoring': 'guided_practice',
-        'independent practice': 'independent_practice',
-        'closure': 'closure',
-        'summative assessment': 'summative_assessment',
-        'formative assessment': 'formative_assessment',
-        'extended activities': 'extended_activities',
-        'review and reteach': 'review_reteach',
-        'reteach activities': 'review_reteach',
-        'early finishers': 'early_finishers'
-    }
-    
-    lines = response_text.split('\n')
-    current_section = None
-    current_text = []
-    
-    for line in lines:
-        line_lower = line.lower().strip()
-        found_section = False
-        
-        for keyword, section_key in section_mapping.items():
-            if keyword in line_lower and (line.startswith('#') or line.startswith('**') or line.endswith(':') or len(line) < 50):
-                if current_section and current_text:
-                    sections[current_section] = '\n'.join(current_text).strip()
-                current_section = section_key
-                current_text = []
-                found_section = True
-                break
-        
-        if not found_section and current_section:
-            current_text.append(line)
-    
-    # Save any remaining section
-    if current_section and current_text:
-        sections[current_section] = '\n'.join(current_text).strip()
+@router.post("/stream")
+async def stream_lesson_plan(plan_data: LessonPlanCreate, current_user: dict = Depends(get_current_user)):
+    """Generate a lesson plan, streaming each day as a Server-Sent Event as soon as it is ready"""
+    weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+    if not weekdays:
+        raise HTTPException(status_code=400, detail="No weekdays found in the date range")
     
-    # If parsing failed, store everything in teaching_lesson
-    if not any(sections.values()):
-        sections['teaching_lesson'] = response_text
+    return StreamingResponse(
+        stream_lesson_plan_events(db, plan_data, weekdays, current_user['id']),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_lesson_plan_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get the progress of a background lesson plan job"""
+    job = await job_queue.get(job_id, current_user['id'])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
     
-    return sections
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "days_completed": job['days_completed'],
+        "days_total": job['days_total'],
+        "lesson_plan_id": job.get('lesson_plan_id'),
+        "error": job.get('error')
+    }
 
 
 @router.get("", response_model=List[LessonPlan])
@@ -223,74 +129,128 @@ async def get_lesson_plan(plan_id: str, current_user: dict = Depends(get_current
     return plan
 
 
+@router.post("/{plan_id}/days/{day_date}/regenerate")
+async def regenerate_lesson_plan_day(plan_id: str, day_date: str, data: Optional[dict] = None, current_user: dict = Depends(get_current_user)):
+    """Regenerate one day of a lesson plan without touching the other days"""
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    try:
+        result = await regenerate_day_plan(plan, day_date, current_user['id'], (data or {}).get('state_standards'))
+    except Exception as e:
+        logging.error(f"Error regenerating lesson plan day: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error regenerating lesson plan day: {str(e)}")
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail="Day not found in lesson plan")
+    
+    # Replace only that element of daily_plans
+    idx, day_plan = result
+    await db.lesson_plans.update_one(
+        {"id": plan_id, "user_id": current_user['id'], "daily_plans.day_date": day_date},
+        {"$set": {"daily_plans.$": day_plan.model_dump()}, "$inc": {"version": 1}}
+    )
+    await refresh_plan_extraction(db, plan_id)
+    
+    return {"index": idx, "day_plan": day_plan}
+
+
+@router.post("/{plan_id}/resume")
+async def resume_lesson_plan(plan_id: str, current_user: dict = Depends(get_current_user)):
+    """Generate the days still missing from a partially generated lesson plan"""
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    if plan.get('generation_state', 'complete') == 'complete':
+        raise HTTPException(status_code=400, detail="Lesson plan is already fully generated")
+    
+    plan_data = plan_request_from_plan(plan)
+    weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+    
+    try:
+        plan = await generate_plan_days(db, plan_id, plan_data, weekdays, current_user['id'])
+    except LessonPlanGenerationError as e:
+        logging.error(f"Error resuming lesson plan: {str(e)}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"Error generating lesson plan: {str(e)}",
+            "failed_days": e.failures,
+            "lesson_plan_id": plan_id
+        })
+    except Exception as e:
+        logging.error(f"Error resuming lesson plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
+    
+    return LessonPlan(**plan)
+
+
+@router.post("/{plan_id}/clone")
+async def clone_lesson_plan_to_dates(plan_id: str, data: dict, current_user: dict = Depends(get_current_user)):
+    """Copy a lesson plan onto a new date range; only days beyond the original are generated"""
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    try:
+        weekdays = get_weekdays_between(data.get('start_date', ''), data.get('end_date', ''))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD dates")
+    
+    if not weekdays:
+        raise HTTPException(status_code=400, detail="No weekdays found in the date range")
+    
+    try:
+        clone = await clone_lesson_plan(db, plan, current_user['id'], weekdays)
+    except LessonPlanGenerationError as e:
+        logging.error(f"Error cloning lesson plan: {str(e)}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"Error generating lesson plan: {str(e)}",
+            "failed_days": e.failures,
+            "lesson_plan_id": e.plan_id
+        })
+    except Exception as e:
+        logging.error(f"Error cloning lesson plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error cloning lesson plan: {str(e)}")
+    
+    return LessonPlan(**clone)
+
+
 @router.delete("/{plan_id}")
 async def delete_lesson_plan(plan_id: str, current_user: dict = Depends(get_current_user)):
     """Delete a lesson plan"""
     result = await db.lesson_plans.delete_one({"id": plan_id, "user_id": current_user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
+    await asyncio.to_thread(docx_cache.discard, plan_id)
     return {"message": "Lesson plan deleted successfully"}
 
 
 @router.get("/{plan_id}/export")
-async def export_lesson_plan(plan_id: str, current_user: dict = Depends(get_current_user)):
+async def export_lesson_plan(plan_id: str, request: Request, current_user: dict = Depends(get_current_user)):
     """Export lesson plan to Word document"""
-    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    # Check the ETag against the version alone, so a repeat download skips loading the plan
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0, "id": 1, "version": 1})
     if not plan:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
     
-    # Create Word document
-    doc = Document()
-    
-    # Title
-    title = doc.add_heading('Lesson Plan', 0)
-    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+    if etag_matches(request.headers.get('if-none-match'), docx_etag(plan)):
+        return Response(status_code=304, headers={"ETag": docx_etag(plan), "Cache-Control": "private, no-cache"})
     
-    # Basic info
-    doc.add_paragraph(f"Textbook: {plan['textbook']}")
-    doc.add_paragraph(f"Lesson Range: {plan['lesson_range']}")
-    doc.add_paragraph(f"Date Range: {plan['start_date']} to {plan['end_date']}")
-    doc.add_paragraph(f"Next Major Assessment: {plan['next_major_assessment']}")
-    doc.add_paragraph('')
-    
-    # Daily plans
-    for day_plan in plan.get('daily_plans', []):
-        doc.add_heading(f"{day_plan['day_name']} - {day_plan['day_date']}", level=1)
-        
-        sections = [
-            ('Learner Outcomes/Objectives', day_plan.get('learner_outcomes', '')),
-            ('Standards', day_plan.get('standards', '')),
-            ('Materials Needed', day_plan.get('materials_needed', '')),
-            ('Anticipatory Set', day_plan.get('anticipatory_set', '')),
-            ('Teaching the Lesson', day_plan.get('teaching_lesson', '')),
-            ('Modeling', day_plan.get('modeling', '')),
-            ('Instructional Strategies', day_plan.get('instructional_strategies', '')),
-            ('Check for Understanding', day_plan.get('check_understanding', '')),
-            ('Guided Practice/Monitoring', day_plan.get('guided_practice', '')),
-            ('Independent Practice', day_plan.get('independent_practice', '')),
-            ('Closure', day_plan.get('closure', '')),
-            ('Summative Assessment', day_plan.get('summative_assessment', '')),
-            ('Formative Assessment', day_plan.get('formative_assessment', '')),
-            ('Extended Activities', day_plan.get('extended_activities', '')),
-            ('Review and Reteach Activities', day_plan.get('review_reteach', '')),
-            ('Early Finishers Activities', day_plan.get('early_finishers', ''))
-        ]
-        
-        for section_title, section_content in sections:
-            doc.add_heading(section_title, level=2)
-            doc.add_paragraph(section_content or 'N/A')
-        
-        doc.add_page_break()
-    
-    # Save to memory
-    file_stream = io.BytesIO()
-    doc.save(file_stream)
-    file_stream.seek(0)
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
     
+    file = await get_lesson_plan_docx(plan)
     return StreamingResponse(
-        file_stream,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f"attachment; filename=lesson_plan_{plan_id}.docx"}
+        iter_file(file),
+        media_type=DOCX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename=lesson_plan_{plan_id}.docx",
+            "Content-Length": str(file_size(file)),
+            "ETag": docx_etag(plan),
+            "Cache-Control": "private, no-cache"
+        }
     )
 
 
@@ -305,16 +265,16 @@ async def submit_lesson_plan(plan_id: str, current_user: dict = Depends(get_curr
     if plan.get('submission_status') == 'pending':
         raise HTTPException(status_code=400, detail="Plan already submitted for review")
     
+    if plan.get('generation_state', 'complete') != 'complete':
+        raise HTTPException(status_code=400, detail="Finish generating the lesson plan before submitting it")
+    
     # Update submission status
-    await db.lesson_plans.update_one(
-        {"id": plan_id},
-        {"$set": {
-            "submission_status": "pending",
-            "submitted_at": datetime.now(timezone.utc).isoformat(),
-            "admin_feedback": None,
-            "reviewed_at": None,
-            "reviewed_by": None
-        }}
-    )
+    await update_plan_status(db, plan_id, {
+        "submission_status": "pending",
+        "submitted_at": datetime.now(timezone.utc).isoformat(),
+        "admin_feedback": None,
+        "reviewed_at": None,
+        "reviewed_by": None
+    })
     
     return {"message": "Lesson plan submitted for review"}
@@ -0,0 +1,27 @@
+"""Standards registry routes"""
+from fastapi import APIRouter, Depends
+from typing import Optional
+
+from utils.database import db
+from utils.auth import get_current_user
+from utils.standards import standards_registry, canonical_standard_prefix, canonical_grade
+
+router = APIRouter(prefix="/standards", tags=["Standards"])
+
+
+@router.get("")
+async def list_standards(state: Optional[str] = None, grade: Optional[str] = None, prefix: str = '',
+                         current_user: dict = Depends(get_current_user)):
+    """Registry standards under a code prefix (e.g. 7.G), with counts for the groups below it"""
+    catalog = await standards_registry.get_catalog(db, state if state is not None else current_user.get('state'))
+    grades = [canonical_grade(grade)] if grade else None
+    trie = catalog.trie(grades)
+    codes = trie.codes(prefix)
+    return {
+        "state": catalog.state,
+        "grades": grades or catalog.grades,
+        "prefix": canonical_standard_prefix(prefix),
+        "count": len(codes),
+        "standards": [catalog.describe(code, grades) for code in codes],
+        "groups": [{"prefix": group, "count": count} for group, count in trie.groups(prefix)]
+    }
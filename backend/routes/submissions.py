@@ -3,6 +3,7 @@ from fastapi import APIRouter, HTTPException
 
 from models.quiz import Assignment, StudentAnswer, Submission
 from utils.database import db
+from utils.quiz_cache import quiz_cache
 
 router = APIRouter(tags=["Submissions"])
 
@@ -25,6 +26,9 @@ async def create_assignment(data: dict):
         {"$set": {"status": "published"}}
     )
     
+    # The class will open the quiz within seconds; load it now so they hit a warm cache
+    await quiz_cache.warm(db, data['test_id'])
+    
     return assignment
 
 
@@ -41,8 +45,9 @@ async def get_student_assignments(student_id: str):
     # Get quiz details and check if completed
     result = []
     for assign in assignments:
-        quiz = await db.quizzes.find_one({"id": assign['test_id']}, {"_id": 0})
+        quiz = await quiz_cache.get(db, assign['test_id'])
         if quiz:
+            quiz = quiz.payload
             submission = await db.submissions.find_one({"test_id": quiz['id'], "student_id": student_id}, {"_id": 0})
             result.append({
                 **assign,
@@ -1,8 +1,8 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, Request, UploadFile, File, Form
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 import logging
 from pathlib import Path
@@ -12,22 +12,40 @@ import uuid
 from datetime import datetime, timezone, timedelta
 from passlib.context import CryptContext
 import jwt
-import json
-from emergentintegrations.llm.chat import LlmChat, UserMessage
-from docx import Document
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
-import io
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse, Response
+
+from models.lesson_plan import LessonPlan, LessonPlanCreate, BulkLessonPlanCreate
+from models.quiz import SimilarQuestionsRequest
+from utils.database import client, db  # MongoDB connection, shared with the utils modules
+from utils.lesson_generation import (
+    create_draft_plan, generate_plan_days, plan_request_from_plan, stream_lesson_plan_events,
+    regenerate_day_plan, clone_lesson_plan, bulk_generate_lesson_plans, LessonPlanGenerationError
+)
+from utils.jobs import LessonPlanJobQueue, JobQueueFull
+from utils.llm import send_llm_message, llm_cache, llm_clients, llm_scheduler, llm_metrics
+from utils.llm_metrics import LlmUsageMiddleware
+from utils.question_bank import (
+    generate_questions_with_bank, add_to_question_bank, backfill_question_bank, find_similar_questions,
+    ensure_question_bank_indexes, question_bank_similarity, QUESTION_GENERATION_MODES
+)
+from utils.question_similarity import QUESTION_SIMILAR_THRESHOLD
+from utils.quiz_cache import quiz_cache
+from utils.standards import (
+    standards_registry, ensure_standards_indexes, parse_standards_file, import_standards, compute_standards_coverage,
+    canonical_standard_code, canonical_standard_prefix, canonical_grade, standard_code_prefix
+)
+from utils.plan_extraction import (
+    get_plan_extraction, plan_extraction_response, refresh_plan_extraction, backfill_plan_extractions,
+    update_plan_status
+)
+from utils.docx_export import (
+    docx_exporter, docx_cache, get_lesson_plan_docx, docx_etag, etag_matches, iter_file, file_size, DOCX_MEDIA_TYPE,
+    stream_lesson_plans_zip, ZIP_MEDIA_TYPE
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -93,52 +111,6 @@ class User(BaseModel):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     last_login: Optional[datetime] = None
 
-class LessonPlanCreate(BaseModel):
-    textbook: str
-    start_date: str
-    end_date: str
-    lesson_range: str
-    next_major_assessment: str
-    state_standards: Optional[str] = None
-
-class DayPlan(BaseModel):
-    day_name: str  # e.g., "Monday", "Tuesday"
-    day_date: str  # e.g., "2025-01-15"
-    learner_outcomes: str
-    standards: str
-    materials_needed: str
-    anticipatory_set: str
-    teaching_lesson: str
-    modeling: str
-    instructional_strategies: str
-    check_understanding: str
-    guided_practice: str
-    independent_practice: str
-    closure: str
-    summative_assessment: str
-    formative_assessment: str
-    extended_activities: str
-    review_reteach: str
-    early_finishers: str
-
-class LessonPlan(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    user_id: str
-    textbook: str
-    start_date: str
-    end_date: str
-    lesson_range: str
-    next_major_assessment: str
-    daily_plans: List[DayPlan]
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    submission_status: str = "draft"  # draft, pending, approved, rejected
-    submitted_at: Optional[datetime] = None
-    reviewed_at: Optional[datetime] = None
-    admin_feedback: Optional[str] = None
-    reviewed_by: Optional[str] = None
-
 class AdminStats(BaseModel):
     total_users: int
     active_users: int
@@ -319,8 +291,11 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 
 # Lesson plan routes
+# Background lesson plan generation jobs (see utils/jobs.py)
+job_queue = LessonPlanJobQueue(db)
+
 @api_router.post("/lesson-plans")
-async def create_lesson_plan(plan_data: LessonPlanCreate, current_user: dict = Depends(get_current_user)):
+async def create_lesson_plan(plan_data: LessonPlanCreate, background: bool = False, current_user: dict = Depends(get_current_user)):
     try:
         # Get weekdays between start and end date
         weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
@@ -328,169 +303,65 @@ async def create_lesson_plan(plan_data: LessonPlanCreate, current_user: dict = D
         if not weekdays:
             raise HTTPException(status_code=400, detail="No weekdays found in the date range")
         
-        # Initialize Claude chat
-        api_key = os.environ.get('EMERGENT_LLM_KEY')
-        
-        daily_plans = []
+        # Queue the plan and return a job id right away; poll /lesson-plans/jobs/{job_id}
+        if background:
+            job = await job_queue.submit(current_user['id'], plan_data, len(weekdays))
+            return JSONResponse(status_code=202, content={
+                "job_id": job.id,
+                "status": job.status,
+                "days_total": job.days_total
+            })
         
-        # Generate plan for each day
-        for idx, day_info in enumerate(weekdays):
-            chat = LlmChat(
-                api_key=api_key,
-                session_id=f"lesson_plan_{current_user['id']}_{day_info['date']}",
-                system_message="You are an expert education consultant helping teachers create detailed daily lesson plans."
-            )
-            chat.with_model("anthropic", "claude-3-7-sonnet-20250219")
-            
-            state_standards_text = f"\nState Standards to Align With: {plan_data.state_standards}" if plan_data.state_standards else ""
-            
-            prompt = f"""Create a detailed lesson plan for {day_info['day_name']}, {day_info['date']} (Day {idx+1} of {len(weekdays)}) based on:
-
-Textbook: {plan_data.textbook}
-Lesson Range: {plan_data.lesson_range}
-Overall Date Range: {plan_data.start_date} to {plan_data.end_date}
-Next Major Assessment: {plan_data.next_major_assessment}{state_standards_text}
-
-Provide specific, actionable content for THIS DAY ONLY for each section:
-
-1. Learner Outcomes/Objectives
-2. Standards (include the relevant state standards provided above, formatted clearly)
-3. Materials Needed
-4. Anticipatory Set
-5. Teaching the Lesson
-6. Modeling
-7. Instructional Strategies
-8. Check for Understanding
-9. Guided Practice/Monitoring
-10. Independent Practice
-11. Closure
-12. Summative Assessment
-13. Formative Assessment
-14. Extended Activities
-15. Review and Reteach Activities
-16. Early Finishers Activities
-
-Make each section detailed and specific to day {idx+1}."""
-            
-            user_message = UserMessage(text=prompt)
-            response = await chat.send_message(user_message)
-            response_text = response if isinstance(response, str) else str(response)
-            
-            # Parse AI response into sections
-            sections = {
-                'learner_outcomes': '',
-                'standards': '',
-                'materials_needed': '',
-                'anticipatory_set': '',
-                'teaching_lesson': '',
-                'modeling': '',
-                'instructional_strategies': '',
-                'check_understanding': '',
-                'guided_practice': '',
-                'independent_practice': '',
-                'closure': '',
-                'summative_assessment': '',
-                'formative_assessment': '',
-                'extended_activities': '',
-                'review_reteach': '',
-                'early_finishers': ''
-            }
-            
-            # Simple section parsing
-            lines = response_text.split('\n')
-            current_section = None
-            current_text = []
-            
-            section_mapping = {
-                'learner outcomes': 'learner_outcomes',
-                'objectives': 'learner_outcomes',
-                'standards': 'standards',
-                'materials needed': 'materials_needed',
-                'anticipatory set': 'anticipatory_set',
-                'teaching the lesson': 'teaching_lesson',
-                'modeling': 'modeling',
-                'instructional strategies': 'instructional_strategies',
-                'check for understanding': 'check_understanding',
-                'guided practice': 'guided_practice',
-                'monitoring': 'guided_practice',
-                'independent practice': 'independent_practice',
-                'closure': 'closure',
-                'summative assessment': 'summative_assessment',
-                'formative assessment': 'formative_assessment',
-                'extended activities': 'extended_activities',
-                'review and reteach': 'review_reteach',
-                'reteach activities': 'review_reteach',
-                'early finishers': 'early_finishers'
-            }
-            
-            for line in lines:
-                line_lower = line.lower().strip()
-                found_section = False
-                
-                # Check if this line is a section header
-                for keyword, section_key in section_mapping.items():
-                    if keyword in line_lower and (line.startswith('#') or line.startswith('**') or line.endswith(':') or len(line) < 50):
-                        if current_section and current_text:
-                            sections[current_section] = '\n'.join(current_text).strip()
-                        current_section = section_key
-                        current_text = []
-                        found_section = True
-                        break
-                
-                if not found_section and current_section:
-                    current_text.append(line)
-            
-            # Save any remaining section
-            if current_section and current_text:
-                sections[current_section] = '\n'.join(current_text).strip()
-            
-            # If parsing failed, store everything in teaching_lesson
-            if not any(sections.values()):
-                sections['teaching_lesson'] = response_text
-            
-            day_plan = DayPlan(
-                day_name=day_info['day_name'],
-                day_date=day_info['date'],
-                learner_outcomes=sections['learner_outcomes'] or 'Content will be generated',
-                standards=sections['standards'] or 'Content will be generated',
-                materials_needed=sections['materials_needed'] or 'Content will be generated',
-                anticipatory_set=sections['anticipatory_set'] or 'Content will be generated',
-                teaching_lesson=sections['teaching_lesson'] or response_text,
-                modeling=sections['modeling'] or 'Content will be generated',
-                instructional_strategies=sections['instructional_strategies'] or 'Content will be generated',
-                check_understanding=sections['check_understanding'] or 'Content will be generated',
-                guided_practice=sections['guided_practice'] or 'Content will be generated',
-                independent_practice=sections['independent_practice'] or 'Content will be generated',
-                closure=sections['closure'] or 'Content will be generated',
-                summative_assessment=sections['summative_assessment'] or 'Not applicable for today (next major assessment: ' + plan_data.next_major_assessment + ')',
-                formative_assessment=sections['formative_assessment'] or 'Content will be generated',
-                extended_activities=sections['extended_activities'] or 'Content will be generated',
-                review_reteach=sections['review_reteach'] or 'Content will be generated',
-                early_finishers=sections['early_finishers'] or 'Content will be generated'
-            )
-            daily_plans.append(day_plan)
+        # Save an empty draft first so every generated day is checkpointed into it;
+        # if some days fail, POST /lesson-plans/{plan_id}/resume finishes the rest
+        lesson_plan = await create_draft_plan(db, current_user['id'], plan_data)
+        plan = await generate_plan_days(db, lesson_plan.id, plan_data, weekdays, current_user['id'])
         
-        # Create lesson plan
-        lesson_plan = LessonPlan(
-            user_id=current_user['id'],
-            textbook=plan_data.textbook,
-            start_date=plan_data.start_date,
-            end_date=plan_data.end_date,
-            lesson_range=plan_data.lesson_range,
-            next_major_assessment=plan_data.next_major_assessment,
-            daily_plans=daily_plans
+        return LessonPlan(**plan)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Lesson plan generation queue is full, please try again shortly",
+            headers={"Retry-After": "30"}
         )
-        
-        plan_dict = lesson_plan.model_dump()
-        plan_dict['created_at'] = plan_dict['created_at'].isoformat()
-        
-        await db.lesson_plans.insert_one(plan_dict)
-        
-        return lesson_plan
+    except LessonPlanGenerationError as e:
+        logging.error(f"Error creating lesson plan: {str(e)}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"Error generating lesson plan: {str(e)}",
+            "failed_days": e.failures,
+            "lesson_plan_id": e.plan_id
+        })
     except Exception as e:
         logging.error(f"Error creating lesson plan: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
 
+@api_router.post("/lesson-plans/stream")
+async def stream_lesson_plan(plan_data: LessonPlanCreate, current_user: dict = Depends(get_current_user)):
+    weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+    if not weekdays:
+        raise HTTPException(status_code=400, detail="No weekdays found in the date range")
+    
+    return StreamingResponse(
+        stream_lesson_plan_events(db, plan_data, weekdays, current_user['id']),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/lesson-plans/jobs/{job_id}")
+async def get_lesson_plan_job(job_id: str, current_user: dict = Depends(get_current_user)):
+    job = await job_queue.get(job_id, current_user['id'])
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "days_completed": job['days_completed'],
+        "days_total": job['days_total'],
+        "lesson_plan_id": job.get('lesson_plan_id'),
+        "error": job.get('error')
+    }
+
 @api_router.get("/lesson-plans", response_model=List[LessonPlan])
 async def get_lesson_plans(current_user: dict = Depends(get_current_user)):
     plans = await db.lesson_plans.find({"user_id": current_user['id']}, {"_id": 0}).sort("created_at", -1).to_list(1000)
@@ -512,73 +383,119 @@ async def get_lesson_plan(plan_id: str, current_user: dict = Depends(get_current
     
     return plan
 
+@api_router.post("/lesson-plans/{plan_id}/days/{day_date}/regenerate")
+async def regenerate_lesson_plan_day(plan_id: str, day_date: str, data: Optional[dict] = None, current_user: dict = Depends(get_current_user)):
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    try:
+        result = await regenerate_day_plan(plan, day_date, current_user['id'], (data or {}).get('state_standards'))
+    except Exception as e:
+        logging.error(f"Error regenerating lesson plan day: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error regenerating lesson plan day: {str(e)}")
+    
+    if result is None:
+        raise HTTPException(status_code=404, detail="Day not found in lesson plan")
+    
+    # Replace only that element of daily_plans
+    idx, day_plan = result
+    await db.lesson_plans.update_one(
+        {"id": plan_id, "user_id": current_user['id'], "daily_plans.day_date": day_date},
+        {"$set": {"daily_plans.$": day_plan.model_dump()}, "$inc": {"version": 1}}
+    )
+    await refresh_plan_extraction(db, plan_id)
+    
+    return {"index": idx, "day_plan": day_plan}
+
+@api_router.post("/lesson-plans/{plan_id}/resume")
+async def resume_lesson_plan(plan_id: str, current_user: dict = Depends(get_current_user)):
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    if plan.get('generation_state', 'complete') == 'complete':
+        raise HTTPException(status_code=400, detail="Lesson plan is already fully generated")
+    
+    plan_data = plan_request_from_plan(plan)
+    weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+    
+    try:
+        plan = await generate_plan_days(db, plan_id, plan_data, weekdays, current_user['id'])
+    except LessonPlanGenerationError as e:
+        logging.error(f"Error resuming lesson plan: {str(e)}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"Error generating lesson plan: {str(e)}",
+            "failed_days": e.failures,
+            "lesson_plan_id": plan_id
+        })
+    except Exception as e:
+        logging.error(f"Error resuming lesson plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating lesson plan: {str(e)}")
+    
+    return LessonPlan(**plan)
+
+@api_router.post("/lesson-plans/{plan_id}/clone")
+async def clone_lesson_plan_to_dates(plan_id: str, data: dict, current_user: dict = Depends(get_current_user)):
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
+    
+    try:
+        weekdays = get_weekdays_between(data.get('start_date', ''), data.get('end_date', ''))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD dates")
+    
+    if not weekdays:
+        raise HTTPException(status_code=400, detail="No weekdays found in the date range")
+    
+    try:
+        clone = await clone_lesson_plan(db, plan, current_user['id'], weekdays)
+    except LessonPlanGenerationError as e:
+        logging.error(f"Error cloning lesson plan: {str(e)}")
+        raise HTTPException(status_code=502, detail={
+            "message": f"Error generating lesson plan: {str(e)}",
+            "failed_days": e.failures,
+            "lesson_plan_id": e.plan_id
+        })
+    except Exception as e:
+        logging.error(f"Error cloning lesson plan: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error cloning lesson plan: {str(e)}")
+    
+    return LessonPlan(**clone)
+
 @api_router.delete("/lesson-plans/{plan_id}")
 async def delete_lesson_plan(plan_id: str, current_user: dict = Depends(get_current_user)):
     result = await db.lesson_plans.delete_one({"id": plan_id, "user_id": current_user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
+    await asyncio.to_thread(docx_cache.discard, plan_id)
     return {"message": "Lesson plan deleted successfully"}
 
 @api_router.get("/lesson-plans/{plan_id}/export")
-async def export_lesson_plan(plan_id: str, current_user: dict = Depends(get_current_user)):
-    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+async def export_lesson_plan(plan_id: str, request: Request, current_user: dict = Depends(get_current_user)):
+    # Check the ETag against the version alone, so a repeat download skips loading the plan
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0, "id": 1, "version": 1})
     if not plan:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
     
-    # Create Word document
-    doc = Document()
-    
-    # Title
-    title = doc.add_heading('Lesson Plan', 0)
-    title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    
-    # Basic info
-    doc.add_paragraph(f"Textbook: {plan['textbook']}")
-    doc.add_paragraph(f"Lesson Range: {plan['lesson_range']}")
-    doc.add_paragraph(f"Date Range: {plan['start_date']} to {plan['end_date']}")
-    doc.add_paragraph(f"Next Major Assessment: {plan['next_major_assessment']}")
-    doc.add_paragraph('')
+    if etag_matches(request.headers.get('if-none-match'), docx_etag(plan)):
+        return Response(status_code=304, headers={"ETag": docx_etag(plan), "Cache-Control": "private, no-cache"})
     
-    # Daily plans
-    for day_plan in plan.get('daily_plans', []):
-        doc.add_heading(f"{day_plan['day_name']} - {day_plan['day_date']}", level=1)
-        
-        sections = [
-            ('Learner Outcomes/Objectives', day_plan.get('learner_outcomes', '')),
-            ('Standards', day_plan.get('standards', '')),
-            ('Materials Needed', day_plan.get('materials_needed', '')),
-            ('Anticipatory Set', day_plan.get('anticipatory_set', '')),
-            ('Teaching the Lesson', day_plan.get('teaching_lesson', '')),
-            ('Modeling', day_plan.get('modeling', '')),
-            ('Instructional Strategies', day_plan.get('instructional_strategies', '')),
-            ('Check for Understanding', day_plan.get('check_understanding', '')),
-            ('Guided Practice/Monitoring', day_plan.get('guided_practice', '')),
-            ('Independent Practice', day_plan.get('independent_practice', '')),
-            ('Closure', day_plan.get('closure', '')),
-            ('Summative Assessment', day_plan.get('summative_assessment', '')),
-            ('Formative Assessment', day_plan.get('formative_assessment', '')),
-            ('**Extended Activities**', day_plan.get('extended_activities', '')),
-            ('**Review and Reteach Activities**', day_plan.get('review_reteach', '')),
-            ('**Early Finishers Activities**', day_plan.get('early_finishers', ''))
-        ]
-        
-        for section_title, section_content in sections:
-            heading = doc.add_heading(section_title, level=2)
-            if '**' in section_title:
-                heading.runs[0].bold = True
-            doc.add_paragraph(section_content or 'N/A')
-        
-        doc.add_page_break()
-    
-    # Save to memory
-    file_stream = io.BytesIO()
-    doc.save(file_stream)
-    file_stream.seek(0)
+    plan = await db.lesson_plans.find_one({"id": plan_id, "user_id": current_user['id']}, {"_id": 0})
+    if not plan:
+        raise HTTPException(status_code=404, detail="Lesson plan not found")
     
+    file = await get_lesson_plan_docx(plan)
     return StreamingResponse(
-        file_stream,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f"attachment; filename=lesson_plan_{plan_id}.docx"}
+        iter_file(file),
+        media_type=DOCX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f"attachment; filename=lesson_plan_{plan_id}.docx",
+            "Content-Length": str(file_size(file)),
+            "ETag": docx_etag(plan),
+            "Cache-Control": "private, no-cache"
+        }
     )
 
 # Lesson Plan Submission Routes
@@ -592,17 +509,17 @@ async def submit_lesson_plan(plan_id: str, current_user: dict = Depends(get_curr
     if plan.get('submission_status') == 'pending':
         raise HTTPException(status_code=400, detail="Plan already submitted for review")
     
+    if plan.get('generation_state', 'complete') != 'complete':
+        raise HTTPException(status_code=400, detail="Finish generating the lesson plan before submitting it")
+    
     # Update submission status
-    await db.lesson_plans.update_one(
-        {"id": plan_id},
-        {"$set": {
-            "submission_status": "pending",
-            "submitted_at": datetime.now(timezone.utc).isoformat(),
-            "admin_feedback": None,
-            "reviewed_at": None,
-            "reviewed_by": None
-        }}
-    )
+    await update_plan_status(db, plan_id, {
+        "submission_status": "pending",
+        "submitted_at": datetime.now(timezone.utc).isoformat(),
+        "admin_feedback": None,
+        "reviewed_at": None,
+        "reviewed_by": None
+    })
     
     return {"message": "Lesson plan submitted for review"}
 
@@ -654,6 +571,76 @@ async def get_all_lesson_plans(admin_user: dict = Depends(get_admin_user)):
     
     return all_plans
 
+@api_router.get("/admin/lesson-plans/export")
+async def export_lesson_plans_zip(
+    status: Optional[str] = None,
+    teacher_id: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """Admin downloads a ZIP of Word exports for the plans matching the filters"""
+    admin = await db.users.find_one({"id": admin_user['id']}, {"_id": 0})
+    supervised_ids = admin.get('supervised_teacher_ids', [])
+    
+    query = {}
+    if supervised_ids:
+        query["user_id"] = {"$in": supervised_ids}
+    if teacher_id:
+        if supervised_ids and teacher_id not in supervised_ids:
+            raise HTTPException(status_code=403, detail="You can only export plans of teachers you supervise")
+        query["user_id"] = teacher_id
+    if status:
+        if status not in ['draft', 'pending', 'approved', 'rejected']:
+            raise HTTPException(status_code=400, detail="Invalid status")
+        query["submission_status"] = status
+    # Plans whose date range overlaps [start_date, end_date]
+    if start_date:
+        query["end_date"] = {"$gte": start_date}
+    if end_date:
+        query["start_date"] = {"$lte": end_date}
+    
+    if not await db.lesson_plans.count_documents(query):
+        raise HTTPException(status_code=404, detail="No lesson plans match the filters")
+    
+    filename = f"lesson_plans_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_lesson_plans_zip(db, query),
+        media_type=ZIP_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@api_router.post("/admin/lesson-plans/bulk-generate")
+async def bulk_generate_lesson_plans_for_teachers(plan_data: BulkLessonPlanCreate, admin_user: dict = Depends(get_admin_user)):
+    teacher_ids = list(dict.fromkeys(plan_data.teacher_ids))
+    if not teacher_ids:
+        raise HTTPException(status_code=400, detail="teacher_ids is required")
+    
+    teachers = await db.users.find({"id": {"$in": teacher_ids}, "role": "teacher"}, {"_id": 0, "id": 1}).to_list(len(teacher_ids))
+    unknown = sorted(set(teacher_ids) - {t['id'] for t in teachers})
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown teacher ids: {', '.join(unknown)}")
+    
+    # Admins with a supervision list can only generate for their own teachers
+    admin = await db.users.find_one({"id": admin_user['id']}, {"_id": 0})
+    supervised_ids = admin.get('supervised_teacher_ids', []) if admin else []
+    if supervised_ids and not set(teacher_ids) <= set(supervised_ids):
+        raise HTTPException(status_code=403, detail="You can only generate plans for teachers you supervise")
+    
+    try:
+        weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start_date and end_date must be YYYY-MM-DD dates")
+    
+    if not weekdays:
+        raise HTTPException(status_code=400, detail="No weekdays found in the date range")
+    
+    try:
+        return await bulk_generate_lesson_plans(db, plan_data, weekdays, admin_user['id'])
+    except Exception as e:
+        logging.error(f"Error bulk generating lesson plans: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error generating lesson plans: {str(e)}")
+
 @api_router.post("/admin/lesson-plans/{plan_id}/review")
 async def review_lesson_plan(
     plan_id: str, 
@@ -672,15 +659,12 @@ async def review_lesson_plan(
         raise HTTPException(status_code=400, detail="Invalid status")
     
     # Update lesson plan
-    await db.lesson_plans.update_one(
-        {"id": plan_id},
-        {"$set": {
-            "submission_status": status,
-            "admin_feedback": feedback,
-            "reviewed_at": datetime.now(timezone.utc).isoformat(),
-            "reviewed_by": admin_user['id']
-        }}
-    )
+    await update_plan_status(db, plan_id, {
+        "submission_status": status,
+        "admin_feedback": feedback,
+        "reviewed_at": datetime.now(timezone.utc).isoformat(),
+        "reviewed_by": admin_user['id']
+    })
     
     return {"message": f"Lesson plan {status}"}
 
@@ -842,91 +826,12 @@ async def delete_class(class_id: str, current_user: dict = Depends(get_current_u
 async def extract_objectives(data: dict, current_user: dict = Depends(get_current_user)):
     lesson_plan_id = data.get('lesson_plan_id')
     
-    # Get lesson plan
-    plan = await db.lesson_plans.find_one({"id": lesson_plan_id, "user_id": current_user['id']}, {"_id": 0})
-    if not plan:
+    # Objectives and standards are extracted once per plan version and stored on the plan
+    extracted = await get_plan_extraction(db, {"id": lesson_plan_id, "user_id": current_user['id']})
+    if extracted is None:
         raise HTTPException(status_code=404, detail="Lesson plan not found")
     
-    # Extract objectives and collect all standards
-    objectives = []
-    all_standards_text = []
-    
-    for day_plan in plan.get('daily_plans', []):
-        # Collect standards from the standards field
-        standards_text = day_plan.get('standards', '')
-        if standards_text and 'see full plan below' not in standards_text.lower():
-            all_standards_text.append(standards_text)
-        
-        # ALSO check teaching_lesson field for "2. Standards" or "### 2. Standards" section
-        teaching_lesson = day_plan.get('teaching_lesson', '')
-        if teaching_lesson and '2. Standards' in teaching_lesson:
-            # Extract the standards section from teaching_lesson
-            import re
-            # Look for "### 2. Standards" or "2. Standards" followed by content until next section
-            standards_section_pattern = r'(?:###\s*)?2\.\s*Standards?\s*\n(.*?)(?=\n(?:###\s*)?\d+\.|$)'
-            match = re.search(standards_section_pattern, teaching_lesson, re.IGNORECASE | re.DOTALL)
-            if match:
-                all_standards_text.append(match.group(1))
-        
-        if day_plan.get('learner_outcomes'):
-            # Parse objectives (split by line, bullet points, or numbers)
-            text = day_plan['learner_outcomes']
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            for line in lines:
-                clean_line = line.lstrip('•-*123456789.() ').strip()
-                if len(clean_line) > 10:
-                    objectives.append({
-                        'id': str(uuid.uuid4()),
-                        'text': clean_line,
-                        'day': day_plan['day_name'],
-                        'date': day_plan['day_date'],
-                        'selected': True
-                    })
-    
-    # Parse and deduplicate standards - extract only standard numbers/codes
-    import re
-    unique_standards = set()
-    for standards_text in all_standards_text:
-        # Skip placeholder text
-        if 'see full plan below' in standards_text.lower() or 'content will be generated' in standards_text.lower():
-            continue
-        
-        # Split by lines to process each standard separately
-        lines = standards_text.split('\n')
-        for line in lines:
-            # Look for standard codes at the beginning of lines (before colons or descriptions)
-            # Matches: 7.G.1, MS.SS.7.3, CCSS.ELA-LITERACY.RI.RH.6-8.2, etc.
-            
-            # Pattern 1: Standard code before a colon (e.g., "7.G.1: Description")
-            colon_pattern = r'^[\s\-\*\•]*([A-Z0-9][A-Z0-9\.\-]+[0-9A-Z])(?:\s*[:)]|$)'
-            match = re.match(colon_pattern, line.strip(), re.IGNORECASE)
-            if match:
-                code = match.group(1).strip()
-                if re.search(r'\d', code) and '.' in code:  # Must have digit and dot
-                    unique_standards.add(code)
-                continue
-            
-            # Pattern 2: Standard codes in brackets or bold (e.g., "**7.G.2**")
-            bracket_pattern = r'[\[\*]+([A-Z0-9][A-Z0-9\.\-]+[0-9A-Z])[\]\*]+'
-            matches = re.findall(bracket_pattern, line, re.IGNORECASE)
-            for code in matches:
-                if re.search(r'\d', code) and '.' in code:
-                    unique_standards.add(code.strip())
-    
-    # Create standards list
-    standards_list = [
-        {
-            'id': str(uuid.uuid4()),
-            'text': std,
-            'selected': True
-        }
-        for std in sorted(unique_standards)
-    ]
-    
-    return {
-        "objectives": objectives,
-        "standards": standards_list
-    }
+    return plan_extraction_response(extracted)
 
 @api_router.post("/quizzes/generate-questions")
 async def generate_questions(data: dict, current_user: dict = Depends(get_current_user)):
@@ -936,67 +841,35 @@ async def generate_questions(data: dict, current_user: dict = Depends(get_curren
     if not standards_data:
         raise HTTPException(status_code=400, detail="No standards provided")
     
-    # Initialize Claude
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=f"quiz_gen_{current_user['id']}_{datetime.now(timezone.utc).isoformat()}",
-        system_message="You are an expert education assessment creator. Generate high-quality multiple choice questions aligned with state educational standards."
-    )
-    chat.with_model("anthropic", "claude-3-7-sonnet-20250219")
-    
-    all_questions = []
+    # 'generate' always asks the LLM; 'bank_first' reuses banked questions for the standard first
+    mode = data.get('mode', 'generate')
+    if mode not in QUESTION_GENERATION_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(QUESTION_GENERATION_MODES)}")
     
-    for standard_code in standards_data:
-        prompt = f"""Generate {count} multiple choice questions to assess student understanding of this educational standard:
-
-Standard: {standard_code}
-
-For each question:
-1. Make it grade-appropriate and aligned with the standard
-2. Provide exactly 4 answer options
-3. Indicate which option (0-3) is correct
-4. Ensure distractors are plausible but clearly wrong
-5. Questions should test knowledge, comprehension, or application related to this standard
-
-Return ONLY a JSON array in this exact format:
-[
-  {{
-    "question_text": "question here",
-    "options": ["option 1", "option 2", "option 3", "option 4"],
-    "correct_answer": 0,
-    "skill": "{standard_code}"
-  }}
-]
-
-Return ONLY the JSON array, no other text."""
-
-        user_message = UserMessage(text=prompt)
-        response = await chat.send_message(user_message)
-        response_text = response if isinstance(response, str) else str(response)
-        
-        # Parse JSON response
-        try:
-            # Clean response
-            json_start = response_text.find('[')
-            json_end = response_text.rfind(']') + 1
-            if json_start != -1 and json_end > json_start:
-                json_text = response_text[json_start:json_end]
-                questions = json.loads(json_text)
-                
-                for q in questions:
-                    all_questions.append({
-                        'id': str(uuid.uuid4()),
-                        'question_text': q['question_text'],
-                        'options': q['options'],
-                        'correct_answer': q['correct_answer'],
-                        'skill': standard_code
-                    })
-        except Exception as e:
-            logging.error(f"Error parsing questions: {str(e)}")
-            continue
+    bypass_cache = data.get('bypass_cache', False)
+    session_prefix = f"quiz_gen_{current_user['id']}_{datetime.now(timezone.utc).isoformat()}"
     
-    return {"questions": all_questions}
+    questions, failures, from_bank = await generate_questions_with_bank(
+        db, standards_data, count, current_user['id'], session_prefix, bypass_cache=bypass_cache, mode=mode
+    )
+    if failures and not questions:
+        raise HTTPException(status_code=500, detail=f"Error generating questions: {next(iter(failures.values()))}")
+    
+    return {"questions": questions, "failed_standards": failures, "from_bank": from_bank}
+
+@api_router.post("/quizzes/question-bank/similar")
+async def get_similar_bank_questions(data: SimilarQuestionsRequest, current_user: dict = Depends(get_current_user)):
+    if not data.question_text:
+        raise HTTPException(status_code=400, detail="question_text is required")
+    
+    similar = await find_similar_questions(
+        db,
+        {'question_text': data.question_text, 'options': data.options},
+        standard_code=data.standard,
+        threshold=QUESTION_SIMILAR_THRESHOLD if data.threshold is None else data.threshold,
+        limit=min(max(data.limit, 1), 50)
+    )
+    return {"similar": similar}
 
 @api_router.post("/quizzes")
 async def create_quiz(data: dict, current_user: dict = Depends(get_current_user)):
@@ -1012,6 +885,11 @@ async def create_quiz(data: dict, current_user: dict = Depends(get_current_user)
     quiz_dict['created_at'] = quiz_dict['created_at'].isoformat()
     await db.quizzes.insert_one(quiz_dict)
     
+    try:
+        await add_to_question_bank(db, quiz_dict['questions'], 'quiz', current_user['id'], quiz_id=quiz.id)
+    except Exception as e:
+        logging.warning(f"Could not add quiz questions to the question bank: {str(e)}")
+    
     return quiz
 
 @api_router.get("/quizzes")
@@ -1021,10 +899,11 @@ async def get_quizzes(current_user: dict = Depends(get_current_user)):
 
 @api_router.get("/quizzes/{quiz_id}")
 async def get_quiz(quiz_id: str):
-    quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+    # Students open an assigned quiz all at once: served from the cache, without answers
+    quiz = await quiz_cache.get(db, quiz_id)
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
-    return quiz
+    return Response(content=quiz.body, media_type="application/json")
 
 @api_router.put("/quizzes/{quiz_id}")
 async def update_quiz(quiz_id: str, data: dict, current_user: dict = Depends(get_current_user)):
@@ -1034,6 +913,7 @@ async def update_quiz(quiz_id: str, data: dict, current_user: dict = Depends(get
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Quiz not found")
+    quiz_cache.invalidate(quiz_id)
     return {"message": "Quiz updated successfully"}
 
 @api_router.delete("/quizzes/{quiz_id}")
@@ -1041,6 +921,7 @@ async def delete_quiz(quiz_id: str, current_user: dict = Depends(get_current_use
     result = await db.quizzes.delete_one({"id": quiz_id, "teacher_id": current_user['id']})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Quiz not found")
+    quiz_cache.invalidate(quiz_id)
     return {"message": "Quiz deleted successfully"}
 
 # Assignment Routes
@@ -1061,6 +942,9 @@ async def create_assignment(data: dict, current_user: dict = Depends(get_current
         {"$set": {"status": "published"}}
     )
     
+    # The class will open the quiz within seconds; load it now so they hit a warm cache
+    await quiz_cache.warm(db, data['test_id'])
+    
     return assignment
 
 @api_router.get("/assignments/student/{student_id}")
@@ -1075,8 +959,9 @@ async def get_student_assignments(student_id: str):
     # Get quiz details and check if completed
     result = []
     for assign in assignments:
-        quiz = await db.quizzes.find_one({"id": assign['test_id']}, {"_id": 0})
+        quiz = await quiz_cache.get(db, assign['test_id'])
         if quiz:
+            quiz = quiz.payload
             submission = await db.submissions.find_one({"test_id": quiz['id'], "student_id": student_id}, {"_id": 0})
             result.append({
                 **assign,
@@ -1158,6 +1043,23 @@ async def submit_quiz(data: dict):
     return submission
 
 # Analytics Routes
+@api_router.get("/standards")
+async def list_standards(state: Optional[str] = None, grade: Optional[str] = None, prefix: str = '',
+                         current_user: dict = Depends(get_current_user)):
+    """Registry standards under a code prefix (e.g. 7.G), with counts for the groups below it"""
+    catalog = await standards_registry.get_catalog(db, state if state is not None else current_user.get('state'))
+    grades = [canonical_grade(grade)] if grade else None
+    trie = catalog.trie(grades)
+    codes = trie.codes(prefix)
+    return {
+        "state": catalog.state,
+        "grades": grades or catalog.grades,
+        "prefix": canonical_standard_prefix(prefix),
+        "count": len(codes),
+        "standards": [catalog.describe(code, grades) for code in codes],
+        "groups": [{"prefix": group, "count": count} for group, count in trie.groups(prefix)]
+    }
+
 @api_router.get("/analytics/class/{class_id}")
 async def get_class_analytics(class_id: str, current_user: dict = Depends(get_current_user)):
     # Get all submissions for this class
@@ -1257,14 +1159,6 @@ async def get_remediation_suggestions(data: dict, current_user: dict = Depends(g
     student_names = data.get('student_names', [])
     
     # Generate AI suggestions
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    chat = LlmChat(
-        api_key=api_key,
-        session_id=f"remediation_{current_user['id']}_{datetime.now(timezone.utc).isoformat()}",
-        system_message="You are an expert education interventionist providing targeted remediation strategies."
-    )
-    chat.with_model("anthropic", "claude-3-7-sonnet-20250219")
-    
     prompt = f"""Provide exactly 5 specific, actionable remediation activities for students struggling with the following standard/skill:
 
 Standard/Skill: {skill}
@@ -1281,9 +1175,14 @@ Requirements for EACH of the 5 activities:
 
 Format: Return exactly 5 activities as a clear numbered list (1-5). Each activity should be 2-3 sentences."""
 
-    user_message = UserMessage(text=prompt)
-    response = await chat.send_message(user_message)
-    response_text = response if isinstance(response, str) else str(response)
+    response_text = await send_llm_message(
+        session_id=f"remediation_{current_user['id']}_{datetime.now(timezone.utc).isoformat()}",
+        system_message="You are an expert education interventionist providing targeted remediation strategies.",
+        prompt=prompt,
+        bypass_cache=data.get('bypass_cache', False),
+        user_id=current_user['id'],
+        call_site="remediation"
+    )
     
     return {"skill": skill, "suggestions": response_text}
 
@@ -1518,7 +1417,7 @@ async def get_student_profile(student_id: str, current_user: dict = Depends(get_
 
 # Enhanced Groupings View
 @api_router.get("/analytics/groupings/{class_id}")
-async def get_groupings(class_id: str, current_user: dict = Depends(get_current_user)):
+async def get_groupings(class_id: str, level: Optional[int] = None, current_user: dict = Depends(get_current_user)):
     # Get class info
     class_data = await db.classes.find_one({"id": class_id}, {"_id": 0})
     if not class_data:
@@ -1535,9 +1434,11 @@ async def get_groupings(class_id: str, current_user: dict = Depends(get_current_
     student_map = {s['id']: s for s in students}
     
     # Calculate standards performance per student
+    # Codes are canonicalized ("7.g.1 " is 7.G.1); `level` rolls them up to a prefix (level=2 groups by 7.G)
     standards_data = {}
     for sub in submissions:
         for standard, breakdown in sub.get('skills_breakdown', {}).items():
+            standard = (standard_code_prefix(standard, level) if level else canonical_standard_code(standard)) or standard
             if standard not in standards_data:
                 standards_data[standard] = {}
             
@@ -1730,6 +1631,7 @@ async def get_test_results_reports(admin_user: dict = Depends(get_admin_user)):
             standards_data = {}
             for sub in student_submissions:
                 for standard, breakdown in sub.get('skills_breakdown', {}).items():
+                    standard = canonical_standard_code(standard) or standard
                     if standard not in standards_data:
                         standards_data[standard] = {'correct': 0, 'total': 0}
                     standards_data[standard]['correct'] += breakdown['correct']
@@ -1784,17 +1686,18 @@ async def get_test_results_reports(admin_user: dict = Depends(get_admin_user)):
 
 # Standards Coverage Tracker
 @api_router.get("/analytics/standards-coverage")
-async def get_standards_coverage(timeframe: str = 'quarter', current_user: dict = Depends(get_current_user)):
-    """Track which standards have been assessed"""
+async def get_standards_coverage(timeframe: str = 'quarter', grade: Optional[str] = None, state: Optional[str] = None,
+                                 prefix: str = '', current_user: dict = Depends(get_current_user)):
+    """Track which standards have been assessed, and the gaps against the standards registry"""
     
     # Get all quizzes for this teacher
-    quizzes = await db.quizzes.find({"teacher_id": current_user['id']}, {"_id": 0}).to_list(1000)
+    quizzes = await db.quizzes.find({"teacher_id": current_user['id']}, {"_id": 0, "id": 1, "questions.skill": 1}).to_list(1000)
     
-    # Extract all unique standards that have been assessed
+    # Extract all unique standards that have been assessed, by canonical code
     assessed_standards = {}
     for quiz in quizzes:
         for question in quiz.get('questions', []):
-            standard = question.get('skill')
+            standard = canonical_standard_code(question.get('skill'))
             if standard:
                 if standard not in assessed_standards:
                     assessed_standards[standard] = {'times_assessed': 0, 'total_score': 0, 'count': 0}
@@ -1802,41 +1705,26 @@ async def get_standards_coverage(timeframe: str = 'quarter', current_user: dict
     
     # Get submissions to calculate average scores per standard
     quiz_ids = [q['id'] for q in quizzes]
-    submissions = await db.submissions.find({"test_id": {"$in": quiz_ids}}, {"_id": 0}).to_list(10000)
+    submissions = await db.submissions.find({"test_id": {"$in": quiz_ids}}, {"_id": 0, "skills_breakdown": 1}).to_list(10000)
     
     for sub in submissions:
         for standard, breakdown in sub.get('skills_breakdown', {}).items():
+            standard = canonical_standard_code(standard)
             if standard in assessed_standards:
                 percentage = (breakdown['correct'] / breakdown['total'] * 100) if breakdown['total'] > 0 else 0
                 assessed_standards[standard]['total_score'] += percentage
                 assessed_standards[standard]['count'] += 1
     
-    # Calculate averages
-    assessed_list = []
-    for standard, data in assessed_standards.items():
-        avg_score = (data['total_score'] / data['count']) if data['count'] > 0 else 0
-        assessed_list.append({
-            'standard': standard,
-            'times_assessed': data['times_assessed'],
-            'average_score': avg_score
-        })
-    
-    # Sort by standard code
-    assessed_list.sort(key=lambda x: x['standard'])
-    
-    # TODO: Get full list of standards for grade level to identify gaps
-    # For now, just return what we have
-    not_assessed = []  # Would need grade-level standards list
+    # Gaps are measured against the registry for the teacher's state; without a grade,
+    # against the grades whose standards the teacher has assessed
+    catalog = await standards_registry.get_catalog(db, state if state is not None else current_user.get('state'))
+    grades = [canonical_grade(grade)] if grade else catalog.grades_for(assessed_standards)
+    trie = catalog.trie(grades) if grades else None
     
-    coverage_percentage = 100  # Would calculate based on total standards
-    
-    return {
-        'assessed': assessed_list,
-        'assessed_count': len(assessed_list),
-        'not_assessed': not_assessed,
-        'not_assessed_count': len(not_assessed),
-        'coverage_percentage': coverage_percentage
-    }
+    coverage = compute_standards_coverage(assessed_standards, trie, prefix)
+    coverage['state'] = catalog.state
+    coverage['grades'] = grades
+    return coverage
 
 # At-Risk Students Alerts
 @api_router.get("/analytics/at-risk-students")
@@ -2121,6 +2009,63 @@ async def get_admin_stats(admin_user: dict = Depends(get_admin_user)):
         total_lesson_plans=total_lesson_plans
     )
 
+@api_router.get("/admin/llm-cache/stats")
+async def get_llm_cache_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get LLM response cache hit/miss counters"""
+    return llm_cache.get_stats()
+
+@api_router.get("/admin/quiz-cache/stats")
+async def get_quiz_cache_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get student quiz cache hit/miss counters"""
+    return quiz_cache.get_stats()
+
+@api_router.get("/admin/llm-clients/stats")
+async def get_llm_client_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get LLM client counters (chats created, models in use)"""
+    return llm_clients.get_stats()
+
+@api_router.get("/admin/llm-scheduler/stats")
+async def get_llm_scheduler_stats(admin_user: dict = Depends(get_admin_user)):
+    """Get LLM concurrency, per-teacher queue depth and wait times"""
+    return llm_scheduler.get_stats()
+
+@api_router.get("/admin/llm-metrics")
+async def get_llm_metrics(format: str = "json", admin_user: dict = Depends(get_admin_user)):
+    """LLM latency/token histograms and error rates per call site; ?format=prometheus for scraping"""
+    if format == "prometheus":
+        return PlainTextResponse(llm_metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+    return llm_metrics.get_stats()
+
+@api_router.post("/admin/question-bank/backfill")
+async def backfill_question_bank_from_quizzes(admin_user: dict = Depends(get_admin_user)):
+    """Add the questions of every saved quiz to the question bank (safe to repeat)"""
+    result = await backfill_question_bank(db)
+    result['bank_size'] = await db.question_bank.count_documents({})
+    return result
+
+@api_router.post("/admin/lesson-plans/backfill-objectives")
+async def backfill_lesson_plan_objectives(admin_user: dict = Depends(get_admin_user)):
+    """Store extracted objectives and standards on every plan missing them (safe to repeat)"""
+    return await backfill_plan_extractions(db)
+
+@api_router.post("/admin/standards/import")
+async def import_standards_file(file: UploadFile = File(...), state: Optional[str] = Form(None), grade: Optional[str] = Form(None),
+                                subject: Optional[str] = Form(None), replace: bool = Form(False),
+                                admin_user: dict = Depends(get_admin_user)):
+    """Import standards from a CSV or JSON file into the registry"""
+    file_format = 'json' if (file.filename or '').lower().endswith('.json') or file.content_type == 'application/json' else 'csv'
+    try:
+        standards, errors = parse_standards_file(await file.read(), file_format, state, grade, subject)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read standards file: {str(e)}")
+    if not standards:
+        raise HTTPException(status_code=400, detail=f"No valid standards in file ({len(errors)} rows rejected)")
+    
+    result = await import_standards(db, standards, replace=replace)
+    result['rejected'] = len(errors)
+    result['errors'] = errors[:100]
+    return result
+
 @api_router.get("/admin/users")
 async def get_all_users(admin_user: dict = Depends(get_admin_user)):
     users = await db.users.find({"role": "teacher"}, {"_id": 0, "password": 0}).to_list(1000)
@@ -2168,6 +2113,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Logs one line per request summarising its LLM calls (see utils/llm_metrics.py)
+app.add_middleware(LlmUsageMiddleware, metrics=llm_metrics)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -2175,6 +2123,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def start_job_queue():
+    await job_queue.start()
+
+@app.on_event("startup")
+async def prepare_question_bank():
+    await ensure_question_bank_indexes(db)
+    await question_bank_similarity.refresh(db)
+
+@app.on_event("startup")
+async def create_standards_indexes():
+    await ensure_standards_indexes(db)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await job_queue.stop()
+    docx_exporter.shutdown()
     client.close()
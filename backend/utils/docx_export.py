@@ -0,0 +1,499 @@
+"""Word (DOCX) export of lesson plans, rendered off the event loop"""
+import asyncio
+import io
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from copy import deepcopy
+from pathlib import Path
+from tempfile import SpooledTemporaryFile
+
+from docx import Document
+from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from docx.oxml import OxmlElement
+
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+ZIP_MEDIA_TYPE = "application/zip"
+
+DOCX_EXPORT_EXECUTOR = os.environ.get('DOCX_EXPORT_EXECUTOR', 'thread')
+DOCX_EXPORT_WORKERS = int(os.environ.get('DOCX_EXPORT_WORKERS', 4))
+DOCX_SPOOL_MAX_BYTES = int(os.environ.get('DOCX_SPOOL_MAX_BYTES', 1024 * 1024))
+DOCX_STREAM_CHUNK_BYTES = 64 * 1024
+DOCX_CACHE_ENABLED = os.environ.get('DOCX_CACHE_ENABLED', 'true').lower() == 'true'
+DOCX_CACHE_DIR = os.environ.get('DOCX_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'lesson_plan_docx_cache'))
+DOCX_CACHE_MAX_BYTES = int(os.environ.get('DOCX_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+DOCX_TEMPLATE_PATH = os.environ.get('DOCX_TEMPLATE_PATH') or None
+
+# Bump when the rendered layout changes so cached exports and ETags from the old layout go stale
+DOCX_RENDER_VERSION = 2
+
+# (heading, DayPlan field, bold heading)
+DOCX_DAY_SECTIONS = [
+    ('Learner Outcomes/Objectives', 'learner_outcomes', False),
+    ('Standards', 'standards', False),
+    ('Materials Needed', 'materials_needed', False),
+    ('Anticipatory Set', 'anticipatory_set', False),
+    ('Teaching the Lesson', 'teaching_lesson', False),
+    ('Modeling', 'modeling', False),
+    ('Instructional Strategies', 'instructional_strategies', False),
+    ('Check for Understanding', 'check_understanding', False),
+    ('Guided Practice/Monitoring', 'guided_practice', False),
+    ('Independent Practice', 'independent_practice', False),
+    ('Closure', 'closure', False),
+    ('Summative Assessment', 'summative_assessment', False),
+    ('Formative Assessment', 'formative_assessment', False),
+    ('Extended Activities', 'extended_activities', True),
+    ('Review and Reteach Activities', 'review_reteach', True),
+    ('Early Finishers Activities', 'early_finishers', True)
+]
+
+_RUN_SPECIAL_CHARS = re.compile(r'[\t\n\r]')
+
+
+def _run(text: str, bold: bool = False):
+    """A <w:r> holding `text`, built directly rather than through the python-docx object layer"""
+    run = OxmlElement('w:r')
+    if bold:
+        properties = OxmlElement('w:rPr')
+        properties.append(OxmlElement('w:b'))
+        run.append(properties)
+    if _RUN_SPECIAL_CHARS.search(text):
+        # Tabs and line breaks become <w:tab/> and <w:br/>
+        run.text = text
+    else:
+        run.add_t(text)
+    return run
+
+
+class DocxTemplate:
+    """A pre-styled document loaded once per process and filled in per export.
+
+    The styling API (style lookups by name, alignment) runs once, to build a
+    prototype of each kind of paragraph an export uses; after that they are
+    removed from the document, which is kept as package bytes. Rendering
+    loads those bytes and appends deep copies of the prototypes with the
+    plan's text, so per-day cost is a handful of element copies. `path`
+    points at a custom template (its styles, headers and any leading content
+    are kept); it must define the Title, Heading 1 and Heading 2 styles.
+    """
+
+    def __init__(self, path: str = None):
+        doc = Document(path)
+        title = doc.add_heading('Lesson Plan', 0)
+        title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        self.prototypes = {
+            'title': title._p,
+            'paragraph': doc.add_paragraph()._p,
+            'day_heading': doc.add_heading(level=1)._p,
+            'section_heading': doc.add_heading(level=2)._p,
+            'page_break': doc.add_page_break()._p
+        }
+        for element in self.prototypes.values():
+            element.getparent().remove(element)
+
+        package = io.BytesIO()
+        doc.save(package)
+        self.package = package.getvalue()
+
+    def _paragraph(self, kind: str, text: str = '', bold: bool = False):
+        paragraph = deepcopy(self.prototypes[kind])
+        if text:
+            paragraph.append(_run(text, bold))
+        return paragraph
+
+    def render(self, plan: dict) -> Document:
+        doc = Document(io.BytesIO(self.package))
+        elements = [
+            deepcopy(self.prototypes['title']),
+            self._paragraph('paragraph', f"Textbook: {plan['textbook']}"),
+            self._paragraph('paragraph', f"Lesson Range: {plan['lesson_range']}"),
+            self._paragraph('paragraph', f"Date Range: {plan['start_date']} to {plan['end_date']}"),
+            self._paragraph('paragraph', f"Next Major Assessment: {plan['next_major_assessment']}"),
+            self._paragraph('paragraph')
+        ]
+
+        for day_plan in plan.get('daily_plans', []):
+            elements.append(self._paragraph('day_heading', f"{day_plan['day_name']} - {day_plan['day_date']}"))
+            for section_title, field, bold in DOCX_DAY_SECTIONS:
+                elements.append(self._paragraph('section_heading', section_title, bold))
+                elements.append(self._paragraph('paragraph', day_plan.get(field, '') or 'N/A'))
+            elements.append(deepcopy(self.prototypes['page_break']))
+
+        # Body content goes before the trailing section properties
+        body = doc.element.body
+        section_properties = body.sectPr
+        for element in elements:
+            if section_properties is not None:
+                section_properties.addprevious(element)
+            else:
+                body.append(element)
+        return doc
+
+
+_docx_template = None
+_docx_template_lock = threading.Lock()
+
+
+def get_docx_template() -> DocxTemplate:
+    """The process-wide template, loaded from DOCX_TEMPLATE_PATH on first use"""
+    global _docx_template
+    if _docx_template is None:
+        with _docx_template_lock:
+            if _docx_template is None:
+                _docx_template = DocxTemplate(DOCX_TEMPLATE_PATH)
+    return _docx_template
+
+
+def build_lesson_plan_document(plan: dict) -> Document:
+    return get_docx_template().render(plan)
+
+
+def render_lesson_plan_docx(plan: dict, spool_max_bytes: int = DOCX_SPOOL_MAX_BYTES) -> SpooledTemporaryFile:
+    """Render a plan to DOCX, rewound and ready to read.
+
+    The output stays in memory up to `spool_max_bytes` and moves to a
+    temporary file beyond that. Blocking; use DocxExporter.render from async code.
+    """
+    file = SpooledTemporaryFile(max_size=spool_max_bytes)
+    build_lesson_plan_document(plan).save(file)
+    file.seek(0)
+    return file
+
+
+def render_lesson_plan_docx_bytes(plan: dict) -> bytes:
+    """Process pool entry point: file objects cannot cross the process boundary"""
+    file = render_lesson_plan_docx(plan, spool_max_bytes=0)
+    with file:
+        return file.read()
+
+
+def _spool_bytes(data: bytes, spool_max_bytes: int) -> SpooledTemporaryFile:
+    file = SpooledTemporaryFile(max_size=spool_max_bytes)
+    file.write(data)
+    file.seek(0)
+    return file
+
+
+def file_size(file) -> int:
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+
+def iter_file(file, chunk_size: int = DOCX_STREAM_CHUNK_BYTES):
+    """Yield a file in chunks and close it afterwards (for StreamingResponse)"""
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
+
+
+class DocxExporter:
+    """Renders DOCX exports in a worker pool so the event loop keeps serving requests.
+
+    'thread' (the default) suits python-docx's mix of XML building and zip
+    writing; 'process' sidesteps the GIL for very large plans at the cost of
+    pickling the plan and the output across processes.
+    """
+
+    def __init__(self, executor: str = DOCX_EXPORT_EXECUTOR, workers: int = DOCX_EXPORT_WORKERS,
+                 spool_max_bytes: int = DOCX_SPOOL_MAX_BYTES):
+        if executor not in ('thread', 'process'):
+            raise ValueError(f"Invalid DOCX_EXPORT_EXECUTOR '{executor}'; use 'thread' or 'process'")
+        self.executor_kind = executor
+        self.workers = max(1, workers)
+        self.spool_max_bytes = spool_max_bytes
+        self._executor = None
+        self.stats = {'exports': 0, 'failures': 0, 'in_flight': 0, 'render_seconds': 0.0, 'bytes': 0}
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.executor_kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='docx-export')
+        return self._executor
+
+    async def render(self, plan: dict) -> SpooledTemporaryFile:
+        """Render `plan` in the pool; returns a rewound file the caller must close"""
+        loop = asyncio.get_running_loop()
+        self.stats['in_flight'] += 1
+        start = time.perf_counter()
+        try:
+            if self.executor_kind == 'process':
+                data = await loop.run_in_executor(self._get_executor(), render_lesson_plan_docx_bytes, plan)
+                file = _spool_bytes(data, self.spool_max_bytes)
+            else:
+                file = await loop.run_in_executor(self._get_executor(), render_lesson_plan_docx, plan, self.spool_max_bytes)
+        except Exception as e:
+            self.stats['failures'] += 1
+            logging.error(f"DOCX export failed for lesson plan {plan.get('id')}: {str(e)}")
+            raise
+        finally:
+            self.stats['in_flight'] -= 1
+
+        self.stats['exports'] += 1
+        self.stats['render_seconds'] += time.perf_counter() - start
+        self.stats['bytes'] += file_size(file)
+        return file
+
+    def get_stats(self) -> dict:
+        exports = self.stats['exports']
+        return {
+            'executor': self.executor_kind,
+            'workers': self.workers,
+            **self.stats,
+            'render_seconds': round(self.stats['render_seconds'], 3),
+            'avg_render_seconds': round(self.stats['render_seconds'] / exports, 3) if exports else None
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def docx_etag(plan: dict) -> str:
+    """Strong ETag for a plan's export: changes with the plan version and the layout"""
+    return f"\"{plan['id']}-v{plan.get('version', 0)}-r{DOCX_RENDER_VERSION}\""
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Weak comparison, as If-None-Match requires
+    return '*' in candidates or etag in [tag[2:] if tag.startswith('W/') else tag for tag in candidates]
+
+
+class DocxExportCache:
+    """Rendered exports on local disk, keyed by (plan id, version), evicted LRU past `max_bytes`.
+
+    One file per plan version; storing a new version drops the older ones,
+    which can no longer be requested. Entries found on disk at startup are
+    adopted oldest-first, so a restart keeps the cache warm.
+    """
+
+    def __init__(self, directory: str = DOCX_CACHE_DIR, max_bytes: int = DOCX_CACHE_MAX_BYTES, enabled: bool = DOCX_CACHE_ENABLED):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = None  # file name -> size, least recently used first
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        self._lock = threading.Lock()  # get/put run in worker threads
+
+    @staticmethod
+    def _name(plan: dict) -> str:
+        return f"{plan['id']}-v{plan.get('version', 0)}-r{DOCX_RENDER_VERSION}.docx"
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in sorted(self.directory.glob('*.docx'), key=lambda path: path.stat().st_mtime):
+                size = path.stat().st_size
+                self._entries[path.name] = size
+                self.total_bytes += size
+        except OSError as e:
+            logging.warning(f"DOCX cache directory {self.directory} unavailable: {str(e)}")
+            self.enabled = False
+
+    def _remove(self, name: str):
+        self.total_bytes -= self._entries.pop(name, 0)
+        try:
+            (self.directory / name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions'] += 1
+
+    def get(self, plan: dict):
+        """Open the cached export of this plan version, or None. Blocking; run in a thread"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._load()
+            name = self._name(plan)
+            if name in self._entries:
+                try:
+                    file = open(self.directory / name, 'rb')
+                except FileNotFoundError:
+                    self.total_bytes -= self._entries.pop(name)
+                else:
+                    self._entries.move_to_end(name)
+                    self.stats['hits'] += 1
+                    return file
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, plan: dict, file):
+        """Copy a rendered export into the cache and rewind it. Blocking; run in a thread"""
+        if not self.enabled:
+            return
+        name = self._name(plan)
+        size = file_size(file)
+        if size > self.max_bytes:
+            return
+
+        self.discard(plan['id'])
+        partial = self.directory / f".{name}.{os.getpid()}.tmp"
+        try:
+            with open(partial, 'wb') as out:
+                shutil.copyfileobj(file, out)
+            os.replace(partial, self.directory / name)
+        except OSError as e:
+            logging.warning(f"Could not cache DOCX export {name}: {str(e)}")
+            partial.unlink(missing_ok=True)
+            return
+        finally:
+            file.seek(0)
+
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+            self.stats['writes'] += 1
+            self._evict()
+
+    def discard(self, plan_id: str):
+        """Drop every cached version of a plan"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._load()
+            for name in [name for name in self._entries if name.startswith(f"{plan_id}-v")]:
+                self._remove(name)
+
+    def get_stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries or {}),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            **self.stats
+        }
+
+
+# Process-wide exporter and cache shared by the export endpoints
+docx_exporter = DocxExporter()
+docx_cache = DocxExportCache()
+
+
+async def get_lesson_plan_docx(plan: dict):
+    """The export of `plan` as a rewound file (the caller closes it), from the cache when possible"""
+    file = await asyncio.to_thread(docx_cache.get, plan)
+    if file is None:
+        file = await docx_exporter.render(plan)
+        await asyncio.to_thread(docx_cache.put, plan, file)
+    return file
+
+
+class _ZipOutput:
+    """Write-only sink for zipfile; the archive bytes are drained after each entry.
+
+    It has no tell/seek, so zipfile writes entries with trailing data
+    descriptors and never goes back to patch a header.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+_UNSAFE_PATH_CHARS = re.compile(r'[^\w\-. ]+')
+
+
+def _safe_path_part(text: str) -> str:
+    return _UNSAFE_PATH_CHARS.sub('_', text or '').strip(' ._') or 'untitled'
+
+
+def _write_zip_entry(archive: zipfile.ZipFile, name: str, file):
+    with file, archive.open(name, 'w') as entry:
+        shutil.copyfileobj(file, entry, DOCX_STREAM_CHUNK_BYTES)
+
+
+async def stream_lesson_plans_zip(db, query: dict, window: int = DOCX_EXPORT_WORKERS):
+    """Yield a ZIP of the DOCX exports of every plan matching `query`.
+
+    Plans are read from a cursor and rendered (or taken from the export
+    cache) at most `window` at a time; each export is added to the archive
+    and sent as soon as it is ready, so memory stays flat however many plans
+    match. Entries are `<teacher>/<start date>_<textbook>_<id>.docx`, in
+    completion order. Plans that fail to render are listed in `errors.txt`
+    at the end instead of aborting the download.
+    """
+    output = _ZipOutput()
+    # Exports are already compressed; level 1 keeps the archive cheap to build
+    archive = zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1)
+    teacher_names = {}
+    errors = []
+
+    async def render(plan):
+        if plan['user_id'] not in teacher_names:
+            teacher = await db.users.find_one({"id": plan['user_id']}, {"_id": 0, "full_name": 1})
+            teacher_names[plan['user_id']] = teacher['full_name'] if teacher else plan['user_id']
+        name = (f"{_safe_path_part(teacher_names[plan['user_id']])}/"
+                f"{plan['start_date']}_{_safe_path_part(plan['textbook'])}_{plan['id'][:8]}.docx")
+        try:
+            return name, await get_lesson_plan_docx(plan)
+        except Exception as e:
+            errors.append(f"{plan['id']} ({name}): {str(e)}")
+            return name, None
+
+    async def write_finished(tasks) -> bytes:
+        for task in tasks:
+            name, file = task.result()
+            if file is not None:
+                await asyncio.to_thread(_write_zip_entry, archive, name, file)
+        return output.drain()
+
+    pending = set()
+    try:
+        async for plan in db.lesson_plans.find(query, {"_id": 0}).sort("created_at", -1):
+            pending.add(asyncio.ensure_future(render(plan)))
+            if len(pending) >= window:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                yield await write_finished(done)
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            yield await write_finished(done)
+
+        if errors:
+            archive.writestr('errors.txt', '\n'.join(errors) + '\n')
+        archive.close()
+        yield output.drain()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,241 @@
+"""Background job queue for lesson plan generation"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from models.lesson_plan import LessonPlanCreate, LessonPlanJob
+from .helpers import get_weekdays_between
+from .lesson_generation import create_draft_plan, generate_plan_days
+from .llm import llm_metrics
+
+# Number of jobs generated at the same time, and how many may wait behind them
+LESSON_PLAN_JOB_WORKERS = int(os.environ.get('LESSON_PLAN_JOB_WORKERS', 2))
+LESSON_PLAN_JOB_QUEUE_SIZE = int(os.environ.get('LESSON_PLAN_JOB_QUEUE_SIZE', 50))
+# How long a claimed job belongs to its process without a heartbeat; after that another process may take it over
+LESSON_PLAN_JOB_LEASE_SECONDS = int(os.environ.get('LESSON_PLAN_JOB_LEASE_SECONDS', 300))
+# How often Mongo is checked for claimable jobs the in-process queue has not picked up yet
+LESSON_PLAN_JOB_POLL_SECONDS = float(os.environ.get('LESSON_PLAN_JOB_POLL_SECONDS', 30))
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity and a new job cannot be accepted"""
+
+
+class LessonPlanJobQueue:
+    """Bounded in-process queue of lesson plan jobs, with state persisted in Mongo.
+
+    Jobs live in the `lesson_plan_jobs` collection; the queue only holds job ids.
+    Several processes (uvicorn workers, or an old and a new one during a
+    restart) may enqueue the same job, so a worker runs a job only after
+    claiming it atomically: a queued job, or a running one whose lease
+    expired. The owner renews its lease while generating. Claimable jobs
+    that do not fit in the queue (left over from a previous run, or whose
+    owner stopped renewing) are picked up from Mongo when the queue drains
+    and every `poll_seconds`.
+    """
+
+    def __init__(self, db, workers: int = LESSON_PLAN_JOB_WORKERS, maxsize: int = LESSON_PLAN_JOB_QUEUE_SIZE,
+                 lease_seconds: int = LESSON_PLAN_JOB_LEASE_SECONDS, poll_seconds: float = LESSON_PLAN_JOB_POLL_SECONDS):
+        self.db = db
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queued = set()  # job ids in the queue or being run here, so a poll does not add them twice
+        self._drained = asyncio.Event()
+        self._tasks = []
+
+    async def start(self):
+        """Start the worker pool and enqueue jobs left over from a previous run"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        resumed = await self._poll()
+        if resumed:
+            logging.info(f"Resumed {resumed} unfinished lesson plan jobs")
+        self._tasks.append(asyncio.create_task(self._poller()))
+
+    def _enqueue(self, job_id: str):
+        """Add a job id unless it is already here; raises asyncio.QueueFull"""
+        if job_id not in self._queued:
+            self.queue.put_nowait(job_id)
+            self._queued.add(job_id)
+
+    async def _poll(self) -> int:
+        """Enqueue claimable jobs, oldest first, up to the queue's free space; returns how many"""
+        free = (self.queue.maxsize or 1000) - self.queue.qsize()
+        if free <= 0:
+            return 0
+        found = await self.db.lesson_plan_jobs.find(
+            {"id": {"$nin": list(self._queued)}, **self._claimable()}, {"_id": 0, "id": 1}
+        ).sort("created_at", 1).to_list(free)
+        added = 0
+        for job in found:
+            try:
+                self._enqueue(job['id'])
+            except asyncio.QueueFull:
+                break  # A submit took the space; the next poll gets the rest
+            added += 1
+        return added
+
+    async def _poller(self):
+        while True:
+            # asyncio.wait rather than wait_for: on 3.11 wait_for can swallow the cancel from stop()
+            drained = asyncio.ensure_future(self._drained.wait())
+            try:
+                await asyncio.wait([drained], timeout=self.poll_seconds)
+            finally:
+                drained.cancel()
+            self._drained.clear()
+            try:
+                await self._poll()
+            except Exception as e:
+                logging.warning(f"Could not poll for lesson plan jobs: {str(e)}")
+
+    async def stop(self):
+        """Stop the workers. Jobs in flight stay 'running' with their lease released, so the next start resumes them"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.db.lesson_plan_jobs.update_many(
+            {"owner": self.worker_id, "status": "running"},
+            {"$set": {"lease_until": datetime.now(timezone.utc)}}
+        )
+
+    async def submit(self, user_id: str, plan_data: LessonPlanCreate, days_total: int) -> LessonPlanJob:
+        """Persist a new job and enqueue it; raises JobQueueFull when at capacity"""
+        if self.queue.full():
+            raise JobQueueFull()
+
+        job = LessonPlanJob(user_id=user_id, request=plan_data, days_total=days_total)
+        job_dict = job.model_dump()
+        job_dict['created_at'] = job_dict['created_at'].isoformat()
+        job_dict['updated_at'] = job_dict['updated_at'].isoformat()
+        await self.db.lesson_plan_jobs.insert_one(job_dict)
+
+        try:
+            self._enqueue(job.id)
+        except asyncio.QueueFull:
+            # Another submit filled the last slot while we were inserting
+            await self.db.lesson_plan_jobs.delete_one({"id": job.id})
+            raise JobQueueFull()
+
+        return job
+
+    async def get(self, job_id: str, user_id: str):
+        """Get a job's current state, scoped to the user who created it"""
+        return await self.db.lesson_plan_jobs.find_one({"id": job_id, "user_id": user_id}, {"_id": 0})
+
+    async def _update(self, job_id: str, update: dict):
+        """Update a job this process owns; returns False if another process has taken it over"""
+        update.setdefault("$set", {})["updated_at"] = datetime.now(timezone.utc).isoformat()
+        result = await self.db.lesson_plan_jobs.update_one({"id": job_id, "owner": self.worker_id}, update)
+        return result.matched_count > 0
+
+    @staticmethod
+    def _claimable() -> dict:
+        """Jobs nobody is working on: queued, or running under an expired (or pre-lease) claim"""
+        return {"$or": [
+            {"status": "queued"},
+            {"status": "running", "lease_until": {"$lt": datetime.now(timezone.utc)}},
+            {"status": "running", "lease_until": None}
+        ]}
+
+    async def _claim(self, job_id: str):
+        """Atomically take a job for this process; returns the job as it was before the claim,
+        or None if it is finished or another process holds it"""
+        now = datetime.now(timezone.utc)
+        return await self.db.lesson_plan_jobs.find_one_and_update(
+            {"id": job_id, **self._claimable()},
+            {"$set": {
+                "status": "running",
+                "owner": self.worker_id,
+                # Stored as a real date (not an ISO string) so leases compare reliably
+                "lease_until": now + timedelta(seconds=self.lease_seconds),
+                "updated_at": now.isoformat()
+            }},
+            projection={"_id": 0}
+        )
+
+    async def _renew_lease(self, job_id: str, generation: asyncio.Task):
+        """Extend the lease while the job runs; stop generating if another process took the job over"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await self._update(job_id, {"$set": {
+                    "lease_until": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+                }})
+            except Exception as e:
+                logging.warning(f"Could not renew the lease on lesson plan job {job_id}: {str(e)}")
+                continue
+            if not renewed:
+                logging.warning(f"Lesson plan job {job_id} was taken over by another process; stopping here")
+                generation.cancel()
+                return
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                with llm_metrics.track_request(f"lesson plan job {job_id}"):
+                    await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Lesson plan job {job_id} failed: {str(e)}")
+                await self._update(job_id, {"$set": {"status": "failed", "error": str(e)}})
+            finally:
+                self._queued.discard(job_id)
+                self.queue.task_done()
+                if self.queue.empty():
+                    self._drained.set()
+
+    async def _run(self, job_id: str):
+        job = await self._claim(job_id)
+        if not job:
+            return
+
+        plan_data = LessonPlanCreate(**job['request'])
+        weekdays = get_weekdays_between(plan_data.start_date, plan_data.end_date)
+
+        # A job that was interrupted already has a draft plan holding the days it finished
+        plan = None
+        if job.get('lesson_plan_id'):
+            plan = await self.db.lesson_plans.find_one({"id": job['lesson_plan_id']}, {"_id": 0, "id": 1, "daily_plans.day_date": 1})
+        if plan:
+            plan_id = plan['id']
+            days_completed = len(plan.get('daily_plans', []))
+        else:
+            lesson_plan = await create_draft_plan(self.db, job['user_id'], plan_data)
+            plan_id = lesson_plan.id
+            days_completed = 0
+
+        await self._update(job_id, {"$set": {
+            "lesson_plan_id": plan_id,
+            "days_completed": days_completed,
+            "days_total": len(weekdays)
+        }})
+
+        async def on_day_complete(day_plan):
+            await self._update(job_id, {"$inc": {"days_completed": 1}})
+
+        generation = asyncio.ensure_future(
+            generate_plan_days(self.db, plan_id, plan_data, weekdays, job['user_id'], on_day_complete=on_day_complete)
+        )
+        heartbeat = asyncio.ensure_future(self._renew_lease(job_id, generation))
+        try:
+            await generation
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                return  # Lease lost: the new owner finishes the job
+            generation.cancel()
+            raise
+        finally:
+            heartbeat.cancel()
+
+        await self._update(job_id, {"$set": {"status": "completed"}})
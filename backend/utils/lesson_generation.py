@@ -0,0 +1,520 @@
+"""Lesson plan generation helpers"""
+import asyncio
+import json
+import logging
+import os
+
+from pydantic import ValidationError
+
+from models.lesson_plan import DayPlan, DayPlanSections, LessonPlan, LessonPlanCreate
+from .lesson_parser import SECTION_KEYS, parse_lesson_plan_response
+from .llm import send_llm_message, forget_llm_response
+from .plan_extraction import extract_plan_objectives, refresh_plan_extraction
+
+LESSON_PLAN_SYSTEM_MESSAGE = "You are an expert education consultant helping teachers create detailed daily lesson plans."
+LESSON_PLAN_JSON_SYSTEM_MESSAGE = (
+    "You are an expert education consultant helping teachers create detailed daily lesson plans. "
+    "You always reply with a single valid JSON object and nothing else."
+)
+
+# "markdown" parses section headers out of free text; "json" asks for a DayPlanSections object
+LESSON_PLAN_OUTPUT_FORMAT = os.environ.get('LESSON_PLAN_OUTPUT_FORMAT', 'markdown')
+
+# Maximum number of days generated at the same time (1 = one day after another)
+LESSON_PLAN_CONCURRENCY = int(os.environ.get('LESSON_PLAN_CONCURRENCY', 4))
+
+
+class LessonPlanGenerationError(Exception):
+    """Raised when one or more days of a lesson plan could not be generated"""
+
+    def __init__(self, failures: dict, daily_plans: list, total_days: int):
+        self.failures = failures  # {day_date: error message}
+        self.daily_plans = daily_plans  # Days that did succeed, in date order
+        self.total_days = total_days
+        self.plan_id = None  # Set when the successful days were checkpointed into a stored plan
+        failed_dates = ', '.join(sorted(failures))
+        super().__init__(f"Failed to generate {len(failures)} of {total_days} days ({failed_dates})")
+
+
+def _day_context(plan_data, day_info: dict, idx: int, total_days: int) -> str:
+    state_standards_text = f"\nState Standards to Align With: {plan_data.state_standards}" if plan_data.state_standards else ""
+
+    return f"""Create a detailed lesson plan for {day_info['day_name']}, {day_info['date']} (Day {idx+1} of {total_days}) based on:
+
+Textbook: {plan_data.textbook}
+Lesson Range: {plan_data.lesson_range}
+Overall Date Range: {plan_data.start_date} to {plan_data.end_date}
+Next Major Assessment: {plan_data.next_major_assessment}{state_standards_text}"""
+
+
+def build_day_prompt(plan_data, day_info: dict, idx: int, total_days: int) -> str:
+    """Build the LLM prompt for a single day of a lesson plan"""
+    return _day_context(plan_data, day_info, idx, total_days) + f"""
+
+Provide specific, actionable content for THIS DAY ONLY for each section:
+
+1. Learner Outcomes/Objectives
+2. Standards (include the relevant state standards provided above, formatted clearly)
+3. Materials Needed
+4. Anticipatory Set
+5. Teaching the Lesson
+6. Modeling
+7. Instructional Strategies
+8. Check for Understanding
+9. Guided Practice/Monitoring
+10. Independent Practice
+11. Closure
+12. Summative Assessment
+13. Formative Assessment
+14. Extended Activities
+15. Review and Reteach Activities
+16. Early Finishers Activities
+
+Make each section detailed and specific to day {idx+1}."""
+
+
+# What each DayPlanSections field should hold, in the order the markdown prompt lists them
+JSON_SECTION_DESCRIPTIONS = {
+    'learner_outcomes': "Learner outcomes/objectives",
+    'standards': "Standards (include the relevant state standards provided above, formatted clearly)",
+    'materials_needed': "Materials needed",
+    'anticipatory_set': "Anticipatory set",
+    'teaching_lesson': "Teaching the lesson",
+    'modeling': "Modeling",
+    'instructional_strategies': "Instructional strategies",
+    'check_understanding': "Check for understanding",
+    'guided_practice': "Guided practice/monitoring",
+    'independent_practice': "Independent practice",
+    'closure': "Closure",
+    'summative_assessment': "Summative assessment",
+    'formative_assessment': "Formative assessment",
+    'extended_activities': "Extended activities",
+    'review_reteach': "Review and reteach activities",
+    'early_finishers': "Early finishers activities",
+}
+
+
+def build_day_prompt_json(plan_data, day_info: dict, idx: int, total_days: int) -> str:
+    """Build the LLM prompt for a single day, asking for a DayPlanSections JSON object"""
+    fields = ',\n'.join(f'  "{key}": "{JSON_SECTION_DESCRIPTIONS[key]}"' for key in SECTION_KEYS)
+
+    return _day_context(plan_data, day_info, idx, total_days) + f"""
+
+Provide specific, actionable content for THIS DAY ONLY. Reply with one JSON object with exactly these keys, each a string (markdown bullets are fine inside strings):
+
+{{
+{fields}
+}}
+
+Make each section detailed and specific to day {idx+1}. Return ONLY the JSON object, no other text."""
+
+
+def parse_day_sections_json(response_text: str) -> DayPlanSections:
+    """Validate a JSON-mode reply; raises ValueError (or ValidationError) if it does not fit"""
+    text = response_text.strip()
+    # Models sometimes wrap the object in a code fence or a sentence
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end < start:
+        raise ValueError("No JSON object in response")
+    return DayPlanSections.model_validate(json.loads(text[start:end + 1]))
+
+
+def build_repair_prompt(response_text: str, error: Exception) -> str:
+    """Follow-up prompt asking the model to fix a JSON reply that failed validation"""
+    return f"""Your previous reply could not be used as a lesson plan day:
+
+{str(error)}
+
+Previous reply:
+{response_text}
+
+Return the same lesson plan day as ONE valid JSON object with exactly these string keys: {', '.join(SECTION_KEYS)}. Return ONLY the JSON object, no other text."""
+
+
+def build_day_plan(day_info: dict, response_text: str, next_major_assessment: str) -> DayPlan:
+    """Turn a raw LLM response into a DayPlan, filling any missing sections"""
+    sections = parse_lesson_plan_response(response_text)
+
+    return DayPlan(
+        day_name=day_info['day_name'],
+        day_date=day_info['date'],
+        learner_outcomes=sections['learner_outcomes'] or 'Content will be generated',
+        standards=sections['standards'] or 'Content will be generated',
+        materials_needed=sections['materials_needed'] or 'Content will be generated',
+        anticipatory_set=sections['anticipatory_set'] or 'Content will be generated',
+        teaching_lesson=sections['teaching_lesson'] or response_text,
+        modeling=sections['modeling'] or 'Content will be generated',
+        instructional_strategies=sections['instructional_strategies'] or 'Content will be generated',
+        check_understanding=sections['check_understanding'] or 'Content will be generated',
+        guided_practice=sections['guided_practice'] or 'Content will be generated',
+        independent_practice=sections['independent_practice'] or 'Content will be generated',
+        closure=sections['closure'] or 'Content will be generated',
+        summative_assessment=sections['summative_assessment'] or 'Not applicable for today (next major assessment: ' + next_major_assessment + ')',
+        formative_assessment=sections['formative_assessment'] or 'Content will be generated',
+        extended_activities=sections['extended_activities'] or 'Content will be generated',
+        review_reteach=sections['review_reteach'] or 'Content will be generated',
+        early_finishers=sections['early_finishers'] or 'Content will be generated'
+    )
+
+
+def resolve_output_format(plan_data) -> str:
+    return plan_data.output_format or LESSON_PLAN_OUTPUT_FORMAT
+
+
+async def generate_day_plan(plan_data, day_info: dict, idx: int, total_days: int, user_id: str) -> DayPlan:
+    """Generate a single day of a lesson plan with one LLM call"""
+    if resolve_output_format(plan_data) == 'json':
+        return await generate_day_plan_json(plan_data, day_info, idx, total_days, user_id)
+
+    prompt = build_day_prompt(plan_data, day_info, idx, total_days)
+    response_text = await send_llm_message(
+        session_id=f"lesson_plan_{user_id}_{day_info['date']}",
+        system_message=LESSON_PLAN_SYSTEM_MESSAGE,
+        prompt=prompt,
+        bypass_cache=plan_data.bypass_cache,
+        user_id=user_id,
+        call_site="lesson_plan_day"
+    )
+
+    return build_day_plan(day_info, response_text, plan_data.next_major_assessment)
+
+
+async def generate_day_plan_json(plan_data, day_info: dict, idx: int, total_days: int, user_id: str) -> DayPlan:
+    """Generate a day in JSON output mode, validated against DayPlanSections.
+
+    An invalid reply gets one repair request that quotes the validation error.
+    If that also fails, both replies are dropped from the response cache (so a
+    retry asks again) and the error is raised.
+    """
+    session_id = f"lesson_plan_{user_id}_{day_info['date']}"
+    prompt = build_day_prompt_json(plan_data, day_info, idx, total_days)
+    response_text = await send_llm_message(
+        session_id=session_id,
+        system_message=LESSON_PLAN_JSON_SYSTEM_MESSAGE,
+        prompt=prompt,
+        bypass_cache=plan_data.bypass_cache,
+        user_id=user_id,
+        call_site="lesson_plan_day"
+    )
+
+    try:
+        sections = parse_day_sections_json(response_text)
+    except (ValueError, ValidationError) as e:
+        logging.warning(f"Invalid JSON lesson plan day {day_info['date']}, asking for a repair: {str(e)}")
+        repair_prompt = build_repair_prompt(response_text, e)
+        repaired_text = await send_llm_message(
+            session_id=f"{session_id}_repair",
+            system_message=LESSON_PLAN_JSON_SYSTEM_MESSAGE,
+            prompt=repair_prompt,
+            bypass_cache=plan_data.bypass_cache,
+            user_id=user_id,
+            call_site="lesson_plan_day_repair"
+        )
+        try:
+            sections = parse_day_sections_json(repaired_text)
+        except (ValueError, ValidationError):
+            await forget_llm_response(LESSON_PLAN_JSON_SYSTEM_MESSAGE, prompt)
+            await forget_llm_response(LESSON_PLAN_JSON_SYSTEM_MESSAGE, repair_prompt)
+            raise
+
+    return DayPlan(day_name=day_info['day_name'], day_date=day_info['date'], **sections.model_dump())
+
+
+def plan_request_from_plan(plan: dict, **overrides) -> LessonPlanCreate:
+    """Rebuild the LessonPlanCreate a stored plan was generated from"""
+    fields = {
+        'textbook': plan['textbook'],
+        'start_date': plan['start_date'],
+        'end_date': plan['end_date'],
+        'lesson_range': plan['lesson_range'],
+        'next_major_assessment': plan['next_major_assessment'],
+        'state_standards': plan.get('state_standards'),
+        'output_format': plan.get('output_format', 'markdown'),
+    }
+    fields.update(overrides)
+    return LessonPlanCreate(**fields)
+
+
+async def regenerate_day_plan(plan: dict, day_date: str, user_id: str, state_standards: str = None):
+    """Generate a fresh DayPlan for one day of a stored plan.
+
+    Returns (index in daily_plans, DayPlan), or None if the plan has no such day.
+    The response cache is bypassed so the day actually changes.
+    """
+    daily_plans = plan.get('daily_plans', [])
+    idx = next((i for i, day in enumerate(daily_plans) if day['day_date'] == day_date), None)
+    if idx is None:
+        return None
+
+    overrides = {'bypass_cache': True}
+    if state_standards is not None:
+        overrides['state_standards'] = state_standards
+    plan_data = plan_request_from_plan(plan, **overrides)
+
+    day_info = {'date': day_date, 'day_name': daily_plans[idx]['day_name']}
+    day_plan = await generate_day_plan(plan_data, day_info, idx, len(daily_plans), user_id)
+    return idx, day_plan
+
+
+async def generate_daily_plans(plan_data, weekdays: list, user_id: str, concurrency: int = None, on_day_complete=None, only_dates: set = None) -> list:
+    """Generate every day of a lesson plan, running up to `concurrency` LLM calls at once.
+
+    Days are returned in the same (date) order as `weekdays`. Days that are
+    already in flight are allowed to finish when another day fails, then a
+    LessonPlanGenerationError is raised carrying both the failures and the
+    days that succeeded. `on_day_complete`, if given, is awaited with each
+    DayPlan as soon as it has been generated (in completion order).
+    `only_dates` limits generation to those days, still numbered by their
+    position in the full `weekdays` list.
+    """
+    concurrency = max(1, concurrency or LESSON_PLAN_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+    total_days = len(weekdays)
+    selected = [(idx, day_info) for idx, day_info in enumerate(weekdays) if only_dates is None or day_info['date'] in only_dates]
+
+    async def run_day(idx: int, day_info: dict) -> DayPlan:
+        async with semaphore:
+            day_plan = await generate_day_plan(plan_data, day_info, idx, total_days, user_id)
+        if on_day_complete:
+            await on_day_complete(day_plan)
+        return day_plan
+
+    results = await asyncio.gather(
+        *(run_day(idx, day_info) for idx, day_info in selected),
+        return_exceptions=True
+    )
+
+    daily_plans = []
+    failures = {}
+    for (_, day_info), result in zip(selected, results):
+        if isinstance(result, BaseException):
+            logging.error(f"Error generating lesson plan day {day_info['date']}: {str(result)}")
+            failures[day_info['date']] = str(result)
+        else:
+            daily_plans.append(result)
+
+    if failures:
+        raise LessonPlanGenerationError(failures, daily_plans, len(selected))
+
+    return daily_plans
+
+
+async def create_draft_plan(db, user_id: str, plan_data) -> LessonPlan:
+    """Insert an empty plan that generated days are checkpointed into"""
+    lesson_plan = LessonPlan(
+        user_id=user_id,
+        textbook=plan_data.textbook,
+        start_date=plan_data.start_date,
+        end_date=plan_data.end_date,
+        lesson_range=plan_data.lesson_range,
+        next_major_assessment=plan_data.next_major_assessment,
+        state_standards=plan_data.state_standards,
+        output_format=resolve_output_format(plan_data),
+        daily_plans=[],
+        generation_state="generating"
+    )
+
+    plan_dict = lesson_plan.model_dump()
+    plan_dict['created_at'] = plan_dict['created_at'].isoformat()
+
+    await db.lesson_plans.insert_one(plan_dict)
+
+    return lesson_plan
+
+
+async def generate_plan_days(db, plan_id: str, plan_data, weekdays: list, user_id: str, on_day_complete=None) -> dict:
+    """Generate the days still missing from a stored plan, saving each one as it completes.
+
+    Days already in the plan are skipped, so calling this again after a
+    failure resumes where generation stopped. On failure the plan is marked
+    `partial` with the failed dates and LessonPlanGenerationError is raised
+    (with `plan_id` set). Returns the finished plan document.
+    """
+    plan = await db.lesson_plans.find_one({"id": plan_id}, {"_id": 0, "daily_plans.day_date": 1})
+    done = {day['day_date'] for day in plan.get('daily_plans', [])}
+    missing = {day_info['date'] for day_info in weekdays} - done
+
+    await db.lesson_plans.update_one({"id": plan_id}, {"$set": {"generation_state": "generating"}, "$inc": {"version": 1}})
+
+    async def checkpoint(day_plan):
+        # Keep daily_plans in date order; the $ne guard makes a repeated day a no-op
+        await db.lesson_plans.update_one(
+            {"id": plan_id, "daily_plans.day_date": {"$ne": day_plan.day_date}},
+            {"$push": {"daily_plans": {"$each": [day_plan.model_dump()], "$sort": {"day_date": 1}}}, "$inc": {"version": 1}}
+        )
+        if on_day_complete:
+            await on_day_complete(day_plan)
+
+    try:
+        await generate_daily_plans(plan_data, weekdays, user_id, on_day_complete=checkpoint, only_dates=missing)
+    except LessonPlanGenerationError as e:
+        e.plan_id = plan_id
+        await db.lesson_plans.update_one(
+            {"id": plan_id},
+            {"$set": {"generation_state": "partial", "generation_errors": e.failures}, "$inc": {"version": 1}}
+        )
+        await refresh_plan_extraction(db, plan_id)
+        raise
+
+    await db.lesson_plans.update_one(
+        {"id": plan_id},
+        {"$set": {"generation_state": "complete", "generation_errors": {}}, "$inc": {"version": 1}}
+    )
+    await refresh_plan_extraction(db, plan_id)
+    return await db.lesson_plans.find_one({"id": plan_id}, {"_id": 0})
+
+
+async def clone_lesson_plan(db, plan: dict, user_id: str, weekdays: list) -> dict:
+    """Copy a stored plan onto new weekdays, calling the LLM only for days it lacks.
+
+    Days are remapped in order: the first source day lands on the first new
+    weekday, and so on. A shorter range drops the trailing days; a longer one
+    generates the extra days (checkpointed, so a failure leaves a resumable
+    partial plan and raises LessonPlanGenerationError). When no days are
+    missing, the clone is a single insert.
+    """
+    source_days = sorted(plan.get('daily_plans', []), key=lambda day: day['day_date'])
+    daily_plans = [
+        DayPlan(**{**day, 'day_name': day_info['day_name'], 'day_date': day_info['date']})
+        for day, day_info in zip(source_days, weekdays)
+    ]
+
+    plan_data = plan_request_from_plan(plan, start_date=weekdays[0]['date'], end_date=weekdays[-1]['date'])
+    complete = len(daily_plans) == len(weekdays)
+    lesson_plan = LessonPlan(
+        user_id=user_id,
+        textbook=plan_data.textbook,
+        start_date=plan_data.start_date,
+        end_date=plan_data.end_date,
+        lesson_range=plan_data.lesson_range,
+        next_major_assessment=plan_data.next_major_assessment,
+        state_standards=plan_data.state_standards,
+        output_format=resolve_output_format(plan_data),
+        daily_plans=daily_plans,
+        generation_state="complete" if complete else "generating"
+    )
+
+    plan_dict = lesson_plan.model_dump()
+    plan_dict['created_at'] = plan_dict['created_at'].isoformat()
+    if complete:
+        plan_dict['extracted'] = extract_plan_objectives(plan_dict)
+    await db.lesson_plans.insert_one(plan_dict)
+    plan_dict.pop('_id', None)
+
+    if complete:
+        return plan_dict
+    return await generate_plan_days(db, lesson_plan.id, plan_data, weekdays, user_id)
+
+
+async def bulk_generate_lesson_plans(db, plan_data, weekdays: list, requested_by: str) -> dict:
+    """Generate one lesson plan per teacher in `plan_data.teacher_ids` with shared settings.
+
+    Teachers whose plans would produce identical day prompts (same textbook,
+    lesson range, dates and standards) share one generation run, so each
+    distinct day prompt reaches the LLM once; the results are copied into
+    per-teacher plans and saved with a single insert_many. Calls are
+    scheduled under the requesting admin. Days that fail leave that
+    teacher's plan `partial`, to be finished with the resume endpoint.
+    """
+    # Teachers that end up with the same plan request get the same days
+    variants = {}  # request json -> (LessonPlanCreate, [teacher ids])
+    for teacher_id in dict.fromkeys(plan_data.teacher_ids):
+        request = LessonPlanCreate(**plan_data.model_dump(include=set(LessonPlanCreate.model_fields)))
+        if teacher_id in plan_data.standards_by_teacher:
+            request.state_standards = plan_data.standards_by_teacher[teacher_id]
+        variants.setdefault(request.model_dump_json(), (request, []))[1].append(teacher_id)
+
+    async def run_variant(request):
+        try:
+            return await generate_daily_plans(request, weekdays, requested_by), {}
+        except LessonPlanGenerationError as e:
+            return e.daily_plans, e.failures
+
+    results = await asyncio.gather(*(run_variant(request) for request, _ in variants.values()))
+
+    documents = []
+    lesson_plan_ids = {}
+    failed_days = {}
+    for (request, teacher_ids), (daily_plans, failures) in zip(variants.values(), results):
+        for teacher_id in teacher_ids:
+            lesson_plan = LessonPlan(
+                user_id=teacher_id,
+                textbook=request.textbook,
+                start_date=request.start_date,
+                end_date=request.end_date,
+                lesson_range=request.lesson_range,
+                next_major_assessment=request.next_major_assessment,
+                state_standards=request.state_standards,
+                output_format=resolve_output_format(request),
+                daily_plans=daily_plans,
+                generation_state="partial" if failures else "complete",
+                generation_errors=failures
+            )
+            plan_dict = lesson_plan.model_dump()
+            plan_dict['created_at'] = plan_dict['created_at'].isoformat()
+            plan_dict['extracted'] = extract_plan_objectives(plan_dict)
+            documents.append(plan_dict)
+            lesson_plan_ids[teacher_id] = lesson_plan.id
+            if failures:
+                failed_days[teacher_id] = failures
+
+    if documents:
+        await db.lesson_plans.insert_many(documents)
+
+    return {
+        "lesson_plan_ids": lesson_plan_ids,
+        "days_total": len(weekdays),
+        "day_prompts_requested": len(lesson_plan_ids) * len(weekdays),
+        "day_prompts_generated": len(variants) * len(weekdays),
+        "failed_days": failed_days
+    }
+
+
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_lesson_plan_events(db, plan_data, weekdays: list, user_id: str):
+    """Generate a lesson plan, yielding SSE messages as each day is ready.
+
+    Emits `start` (the draft plan id and day list), one `day` per DayPlan in
+    completion order (with its `index` in the plan), then either `complete`
+    or `error`. Days are checkpointed as they arrive, so a failed or
+    disconnected stream can be finished with the resume endpoint.
+    """
+    events = asyncio.Queue()
+    index_by_date = {day_info['date']: idx for idx, day_info in enumerate(weekdays)}
+
+    async def on_day_complete(day_plan):
+        await events.put(('day', {'index': index_by_date[day_plan.day_date], 'day_plan': day_plan.model_dump()}))
+
+    lesson_plan = await create_draft_plan(db, user_id, plan_data)
+
+    async def run():
+        try:
+            await generate_plan_days(db, lesson_plan.id, plan_data, weekdays, user_id, on_day_complete=on_day_complete)
+            await events.put(('complete', {'lesson_plan_id': lesson_plan.id}))
+        except LessonPlanGenerationError as e:
+            logging.error(f"Error streaming lesson plan: {str(e)}")
+            await events.put(('error', {
+                'message': f"Error generating lesson plan: {str(e)}",
+                'failed_days': e.failures,
+                'lesson_plan_id': lesson_plan.id
+            }))
+        except Exception as e:
+            logging.error(f"Error streaming lesson plan: {str(e)}")
+            await events.put(('error', {'message': f"Error generating lesson plan: {str(e)}", 'lesson_plan_id': lesson_plan.id}))
+
+    task = asyncio.create_task(run())
+    try:
+        yield format_sse('start', {'lesson_plan_id': lesson_plan.id, 'days_total': len(weekdays), 'days': weekdays})
+        while True:
+            event, data = await events.get()
+            yield format_sse(event, data)
+            if event in ('complete', 'error'):
+                break
+    finally:
+        if not task.done():
+            task.cancel()
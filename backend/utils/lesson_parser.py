@@ -0,0 +1,168 @@
+"""Parser that splits an LLM lesson plan response into DayPlan sections"""
+import re
+
+SECTION_KEYS = [
+    'learner_outcomes',
+    'standards',
+    'materials_needed',
+    'anticipatory_set',
+    'teaching_lesson',
+    'modeling',
+    'instructional_strategies',
+    'check_understanding',
+    'guided_practice',
+    'independent_practice',
+    'closure',
+    'summative_assessment',
+    'formative_assessment',
+    'extended_activities',
+    'review_reteach',
+    'early_finishers'
+]
+
+# Header keyword -> section. Order matters: when a header line contains several
+# keywords, the one listed first wins.
+SECTION_MAPPING = {
+    'learner outcomes': 'learner_outcomes',
+    'objectives': 'learner_outcomes',
+    'standards': 'standards',
+    'materials needed': 'materials_needed',
+    'anticipatory set': 'anticipatory_set',
+    'teaching the lesson': 'teaching_lesson',
+    'modeling': 'modeling',
+    'instructional strategies': 'instructional_strategies',
+    'check for understanding': 'check_understanding',
+    'guided practice': 'guided_practice',
+    'monitoring': 'guided_practice',
+    'independent practice': 'independent_practice',
+    'closure': 'closure',
+    'summative assessment': 'summative_assessment',
+    'formative assessment': 'formative_assessment',
+    'extended activities': 'extended_activities',
+    'review and reteach': 'review_reteach',
+    'reteach activities': 'review_reteach',
+    'early finishers': 'early_finishers'
+}
+
+_KEYWORDS = list(SECTION_MAPPING)
+
+
+def _keyword_trie_pattern(keywords) -> str:
+    """One alternation of every keyword, factored by shared prefixes.
+
+    ['standards', 'summative assessment'] -> 's(?:tandards|ummative\\ assessment)',
+    so the regex engine rejects most positions on their first character
+    instead of trying every keyword there.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 and '' not in node else '(?:' + '|'.join(branches) + ')'
+        return body + ('?' if '' in node else '')
+
+    return build(trie)
+
+
+# A header line in lowercased text, up to its first keyword. The lookahead is
+# _is_header_line: starts with '#' or '**', is under 50 characters, or ends with ':'
+_HEADER_PATTERN = re.compile(
+    r'^(?=#|\*\*|[^\n]{0,49}$|[^\n]*:$)[^\n]*?(' + _keyword_trie_pattern(_KEYWORDS) + ')',
+    re.MULTILINE
+)
+# Keyword -> the keywords that take priority over it on the same line
+_EARLIER_KEYWORDS = {keyword: _KEYWORDS[:idx] for idx, keyword in enumerate(_KEYWORDS)}
+
+
+def _is_header_line(line: str) -> bool:
+    return line.startswith('#') or line.startswith('**') or line.endswith(':') or len(line) < 50
+
+
+def match_section_header(line: str):
+    """Return the section a header line starts, or None if it is body text"""
+    if not _is_header_line(line):
+        return None
+    line_lower = line.lower()
+    for keyword in _KEYWORDS:
+        if keyword in line_lower:
+            return SECTION_MAPPING[keyword]
+    return None
+
+
+def _find_headers(response_text: str, lowered: str) -> list:
+    """(line_start, line_end, section) for every header line, in order.
+
+    One pass over the lowercased response with _HEADER_PATTERN, a single
+    compiled regex that only enters header-shaped lines and matches the
+    alternation of every keyword (factored by prefix) inside them. The
+    match gives the line's first keyword; if the line also mentions one
+    listed earlier in SECTION_MAPPING, that one wins, as in
+    match_section_header.
+    """
+    headers = []
+    for match in _HEADER_PATTERN.finditer(lowered):
+        line_start = match.start()
+        line_end = lowered.find('\n', match.end())
+        if line_end == -1:
+            line_end = len(lowered)
+        keyword = match.group(1)
+        line_lower = lowered[line_start:line_end]
+        for earlier in _EARLIER_KEYWORDS[keyword]:
+            if earlier in line_lower:
+                keyword = earlier
+                break
+        headers.append((line_start, line_end, SECTION_MAPPING[keyword]))
+
+    return headers
+
+
+def _find_headers_by_line(response_text: str) -> list:
+    headers = []
+    line_start = 0
+    for line in response_text.split('\n'):
+        line_end = line_start + len(line)
+        section = match_section_header(line)
+        if section:
+            headers.append((line_start, line_end, section))
+        line_start = line_end + 1
+    return headers
+
+
+def parse_lesson_plan_response(response_text: str) -> dict:
+    """Parse AI response into lesson plan sections.
+
+    Header lines are located directly in the full text (see _find_headers)
+    and each section's body is sliced out of the response between its header
+    and the next one, instead of being rebuilt line by line.
+    """
+    lowered = response_text.lower()
+    if len(lowered) == len(response_text):
+        headers = _find_headers(response_text, lowered)
+    else:
+        # A few Unicode characters change length when lowercased, so offsets
+        # into `lowered` no longer line up; fall back to a line-by-line scan
+        headers = _find_headers_by_line(response_text)
+
+    sections = dict.fromkeys(SECTION_KEYS, '')
+    for idx, (line_start, line_end, section) in enumerate(headers):
+        if idx + 1 < len(headers):
+            next_start = headers[idx + 1][0]
+            # A header directly followed by another header has no body and
+            # leaves any earlier text for that section in place
+            if next_start > line_end + 1:
+                sections[section] = response_text[line_end + 1:next_start - 1].strip()
+        elif line_end < len(response_text):
+            sections[section] = response_text[line_end + 1:].strip()
+
+    # If parsing failed, store everything in teaching_lesson
+    if not any(sections.values()):
+        sections['teaching_lesson'] = response_text
+
+    return sections
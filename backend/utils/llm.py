@@ -0,0 +1,77 @@
+"""Shared entry point for LLM calls"""
+from .database import db
+from .llm_cache import LlmResponseCache, make_cache_key
+from .llm_client import LlmClientManager
+from .llm_metrics import LlmMetrics
+from .llm_providers import create_llm_provider
+from .llm_resilience import LlmCallPolicy, call_with_policy
+from .llm_scheduler import LlmScheduler
+
+LLM_PROVIDER = "anthropic"
+LLM_MODEL = "claude-3-7-sonnet-20250219"
+
+# Process-wide response cache shared by every LLM call site
+llm_cache = LlmResponseCache(db)
+
+# Process-wide client manager; its connection pool is closed in the app's shutdown hook
+llm_clients = LlmClientManager()
+
+# Backend that actually answers prompts, chosen with LLM_BACKEND (emergent, or fake for offline load tests)
+llm_provider = create_llm_provider(llm_clients, LLM_PROVIDER, LLM_MODEL)
+
+# Every uncached LLM call waits for a slot here (global cap, fair share per user)
+llm_scheduler = LlmScheduler()
+
+# Latency, size and error metrics per call site (lesson_plan_day, quiz_questions, remediation)
+llm_metrics = LlmMetrics()
+
+# Deadline, retry and hedging settings for every provider call
+llm_policy = LlmCallPolicy()
+
+
+async def send_llm_message(session_id: str, system_message: str, prompt: str, bypass_cache: bool = False,
+                           user_id: str = None, call_site: str = None) -> str:
+    """Send one prompt to the LLM and return the response text.
+
+    Responses are cached by (model, system_message, prompt). With
+    `bypass_cache` the cache is not read, but the fresh response still
+    replaces the cached one. Cache misses are scheduled under `user_id`
+    so each teacher gets a fair share of the LLM concurrency, and every
+    attempt is recorded in `llm_metrics` under `call_site`. Each attempt has
+    a deadline and failures are retried with backoff (see llm_policy).
+    """
+    key = make_cache_key(f"{llm_provider.name}/{llm_provider.model}", system_message, prompt)
+    if bypass_cache:
+        llm_cache.record_bypass()
+    else:
+        cached = await llm_cache.get(key)
+        if cached is not None:
+            llm_metrics.record_cache_hit(call_site)
+            return cached
+
+    def send():
+        return llm_provider.send(session_id, system_message, prompt)
+
+    def on_attempt(seconds, wait_seconds, response, error):
+        response_text = None if response is None else str(response)
+        llm_metrics.record_call(call_site, seconds, wait_seconds, prompt, response_text, error)
+
+    hedge_delay = llm_policy.hedge_delay(
+        llm_metrics.percentile(call_site, llm_policy.hedge_percentile, llm_policy.hedge_min_samples)
+    )
+    response = await call_with_policy(
+        send,
+        llm_policy,
+        slot=lambda: llm_scheduler.slot(user_id),
+        hedge_delay=hedge_delay,
+        on_attempt=on_attempt
+    )
+    response_text = response if isinstance(response, str) else str(response)
+
+    await llm_cache.set(key, response_text, model=f"{llm_provider.name}/{llm_provider.model}")
+    return response_text
+
+
+async def forget_llm_response(system_message: str, prompt: str):
+    """Remove a cached response so the next identical call goes to the LLM again"""
+    await llm_cache.delete(make_cache_key(f"{llm_provider.name}/{llm_provider.model}", system_message, prompt))
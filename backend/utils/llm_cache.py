@@ -0,0 +1,144 @@
+"""Content-addressed cache for LLM responses"""
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone, timedelta
+
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', 'true').lower() == 'true'
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 512))
+LLM_CACHE_TTL_SECONDS = int(os.environ.get('LLM_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+
+_WHITESPACE_RUN = re.compile(r'[ \t]+')
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a prompt so insignificant whitespace differences hash the same"""
+    text = unicodedata.normalize('NFC', text or '')
+    lines = [_WHITESPACE_RUN.sub(' ', line).strip() for line in text.strip().splitlines()]
+    return '\n'.join(lines)
+
+
+def make_cache_key(model: str, system_message: str, prompt: str) -> str:
+    """Hash of the normalized (model, system_message, prompt) triple"""
+    payload = json.dumps([model, normalize_text(system_message), normalize_text(prompt)], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LlmResponseCache:
+    """Two-tier LLM response cache: an in-process LRU with TTL in front of Mongo.
+
+    The Mongo tier lives in the `llm_response_cache` collection and is shared by
+    every worker; a TTL index on `expires_at` lets Mongo drop stale entries.
+    """
+
+    def __init__(self, db, max_entries: int = LLM_CACHE_MAX_ENTRIES, ttl_seconds: int = LLM_CACHE_TTL_SECONDS, enabled: bool = LLM_CACHE_ENABLED):
+        self.db = db
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, response)
+        self._indexes_ready = False
+        self.stats = {'memory_hits': 0, 'mongo_hits': 0, 'misses': 0, 'writes': 0, 'bypassed': 0}
+
+    async def get(self, key: str):
+        """Return the cached response for `key`, or None"""
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return response
+            del self._entries[key]
+
+        try:
+            doc = await self.db.llm_response_cache.find_one(
+                {"key": key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                {"_id": 0, "response": 1}
+            )
+        except Exception as e:
+            logging.warning(f"LLM cache lookup failed: {str(e)}")
+            doc = None
+
+        if doc:
+            self.stats['mongo_hits'] += 1
+            self._remember(key, doc['response'])
+            return doc['response']
+
+        self.stats['misses'] += 1
+        return None
+
+    async def set(self, key: str, response: str, model: str = None):
+        """Store a response in both tiers"""
+        if not self.enabled or not response:
+            return
+
+        self._remember(key, response)
+        self.stats['writes'] += 1
+
+        now = datetime.now(timezone.utc)
+        try:
+            await self._ensure_indexes()
+            await self.db.llm_response_cache.update_one(
+                {"key": key},
+                {"$set": {
+                    "key": key,
+                    "model": model,
+                    "response": response,
+                    "created_at": now.isoformat(),
+                    # Stored as a real date (not an ISO string) so the TTL index can expire it
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            logging.warning(f"LLM cache write failed: {str(e)}")
+
+    async def delete(self, key: str):
+        """Drop a response from both tiers, e.g. after it turned out to be unusable"""
+        self._entries.pop(key, None)
+        if not self.enabled:
+            return
+        try:
+            await self.db.llm_response_cache.delete_one({"key": key})
+        except Exception as e:
+            logging.warning(f"LLM cache delete failed: {str(e)}")
+
+    def record_bypass(self):
+        self.stats['bypassed'] += 1
+
+    def get_stats(self) -> dict:
+        hits = self.stats['memory_hits'] + self.stats['mongo_hits']
+        lookups = hits + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0,
+            'memory_entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'enabled': self.enabled
+        }
+
+    def clear_memory(self):
+        self._entries.clear()
+
+    def _remember(self, key: str, response: str):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        await self.db.llm_response_cache.create_index("key", unique=True)
+        await self.db.llm_response_cache.create_index("expires_at", expireAfterSeconds=0)
+        self._indexes_ready = True
@@ -0,0 +1,51 @@
+"""Process-wide LLM client manager: chat settings resolved once per model"""
+import os
+
+
+class LlmClientManager:
+    """Builds the LlmChat objects every LLM call in the process uses.
+
+    Settings (API key, provider, model) are resolved once per
+    (provider, model) and reused. A chat is still created per call: LlmChat
+    keeps its session's history, so reusing one across calls would carry a
+    failed attempt's messages into the next. LlmChat opens its own HTTP
+    connections; this manager does not pool them.
+    """
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key
+        self._models = {}  # (provider, model) -> resolved settings
+        self.stats = {'chats_created': 0}
+
+    def model_config(self, provider: str, model: str) -> dict:
+        """Settings for one provider/model pair, resolved once and cached"""
+        key = (provider, model)
+        config = self._models.get(key)
+        if config is None:
+            config = {
+                'provider': provider,
+                'model': model,
+                'api_key': self.api_key or os.environ.get('EMERGENT_LLM_KEY')
+            }
+            self._models[key] = config
+        return config
+
+    def get_chat(self, session_id: str, system_message: str, provider: str, model: str):
+        """A new chat for one session, with the model's cached settings"""
+        from emergentintegrations.llm.chat import LlmChat
+
+        config = self.model_config(provider, model)
+        chat = LlmChat(
+            api_key=config['api_key'],
+            session_id=session_id,
+            system_message=system_message
+        )
+        chat.with_model(config['provider'], config['model'])
+        self.stats['chats_created'] += 1
+        return chat
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            'models': [f"{provider}/{model}" for provider, model in self._models]
+        }
@@ -0,0 +1,246 @@
+"""Instrumentation for LLM calls: per call site histograms and per-request summaries"""
+import logging
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Seconds, and estimated tokens; the last bucket of every histogram is +Inf
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Latencies kept per call site for percentile estimates
+RECENT_LATENCIES = 500
+
+_request_summary = ContextVar('llm_request_summary', default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English prose)"""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def _round(value):
+    return round(value, 4) if value is not None else None
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus-style cumulative counts"""
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """[(upper bound, observations <= bound)], ending with ('+Inf', count)"""
+        result = []
+        running = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            running += count
+            result.append((bound, running))
+        return result
+
+    def to_dict(self) -> dict:
+        return {
+            'buckets': {str(bound): count for bound, count in self.cumulative()},
+            'sum': round(self.sum, 4),
+            'count': self.count
+        }
+
+
+class CallSiteStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.errors_by_type = {}
+        self.cache_hits = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queue_wait = Histogram(LATENCY_BUCKETS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.response_tokens = Histogram(TOKEN_BUCKETS)
+        self.prompt_chars = 0
+        self.response_chars = 0
+        self.recent = deque(maxlen=RECENT_LATENCIES)
+
+    def percentile(self, q: float):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_rate': round(self.errors / self.calls, 4) if self.calls else 0,
+            'errors_by_type': dict(self.errors_by_type),
+            'cache_hits': self.cache_hits,
+            'prompt_chars': self.prompt_chars,
+            'response_chars': self.response_chars,
+            'estimated_prompt_tokens': round(self.prompt_tokens.sum),
+            'estimated_response_tokens': round(self.response_tokens.sum),
+            'p50_seconds': _round(self.percentile(0.5)),
+            'p95_seconds': _round(self.percentile(0.95)),
+            'latency_seconds': self.latency.to_dict(),
+            'queue_wait_seconds': self.queue_wait.to_dict(),
+            'prompt_tokens': self.prompt_tokens.to_dict(),
+            'response_tokens': self.response_tokens.to_dict()
+        }
+
+
+class RequestSummary:
+    """LLM usage accumulated while handling one request or job"""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.calls = 0
+        self.cache_hits = 0
+        self.errors = 0
+        self.llm_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.call_sites = {}
+
+    def log(self):
+        sites = ', '.join(f"{site}={count}" for site, count in sorted(self.call_sites.items()))
+        logging.info(
+            f"LLM usage for {self.label}: {self.calls} calls ({sites}), {self.cache_hits} cached, "
+            f"{self.errors} failed, {self.llm_seconds:.2f}s in LLM, {self.wait_seconds:.2f}s queued, "
+            f"~{self.prompt_tokens} prompt / ~{self.response_tokens} response tokens"
+        )
+
+
+class LlmMetrics:
+    """Process-wide LLM call metrics, keyed by call site"""
+
+    def __init__(self):
+        self.sites = {}
+        self.started_at = time.time()
+
+    def _site(self, call_site: str) -> CallSiteStats:
+        call_site = call_site or 'other'
+        stats = self.sites.get(call_site)
+        if stats is None:
+            stats = self.sites[call_site] = CallSiteStats()
+        return stats
+
+    def record_call(self, call_site: str, seconds: float, wait_seconds: float, prompt: str, response: str = None, error: Exception = None):
+        """Record one call that reached the provider, successful or not"""
+        call_site = call_site or 'other'
+        stats = self._site(call_site)
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = estimate_tokens(response)
+
+        stats.calls += 1
+        stats.latency.observe(seconds)
+        stats.queue_wait.observe(wait_seconds)
+        stats.prompt_tokens.observe(prompt_tokens)
+        stats.prompt_chars += len(prompt or '')
+        if error is not None:
+            stats.errors += 1
+            error_type = type(error).__name__
+            stats.errors_by_type[error_type] = stats.errors_by_type.get(error_type, 0) + 1
+        else:
+            stats.response_tokens.observe(response_tokens)
+            stats.response_chars += len(response or '')
+            stats.recent.append(seconds)
+
+        summary = _request_summary.get()
+        if summary is not None:
+            summary.calls += 1
+            summary.errors += error is not None
+            summary.llm_seconds += seconds
+            summary.wait_seconds += wait_seconds
+            summary.prompt_tokens += prompt_tokens
+            summary.response_tokens += response_tokens
+            summary.call_sites[call_site] = summary.call_sites.get(call_site, 0) + 1
+
+    def record_cache_hit(self, call_site: str):
+        self._site(call_site).cache_hits += 1
+        summary = _request_summary.get()
+        if summary is not None:
+            summary.cache_hits += 1
+
+    def percentile(self, call_site: str, q: float, min_samples: int = 1):
+        """Recent successful-call latency percentile for a call site, or None with fewer than `min_samples` calls"""
+        stats = self.sites.get(call_site or 'other')
+        if stats is None or len(stats.recent) < max(1, min_samples):
+            return None
+        return stats.percentile(q)
+
+    @contextmanager
+    def track_request(self, label: str):
+        """Collect the LLM calls made inside the block and log one summary line at the end"""
+        summary = RequestSummary(label)
+        token = _request_summary.set(summary)
+        try:
+            yield summary
+        finally:
+            _request_summary.reset(token)
+            if summary.calls or summary.cache_hits:
+                summary.log()
+
+    def get_stats(self) -> dict:
+        return {
+            'uptime_seconds': round(time.time() - self.started_at),
+            'call_sites': {site: stats.to_dict() for site, stats in sorted(self.sites.items())}
+        }
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def histogram(name: str, help_text: str, attr: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for site, stats in sorted(self.sites.items()):
+                hist = getattr(stats, attr)
+                for bound, count in hist.cumulative():
+                    lines.append(f'{name}_bucket{{call_site="{site}",le="{bound}"}} {count}')
+                lines.append(f'{name}_sum{{call_site="{site}"}} {hist.sum}')
+                lines.append(f'{name}_count{{call_site="{site}"}} {hist.count}')
+
+        def counter(name: str, help_text: str, attr: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for site, stats in sorted(self.sites.items()):
+                lines.append(f'{name}{{call_site="{site}"}} {getattr(stats, attr)}')
+
+        counter('llm_calls_total', 'LLM calls sent to the provider', 'calls')
+        counter('llm_errors_total', 'LLM calls that raised', 'errors')
+        counter('llm_cache_hits_total', 'LLM calls answered from the response cache', 'cache_hits')
+        histogram('llm_call_seconds', 'Wall time of LLM provider calls', 'latency')
+        histogram('llm_queue_wait_seconds', 'Time LLM calls waited for a scheduler slot', 'queue_wait')
+        histogram('llm_prompt_tokens', 'Estimated prompt tokens per call', 'prompt_tokens')
+        histogram('llm_response_tokens', 'Estimated response tokens per call', 'response_tokens')
+        return '\n'.join(lines) + '\n'
+
+
+class LlmUsageMiddleware:
+    """ASGI middleware that logs a summary of the LLM calls made by each request.
+
+    Pure ASGI rather than BaseHTTPMiddleware so streamed responses are
+    covered until their last byte.
+    """
+
+    def __init__(self, app, metrics: LlmMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        with self.metrics.track_request(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
@@ -0,0 +1,205 @@
+"""Pluggable LLM providers: the real emergentintegrations client and an offline fake"""
+import abc
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'emergent')
+LLM_FAKE_LATENCY = os.environ.get('LLM_FAKE_LATENCY', 'lognormal:1.5,0.4')
+LLM_FAKE_FAILURE_RATE = float(os.environ.get('LLM_FAKE_FAILURE_RATE', 0))
+LLM_FAKE_SEED = int(os.environ.get('LLM_FAKE_SEED', 42))
+
+
+class LlmProvider(abc.ABC):
+    """Interface every LLM backend implements.
+
+    `send` takes one prompt and returns the response text. `name` and `model`
+    namespace the response cache, so a backend never serves another's replies.
+    """
+    name = "base"
+    model = "none"
+
+    @abc.abstractmethod
+    async def send(self, session_id: str, system_message: str, prompt: str) -> str:
+        """Send `prompt` in a fresh conversation and return the response text"""
+
+    def get_stats(self) -> dict:
+        return {'backend': self.name, 'model': self.model}
+
+
+class EmergentProvider(LlmProvider):
+    """Sends prompts through emergentintegrations' LlmChat, built by the client manager"""
+
+    def __init__(self, clients, provider: str, model: str):
+        self.clients = clients
+        self.name = provider
+        self.model = model
+
+    async def send(self, session_id: str, system_message: str, prompt: str) -> str:
+        from emergentintegrations.llm.chat import UserMessage
+
+        # A fresh chat per call so a failed attempt leaves no history behind
+        chat = self.clients.get_chat(session_id, system_message, self.name, self.model)
+        response = await chat.send_message(UserMessage(text=prompt))
+        return response if isinstance(response, str) else str(response)
+
+    def get_stats(self) -> dict:
+        return {**super().get_stats(), 'clients': self.clients.get_stats()}
+
+
+class FakeLlmError(Exception):
+    """Failure injected by FakeLlmProvider"""
+
+
+def parse_latency_spec(spec: str):
+    """Turn 'fixed:S', 'uniform:LO,HI', 'normal:MEAN,SD' or 'lognormal:MEDIAN,SIGMA' into a sampler"""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v.strip()]
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal' and len(values) == 2:
+        return lambda rng: values[0] * rng.lognormvariate(0, values[1])
+    raise ValueError(f"Invalid LLM_FAKE_LATENCY '{spec}'; use fixed:S, uniform:LO,HI, normal:MEAN,SD or lognormal:MEDIAN,SIGMA")
+
+
+_DAY_SECTION_TITLES = [
+    ('learner_outcomes', "Learner Outcomes/Objectives"),
+    ('standards', "Standards"),
+    ('materials_needed', "Materials Needed"),
+    ('anticipatory_set', "Anticipatory Set"),
+    ('teaching_lesson', "Teaching the Lesson"),
+    ('modeling', "Modeling"),
+    ('instructional_strategies', "Instructional Strategies"),
+    ('check_understanding', "Check for Understanding"),
+    ('guided_practice', "Guided Practice/Monitoring"),
+    ('independent_practice', "Independent Practice"),
+    ('closure', "Closure"),
+    ('summative_assessment', "Summative Assessment"),
+    ('formative_assessment', "Formative Assessment"),
+    ('extended_activities', "Extended Activities"),
+    ('review_reteach', "Review and Reteach Activities"),
+    ('early_finishers', "Early Finishers Activities"),
+]
+
+
+class FakeLlmProvider(LlmProvider):
+    """Offline stand-in that answers every prompt the app sends with well-formed content.
+
+    Responses depend only on the prompt (and seed), so identical prompts get
+    identical replies. Latency is drawn from `latency` (see parse_latency_spec)
+    and `failure_rate` of calls raise FakeLlmError; both come from one seeded
+    generator, so a run is reproducible.
+    """
+    name = "fake"
+    model = "fake-lesson-model"
+
+    def __init__(self, latency: str = LLM_FAKE_LATENCY, failure_rate: float = LLM_FAKE_FAILURE_RATE, seed: int = LLM_FAKE_SEED):
+        self.latency_spec = latency
+        self.sample_latency = parse_latency_spec(latency)
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.stats = {'calls': 0, 'failures': 0}
+
+    async def send(self, session_id: str, system_message: str, prompt: str) -> str:
+        self.stats['calls'] += 1
+        await asyncio.sleep(self.sample_latency(self.random))
+        if self.random.random() < self.failure_rate:
+            self.stats['failures'] += 1
+            raise FakeLlmError("Injected fake LLM failure")
+        return self.respond(prompt)
+
+    def respond(self, prompt: str) -> str:
+        rng = random.Random(f"{self.seed}:{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}")
+        if 'JSON object with exactly these' in prompt:
+            return json.dumps(self._day_sections(prompt, rng))
+        if prompt.startswith('Create a detailed lesson plan'):
+            sections = self._day_sections(prompt, rng)
+            return '\n\n'.join(f"## {idx}. {title}\n{sections[key]}" for idx, (key, title) in enumerate(_DAY_SECTION_TITLES, 1))
+        match = re.search(r'Generate (\d+) multiple choice questions', prompt)
+        if match:
+            return json.dumps(self._questions(int(match.group(1)), self._field(prompt, 'Standard'), rng))
+        if 'remediation activities' in prompt:
+            skill = self._field(prompt, 'Standard/Skill')
+            return '\n'.join(
+                f"{idx}. {activity} for {skill}. Students work for {rng.choice([5, 10, 15])} minutes using {rng.choice(['whiteboards', 'index cards', 'manipulatives', 'sticky notes'])}."
+                for idx, activity in enumerate(['Guided review', 'Partner practice', 'Concrete model', 'Error analysis', 'Exit ticket check'], 1)
+            )
+        return f"Fake response ({len(prompt)} character prompt)."
+
+    @staticmethod
+    def _field(prompt: str, label: str, default: str = 'the topic') -> str:
+        match = re.search(rf'^{re.escape(label)}: (.+)$', prompt, re.MULTILINE)
+        return match.group(1).strip() if match else default
+
+    def _day_sections(self, prompt: str, rng) -> dict:
+        textbook = self._field(prompt, 'Textbook')
+        lesson_range = self._field(prompt, 'Lesson Range')
+        standards = self._field(prompt, 'State Standards to Align With', default=None)
+        assessment = self._field(prompt, 'Next Major Assessment')
+        day = re.search(r'Day (\d+) of (\d+)', prompt)
+        day_label = f"day {day.group(1)} of {day.group(2)}" if day else "today"
+        minutes = rng.choice([5, 10, 15])
+
+        return {
+            'learner_outcomes': f"- Students will explain the key ideas of {lesson_range} ({day_label})\n- Students will apply them to a new example",
+            'standards': '\n'.join(f"- {code.strip()}: aligned to {lesson_range}" for code in standards.split(',')) if standards else f"- Standards for {lesson_range}",
+            'materials_needed': f"{textbook}, whiteboards, exit tickets",
+            'anticipatory_set': f"{minutes}-minute warm-up question connecting yesterday's work to {lesson_range}.",
+            'teaching_lesson': f"Direct instruction on {lesson_range} using examples from {textbook}.",
+            'modeling': "Teacher thinks aloud through a worked example.",
+            'instructional_strategies': rng.choice(["Think-pair-share", "Jigsaw groups", "Gradual release"]) + ", graphic organizers",
+            'check_understanding': "Thumbs up/down and cold-call questions.",
+            'guided_practice': "Pairs complete practice items while the teacher circulates.",
+            'independent_practice': f"Students complete {rng.randint(4, 10)} practice problems.",
+            'closure': "Exit ticket summarizing the main idea.",
+            'summative_assessment': f"Not applicable today (next major assessment: {assessment})",
+            'formative_assessment': "Exit ticket review.",
+            'extended_activities': f"Research an extension topic related to {lesson_range}.",
+            'review_reteach': "Small-group reteach using the exit ticket results.",
+            'early_finishers': "Challenge problems and vocabulary puzzle.",
+        }
+
+    @staticmethod
+    def _questions(count: int, standard: str, rng) -> list:
+        questions = []
+        for idx in range(count):
+            correct = rng.randint(0, 3)
+            options = [f"Distractor {letter} for question {idx + 1}" for letter in 'ABCD']
+            options[correct] = f"Correct answer for question {idx + 1}"
+            questions.append({
+                "question_text": f"Question {idx + 1}: which statement best matches standard {standard}?",
+                "options": options,
+                "correct_answer": correct,
+                "skill": standard
+            })
+        return questions
+
+    def get_stats(self) -> dict:
+        return {**super().get_stats(), **self.stats, 'latency': self.latency_spec, 'failure_rate': self.failure_rate}
+
+
+# Backends selectable with LLM_BACKEND; register_llm_backend adds more
+LLM_BACKENDS = {
+    'emergent': lambda clients, provider, model: EmergentProvider(clients, provider, model),
+    'fake': lambda clients, provider, model: FakeLlmProvider(),
+}
+
+
+def register_llm_backend(name: str, factory):
+    """Make a backend selectable by LLM_BACKEND; `factory(clients, provider, model)` returns an LlmProvider"""
+    LLM_BACKENDS[name] = factory
+
+
+def create_llm_provider(clients, provider: str, model: str, backend: str = None) -> LlmProvider:
+    backend = backend or LLM_BACKEND
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"Unknown LLM_BACKEND '{backend}'; available: {', '.join(sorted(LLM_BACKENDS))}")
+    return LLM_BACKENDS[backend](clients, provider, model)
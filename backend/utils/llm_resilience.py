@@ -0,0 +1,126 @@
+"""Deadlines, retries with jittered backoff, and hedged requests for LLM calls"""
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import nullcontext
+
+LLM_CALL_TIMEOUT = float(os.environ.get('LLM_CALL_TIMEOUT', 90))
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BASE_DELAY = float(os.environ.get('LLM_RETRY_BASE_DELAY', 1))
+LLM_RETRY_MAX_DELAY = float(os.environ.get('LLM_RETRY_MAX_DELAY', 20))
+LLM_HEDGE_ENABLED = os.environ.get('LLM_HEDGE_ENABLED', 'false').lower() == 'true'
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', 0.95))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get('LLM_HEDGE_MIN_SAMPLES', 20))
+LLM_HEDGE_MIN_DELAY = float(os.environ.get('LLM_HEDGE_MIN_DELAY', 1))
+
+
+class LlmCallTimeout(Exception):
+    """Raised when one LLM attempt runs past its deadline"""
+
+
+class LlmCallPolicy:
+    """How long one LLM attempt may take, how often to retry, and when to hedge.
+
+    Retries use exponential backoff with full jitter: the wait before retry n
+    is uniform in [0, min(max_delay, base_delay * 2**n)], so callers that failed
+    together do not retry in lockstep. With hedging on, a duplicate request is
+    sent once the first has been running for the call site's recent p95
+    latency (never sooner than `hedge_min_delay`), and whichever answers first
+    wins.
+    """
+
+    def __init__(self, timeout: float = LLM_CALL_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 base_delay: float = LLM_RETRY_BASE_DELAY, max_delay: float = LLM_RETRY_MAX_DELAY,
+                 hedge: bool = LLM_HEDGE_ENABLED, hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES, hedge_min_delay: float = LLM_HEDGE_MIN_DELAY):
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+
+    def backoff(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    def hedge_delay(self, latency_percentile) -> float:
+        """Delay before sending a hedge, or None to not hedge (disabled or too little data)"""
+        if not self.hedge or latency_percentile is None:
+            return None
+        return max(self.hedge_min_delay, latency_percentile)
+
+
+async def _attempt(send, policy: LlmCallPolicy, slot, on_attempt):
+    queued_at = time.perf_counter()
+    async with (slot() if slot else nullcontext()):
+        started_at = time.perf_counter()
+
+        def report(response=None, error=None):
+            if on_attempt:
+                on_attempt(time.perf_counter() - started_at, started_at - queued_at, response, error)
+
+        try:
+            response = await asyncio.wait_for(send(), policy.timeout)
+        except asyncio.TimeoutError:
+            error = LlmCallTimeout(f"LLM call exceeded its {policy.timeout:g}s deadline")
+            report(error=error)
+            raise error
+        except Exception as e:
+            report(error=e)
+            raise
+        report(response)
+        return response
+
+
+async def _hedged(run, delay: float):
+    """Run `run()`, starting a second copy after `delay`; return the first success"""
+    tasks = [asyncio.ensure_future(run())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result()
+
+        tasks.append(asyncio.ensure_future(run()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def call_with_policy(send, policy: LlmCallPolicy, slot=None, hedge_delay: float = None, on_attempt=None):
+    """Call `send()` under `policy`: a deadline per attempt, retries, optional hedging.
+
+    `send` is a zero-argument callable returning a fresh awaitable per attempt.
+    `slot`, if given, returns an async context manager held for each attempt
+    (released while backing off). `on_attempt(seconds, wait_seconds, response,
+    error)` is called after every attempt that reached `send`, except hedges
+    cancelled because the other copy won. The last error is raised once the
+    retries are used up.
+    """
+    async def run():
+        return await _attempt(send, policy, slot, on_attempt)
+
+    for retry in range(policy.max_retries + 1):
+        try:
+            if hedge_delay is not None:
+                return await _hedged(run, hedge_delay)
+            return await run()
+        except Exception as e:
+            if retry >= policy.max_retries:
+                raise
+            delay = policy.backoff(retry)
+            logging.warning(f"LLM call failed ({type(e).__name__}: {str(e)}), retry {retry + 1}/{policy.max_retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
@@ -0,0 +1,129 @@
+"""Fair scheduler that every LLM call passes through"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+LLM_PER_USER_CONCURRENCY = int(os.environ.get('LLM_PER_USER_CONCURRENCY', 4))
+
+
+class LlmScheduler:
+    """Global cap on in-flight LLM calls, shared round-robin between users.
+
+    At most `max_concurrency` calls run at once, and one user never holds more
+    than `per_user_concurrency` of them. When a slot frees up it goes to the
+    next user in round-robin order who has a call waiting, so a teacher
+    generating a long plan cannot starve someone who asked for a few quiz
+    questions. Within one user, calls run in arrival order.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, per_user_concurrency: int = LLM_PER_USER_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_user_concurrency = max(1, per_user_concurrency)
+        self._running = {}  # user -> calls in flight
+        self._waiting = OrderedDict()  # user -> deque of futures; key order is the round-robin order
+        self._in_flight = 0
+        self.stats = {'granted': 0, 'queued': 0, 'cancelled': 0, 'max_queue_depth': 0, 'total_wait_seconds': 0.0, 'max_wait_seconds': 0.0}
+
+    @asynccontextmanager
+    async def slot(self, user_id: str = None):
+        """Hold one LLM slot for `user_id` for the duration of the block"""
+        user = user_id or 'anonymous'
+        start = time.monotonic()
+        await self._acquire(user)
+        self._record_wait(time.monotonic() - start)
+        try:
+            yield
+        finally:
+            self._release(user)
+
+    async def _acquire(self, user: str):
+        if not self._waiting and self._can_run(user):
+            self._start(user)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiting.setdefault(user, deque()).append(future)
+        # Other waiters may all be at their per-user cap while this user is not
+        self._dispatch()
+        if not future.done():
+            self.stats['queued'] += 1
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], self.queue_depth())
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we were cancelled; pass it on
+                self._release(user)
+            else:
+                self._remove_waiter(user, future)
+            self.stats['cancelled'] += 1
+            raise
+
+    def _can_run(self, user: str) -> bool:
+        return self._in_flight < self.max_concurrency and self._running.get(user, 0) < self.per_user_concurrency
+
+    def _start(self, user: str):
+        self._in_flight += 1
+        self._running[user] = self._running.get(user, 0) + 1
+        self.stats['granted'] += 1
+
+    def _release(self, user: str):
+        self._in_flight -= 1
+        self._running[user] -= 1
+        if not self._running[user]:
+            del self._running[user]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hand free slots to waiting users in round-robin order"""
+        while self._in_flight < self.max_concurrency:
+            user = next((u for u in self._waiting if self._running.get(u, 0) < self.per_user_concurrency), None)
+            if user is None:
+                return
+
+            waiters = self._waiting.pop(user)
+            future = waiters.popleft()
+            if waiters:
+                # Back of the line until every other waiting user has had a turn
+                self._waiting[user] = waiters
+
+            self._start(user)
+            future.set_result(None)
+
+    def _remove_waiter(self, user: str, future):
+        waiters = self._waiting.get(user)
+        if waiters is None:
+            return
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+        if not waiters:
+            del self._waiting[user]
+
+    def _record_wait(self, seconds: float):
+        self.stats['total_wait_seconds'] += seconds
+        self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], seconds)
+
+    def queue_depth(self) -> int:
+        return sum(len(waiters) for waiters in self._waiting.values())
+
+    def get_stats(self) -> dict:
+        granted = self.stats['granted']
+        return {
+            **self.stats,
+            'total_wait_seconds': round(self.stats['total_wait_seconds'], 3),
+            'max_wait_seconds': round(self.stats['max_wait_seconds'], 3),
+            'avg_wait_seconds': round(self.stats['total_wait_seconds'] / granted, 3) if granted else 0,
+            'in_flight': self._in_flight,
+            'queue_depth': self.queue_depth(),
+            'max_concurrency': self.max_concurrency,
+            'per_user_concurrency': self.per_user_concurrency,
+            'users': {
+                user: {'running': self._running.get(user, 0), 'queued': len(self._waiting.get(user, ()))}
+                for user in set(self._running) | set(self._waiting)
+            }
+        }
@@ -0,0 +1,175 @@
+"""Objectives and standards extracted from a lesson plan, stored on the plan per version"""
+import re
+import uuid
+
+# Bump when extraction output changes; stored extractions from older parsers are recomputed
+PLAN_EXTRACTION_PARSER_VERSION = 1
+
+# "### 2. Standards" or "2. Standards" inside teaching_lesson, up to the next numbered section
+_STANDARDS_SECTION = re.compile(r'(?:###\s*)?2\.\s*Standards?\s*\n(.*?)(?=\n(?:###\s*)?\d+\.|$)', re.IGNORECASE | re.DOTALL)
+# Standard code before a colon (e.g., "7.G.1: Description"); matches 7.G.1, MS.SS.7.3, CCSS.ELA-LITERACY.RI.RH.6-8.2
+_COLON_CODE = re.compile(r'^[\s\-\*\•]*([A-Z0-9][A-Z0-9\.\-]+[0-9A-Z])(?:\s*[:)]|$)', re.IGNORECASE)
+# Standard codes in brackets or bold (e.g., "**7.G.2**")
+_BRACKET_CODE = re.compile(r'[\[\*]+([A-Z0-9][A-Z0-9\.\-]+[0-9A-Z])[\]\*]+', re.IGNORECASE)
+_DIGIT = re.compile(r'\d')
+
+# Projection with everything extract_plan_objectives reads
+PLAN_EXTRACTION_FIELDS = {
+    "_id": 0, "version": 1, "output_format": 1,
+    "daily_plans.day_name": 1, "daily_plans.day_date": 1, "daily_plans.standards": 1,
+    "daily_plans.teaching_lesson": 1, "daily_plans.learner_outcomes": 1
+}
+
+
+def _is_standard_code(code: str) -> bool:
+    return '.' in code and _DIGIT.search(code) is not None  # Must have digit and dot
+
+
+def extract_plan_objectives(plan: dict) -> dict:
+    """Learner outcomes and deduplicated standard codes from a plan's days.
+
+    Returns the stored form, {plan_version, parser_version, objectives:
+    [{text, day, date}], standards: [code, ...]}; ids and selection state
+    are added per request by plan_extraction_response.
+    """
+    objectives = []
+    all_standards_text = []
+
+    json_sections = plan.get('output_format') == 'json'
+    for day_plan in plan.get('daily_plans', []):
+        # Collect standards from the standards field
+        standards_text = day_plan.get('standards', '')
+        if standards_text and 'see full plan below' not in standards_text.lower():
+            all_standards_text.append(standards_text)
+
+        # Also check teaching_lesson for a mixed-in "2. Standards" section
+        # (JSON-mode plans never mix sections, so there is nothing to dig out)
+        teaching_lesson = day_plan.get('teaching_lesson', '') if not json_sections else ''
+        if teaching_lesson and '2. Standards' in teaching_lesson:
+            match = _STANDARDS_SECTION.search(teaching_lesson)
+            if match:
+                all_standards_text.append(match.group(1))
+
+        if day_plan.get('learner_outcomes'):
+            # Parse objectives (split by line, bullet points, or numbers)
+            for line in day_plan['learner_outcomes'].split('\n'):
+                clean_line = line.strip().lstrip('•-*123456789.() ').strip()
+                if len(clean_line) > 10:
+                    objectives.append({'text': clean_line, 'day': day_plan['day_name'], 'date': day_plan['day_date']})
+
+    # Parse and deduplicate standards - extract only standard numbers/codes
+    unique_standards = set()
+    for standards_text in all_standards_text:
+        # Skip placeholder text
+        lowered = standards_text.lower()
+        if 'see full plan below' in lowered or 'content will be generated' in lowered:
+            continue
+
+        for line in standards_text.split('\n'):
+            match = _COLON_CODE.match(line.strip())
+            if match:
+                code = match.group(1).strip()
+                if _is_standard_code(code):
+                    unique_standards.add(code)
+                continue
+
+            for code in _BRACKET_CODE.findall(line):
+                if _is_standard_code(code):
+                    unique_standards.add(code.strip())
+
+    return {
+        "plan_version": plan.get('version', 0),
+        "parser_version": PLAN_EXTRACTION_PARSER_VERSION,
+        "objectives": objectives,
+        "standards": sorted(unique_standards)
+    }
+
+
+def is_extraction_current(plan: dict) -> bool:
+    """Whether the plan's stored extraction matches its version and the current parser"""
+    extracted = plan.get('extracted') or {}
+    return (
+        extracted.get('parser_version') == PLAN_EXTRACTION_PARSER_VERSION
+        and extracted.get('plan_version') == plan.get('version', 0)
+    )
+
+
+def plan_extraction_response(extracted: dict) -> dict:
+    """The extract-objectives response: every objective and standard selected, with fresh ids"""
+    return {
+        "objectives": [
+            {'id': str(uuid.uuid4()), **objective, 'selected': True}
+            for objective in extracted['objectives']
+        ],
+        "standards": [
+            {'id': str(uuid.uuid4()), 'text': std, 'selected': True}
+            for std in extracted['standards']
+        ]
+    }
+
+
+async def refresh_plan_extraction(db, plan_id: str, plan: dict = None) -> dict:
+    """Extract and store objectives for the plan's current version; returns the extraction.
+
+    The write only lands if the plan is still at the version that was read,
+    so a concurrent edit is never overwritten with stale objectives. It does
+    not bump `version`: the extraction is derived from the content, not a
+    change to it.
+    """
+    if plan is None:
+        plan = await db.lesson_plans.find_one({"id": plan_id}, PLAN_EXTRACTION_FIELDS)
+        if not plan:
+            return None
+    extracted = extract_plan_objectives(plan)
+    # version None also matches plans saved before versions existed
+    await db.lesson_plans.update_one(
+        {"id": plan_id, "version": plan.get('version')},
+        {"$set": {"extracted": extracted}}
+    )
+    return extracted
+
+
+async def update_plan_status(db, plan_id: str, fields: dict):
+    """Set fields that are not lesson content (submission and review status) and bump the plan's version.
+
+    A stored extraction is bumped along with it, so it stays current. Plans
+    without one (`extracted` missing, or null as on drafts) only get the
+    version bump: Mongo cannot $inc a field under a null parent, and a bare
+    `extracted.plan_version` would pass for a real extraction's.
+    """
+    result = await db.lesson_plans.update_one(
+        {"id": plan_id, "extracted": {"$type": "object"}},
+        {"$set": fields, "$inc": {"version": 1, "extracted.plan_version": 1}}
+    )
+    if not result.matched_count:
+        await db.lesson_plans.update_one({"id": plan_id}, {"$set": fields, "$inc": {"version": 1}})
+
+
+async def get_plan_extraction(db, query: dict) -> dict:
+    """Stored extraction for the plan matching `query`, recomputed if the plan changed since; None if no plan"""
+    plan = await db.lesson_plans.find_one(query, {"_id": 0, "id": 1, "version": 1, "extracted": 1})
+    if not plan:
+        return None
+    if is_extraction_current(plan):
+        return plan['extracted']
+
+    plan = await db.lesson_plans.find_one({"id": plan['id']}, {**PLAN_EXTRACTION_FIELDS, "id": 1})
+    if not plan:
+        return None
+    return await refresh_plan_extraction(db, plan['id'], plan)
+
+
+async def backfill_plan_extractions(db, batch_size: int = 200) -> dict:
+    """Store extractions on every plan missing one or holding a stale one; safe to run repeatedly"""
+    scanned = 0
+    refreshed = 0
+    cursor = db.lesson_plans.find(
+        {}, {"_id": 0, "id": 1, "version": 1, "extracted.plan_version": 1, "extracted.parser_version": 1}
+    ).batch_size(batch_size)
+    async for plan in cursor:
+        scanned += 1
+        if is_extraction_current(plan):
+            continue
+        if await refresh_plan_extraction(db, plan['id']) is not None:
+            refreshed += 1
+    return {"plans_scanned": scanned, "plans_refreshed": refreshed}
@@ -0,0 +1,262 @@
+"""Question bank: quiz questions stored by standard and reused before asking the LLM"""
+import asyncio
+import hashlib
+import logging
+import re
+import unicodedata
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+from pymongo import UpdateOne
+
+from .quiz_generation import generate_question_lists, merge_question_lists
+from .standards import canonical_standard_code
+from .question_similarity import (
+    QuestionSimilarityIndex, question_numbers, QUESTION_DUPLICATE_THRESHOLD, QUESTION_SIMILAR_THRESHOLD
+)
+
+QUESTION_GENERATION_MODES = ('generate', 'bank_first')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def question_fingerprint(question: dict) -> str:
+    """Hash of a question's wording and options, ignoring case and spacing"""
+    parts = [question.get('question_text', '')] + [str(option) for option in question.get('options', [])]
+    normalized = '\x1f'.join(_WHITESPACE.sub(' ', unicodedata.normalize('NFKC', part)).strip().lower() for part in parts)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+async def ensure_question_bank_indexes(db):
+    await db.question_bank.create_index([("standard_code", 1), ("fingerprint", 1)], unique=True)
+    await db.question_bank.create_index([("standard_code", 1), ("quiz_count", -1), ("times_served", 1)])
+    await db.question_bank.create_index("created_at")
+
+
+class QuestionBankSimilarity:
+    """In-process near-duplicate index over the bank, kept current from Mongo.
+
+    Every worker holds its own index. `refresh` pulls bank entries created
+    since the last load (by `created_at`), so questions another worker added
+    are seen before the next insert or lookup.
+    """
+
+    def __init__(self, batch_size: int = 5000):
+        self.index = QuestionSimilarityIndex()
+        self.batch_size = batch_size
+        self.loaded_until = ''
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, db):
+        async with self._lock:
+            batch = []
+            cursor = db.question_bank.find(
+                {"created_at": {"$gte": self.loaded_until}},
+                {"_id": 0, "standard_code": 1, "fingerprint": 1, "question_text": 1, "options": 1, "created_at": 1}
+            ).sort("created_at", 1).batch_size(self.batch_size)
+            async for entry in cursor:
+                self.loaded_until = max(self.loaded_until, entry['created_at'])
+                if (entry['standard_code'], entry['fingerprint']) not in self.index:
+                    batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    await self._add(batch)
+                    batch = []
+            if batch:
+                await self._add(batch)
+
+    async def _add(self, entries: list):
+        # A first load can be the whole bank; hashing it would stall the event loop
+        signatures = await asyncio.to_thread(self.index.compute_signatures, entries)
+        self.index.add_signatures(
+            [(entry['standard_code'], entry['fingerprint']) for entry in entries],
+            signatures,
+            [entry['standard_code'] for entry in entries],
+            [question_numbers(entry) for entry in entries]
+        )
+
+
+question_bank_similarity = QuestionBankSimilarity()
+
+
+async def add_to_question_bank(db, questions: list, source: str, teacher_id: str, quiz_id: str = None) -> int:
+    """Store questions under their normalized standard code; returns how many were new.
+
+    A question already in the bank for the same standard, word for word or
+    a near-duplicate (QUESTION_DUPLICATE_THRESHOLD), is not stored again.
+    Questions saved in a quiz (`quiz_id` given) count once per quiz in
+    `quiz_count` on the entry they matched, which ranks them ahead of
+    generated-only ones.
+    """
+    questions = [
+        q for q in questions
+        if canonical_standard_code(q.get('skill', '')) and q.get('question_text')
+    ]
+    if not questions:
+        return 0
+
+    await question_bank_similarity.refresh(db)
+    index = question_bank_similarity.index
+    signatures = await asyncio.to_thread(index.compute_signatures, questions)
+
+    now = datetime.now(timezone.utc).isoformat()
+    keys = []
+    operations = []
+    inserted = []  # (key, signature, numbers) of questions not matched to an existing entry
+    for question, signature in zip(questions, signatures):
+        standard_code = canonical_standard_code(question['skill'])
+        numbers = question_numbers(question)
+        key = (standard_code, question_fingerprint(question))
+        if key not in index:
+            duplicate = index.find_duplicate_signature(signature, numbers, standard_code) or next(
+                (other for other, other_signature, other_numbers in inserted
+                 if other[0] == standard_code and other_numbers == numbers
+                 and (other_signature == signature).mean() >= QUESTION_DUPLICATE_THRESHOLD),
+                None
+            )
+            if duplicate:
+                keys.append(duplicate)
+                continue
+            if key not in [other for other, _, _ in inserted]:
+                inserted.append((key, signature, numbers))
+        keys.append(key)
+        operations.append(UpdateOne({"standard_code": key[0], "fingerprint": key[1]}, {"$setOnInsert": {
+            "standard_code": key[0],
+            "fingerprint": key[1],
+            "question_text": question['question_text'],
+            "options": question['options'],
+            "correct_answer": question['correct_answer'],
+            "skill": question['skill'],
+            "source": source,
+            "created_by": teacher_id,
+            "created_at": now,
+            "quiz_ids": [],
+            "quiz_count": 0,
+            "times_served": 0
+        }}, upsert=True))
+
+    upserted = 0
+    if operations:
+        upserted = (await db.question_bank.bulk_write(operations, ordered=False)).upserted_count
+    if inserted:
+        index.add_signatures(
+            [key for key, _, _ in inserted],
+            np.array([signature for _, signature, _ in inserted]),
+            [key[0] for key, _, _ in inserted],
+            [numbers for _, _, numbers in inserted]
+        )
+    if quiz_id:
+        # The $ne guard keeps re-saving (or backfilling) the same quiz from counting twice
+        await db.question_bank.bulk_write([
+            UpdateOne(
+                {"standard_code": standard_code, "fingerprint": fingerprint, "quiz_ids": {"$ne": quiz_id}},
+                {"$addToSet": {"quiz_ids": quiz_id}, "$inc": {"quiz_count": 1}, "$set": {"last_saved_at": now}}
+            )
+            for standard_code, fingerprint in dict.fromkeys(keys)
+        ], ordered=False)
+    return upserted
+
+
+async def find_similar_questions(db, question: dict, standard_code: str = None,
+                                 threshold: float = QUESTION_SIMILAR_THRESHOLD, limit: int = 10) -> list:
+    """Bank entries most similar to `question`, each with its estimated `similarity`"""
+    await question_bank_similarity.refresh(db)
+    if standard_code:
+        standard_code = canonical_standard_code(standard_code)
+    matches = question_bank_similarity.index.query(question, threshold, standard_code, limit)
+    if not matches:
+        return []
+
+    # By (standard, fingerprint): the same question banked under another standard must not take a match's place
+    entries = await db.question_bank.find(
+        {"$or": [{"standard_code": key[0], "fingerprint": key[1]} for key, _ in matches]},
+        {"_id": 0, "quiz_ids": 0}
+    ).to_list(len(matches))
+    by_key = {(entry['standard_code'], entry['fingerprint']): entry for entry in entries}
+    return [
+        {**by_key[key], "similarity": round(similarity, 3)}
+        for key, similarity in matches
+        if key in by_key
+    ]
+
+
+async def take_from_question_bank(db, standard_code: str, count: int, exclude: set = None) -> list:
+    """Up to `count` banked questions for a standard, ready to put in a quiz.
+
+    Questions saved in the most quizzes come first, then the least served,
+    so repeated requests rotate through the bank instead of repeating it.
+    """
+    query = {"standard_code": canonical_standard_code(standard_code)}
+    if exclude:
+        query["fingerprint"] = {"$nin": list(exclude)}
+    banked = await db.question_bank.find(query, {"_id": 0}).sort(
+        [("quiz_count", -1), ("times_served", 1)]
+    ).limit(count).to_list(count)
+
+    if banked:
+        await db.question_bank.update_many(
+            {"standard_code": query["standard_code"], "fingerprint": {"$in": [q['fingerprint'] for q in banked]}},
+            {"$inc": {"times_served": 1}}
+        )
+
+    return [
+        {
+            'id': str(uuid.uuid4()),
+            'question_text': q['question_text'],
+            'options': q['options'],
+            'correct_answer': q['correct_answer'],
+            'skill': standard_code,
+            'fingerprint': q['fingerprint']
+        }
+        for q in banked
+    ]
+
+
+async def generate_questions_with_bank(db, standards: list, count: int, user_id: str, session_prefix: str,
+                                       bypass_cache: bool = False, mode: str = 'generate'):
+    """Questions for each standard, merged in the order given.
+
+    'generate' asks the LLM for every standard. 'bank_first' serves what
+    the bank has and asks the LLM only for each standard's shortfall.
+    Generated questions are added to the bank either way. Returns
+    (questions, failures, from_bank).
+    """
+    banked = [[] for _ in standards]
+    if mode == 'bank_first':
+        served = set()
+        for idx, standard_code in enumerate(standards):
+            banked[idx] = await take_from_question_bank(db, standard_code, count, exclude=served)
+            served.update(q.pop('fingerprint') for q in banked[idx])
+
+    # Only standards the bank could not fill go to the LLM, asking for what is missing
+    missing = [idx for idx in range(len(standards)) if len(banked[idx]) < count]
+    results = await generate_question_lists(
+        [standards[idx] for idx in missing], [count - len(banked[idx]) for idx in missing],
+        user_id, session_prefix, bypass_cache=bypass_cache
+    )
+    generated = dict(zip(missing, results))
+
+    new_questions, failures = merge_question_lists([standards[idx] for idx in missing], results)
+    if new_questions:
+        try:
+            await add_to_question_bank(db, new_questions, 'generated', user_id)
+        except Exception as e:
+            logging.warning(f"Could not add generated questions to the question bank: {str(e)}")
+
+    questions = []
+    for idx in range(len(standards)):
+        questions.extend(banked[idx])
+        result = generated.get(idx)
+        if result is not None and not isinstance(result, BaseException):
+            questions.extend(result)
+    return questions, failures, sum(len(served) for served in banked)
+
+
+async def backfill_question_bank(db, batch_size: int = 500) -> dict:
+    """Add the questions of every saved quiz to the bank; safe to run repeatedly"""
+    quizzes = 0
+    added = 0
+    async for quiz in db.quizzes.find({}, {"_id": 0, "id": 1, "teacher_id": 1, "questions": 1}).batch_size(batch_size):
+        quizzes += 1
+        added += await add_to_question_bank(db, quiz.get('questions', []), 'quiz', quiz.get('teacher_id'), quiz_id=quiz['id'])
+    return {"quizzes_scanned": quizzes, "questions_added": added}
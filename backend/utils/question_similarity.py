@@ -0,0 +1,266 @@
+"""Near-duplicate question detection with MinHash signatures and LSH banding"""
+import os
+import re
+import unicodedata
+
+import numpy as np
+
+QUESTION_MINHASH_PERMUTATIONS = int(os.environ.get('QUESTION_MINHASH_PERMUTATIONS', 128))
+QUESTION_LSH_BANDS = int(os.environ.get('QUESTION_LSH_BANDS', 32))
+QUESTION_SHINGLE_SIZE = int(os.environ.get('QUESTION_SHINGLE_SIZE', 5))
+# Estimated Jaccard similarity at which a new bank question counts as a copy of an existing one
+QUESTION_DUPLICATE_THRESHOLD = float(os.environ.get('QUESTION_DUPLICATE_THRESHOLD', 0.8))
+QUESTION_SIMILAR_THRESHOLD = float(os.environ.get('QUESTION_SIMILAR_THRESHOLD', 0.5))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_FNV_OFFSET = np.uint64(14695981039346656037)
+_FNV_PRIME = np.uint64(1099511628211)
+_SHINGLE_MIX = np.uint64(0x9E3779B97F4A7C15)
+_WHITESPACE = re.compile(r'\s+')
+# Punctuation that never changes what a question asks; math symbols are kept
+_PUNCTUATION = re.compile(r"[.,;:!?'\"“”‘’()\[\]]")
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+# Signatures are computed over chunks of this many shingles; small enough that
+# the (permutations x chunk) work buffer stays in cache
+_SIGNATURE_CHUNK_SHINGLES = 8192
+
+
+def question_similarity_text(question: dict) -> str:
+    """The text compared for similarity: wording plus options in sorted order, case, spacing and punctuation folded"""
+    parts = [question.get('question_text', '')] + sorted(str(option) for option in question.get('options', []))
+    text = ' | '.join(unicodedata.normalize('NFKC', part) for part in parts).lower()
+    return _WHITESPACE.sub(' ', _PUNCTUATION.sub(' ', text)).strip()
+
+
+def question_numbers(question: dict) -> tuple:
+    """Numbers in the question wording, in order.
+
+    Questions that differ only in their numbers ('length 5' vs 'length 6')
+    share most shingles but have different answers, so duplicates must
+    agree on these.
+    """
+    return tuple(_NUMBER.findall(unicodedata.normalize('NFKC', question.get('question_text', ''))))
+
+
+def shingle_hashes(text: str, size: int = QUESTION_SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of every `size`-byte window of `text` (the whole text if shorter)"""
+    data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+    if len(data) == 0:
+        return np.empty(0, dtype=np.uint64)
+    size = min(size, len(data))
+    windows = len(data) - size + 1
+    hashes = np.zeros(windows, dtype=np.uint64)
+    for offset in range(size):
+        hashes = hashes * np.uint64(257) + data[offset:offset + windows]
+    # Spread the polynomial hash over all 32 bits before the MinHash permutations
+    hashes = (hashes * _SHINGLE_MIX) % _MERSENNE_PRIME
+    return (hashes ^ (hashes >> np.uint64(29))) & np.uint64(0xFFFFFFFF)
+
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Exact Jaccard similarity of two shingle hash sets"""
+    a, b = np.unique(a), np.unique(b)
+    union = len(np.union1d(a, b))
+    return len(np.intersect1d(a, b, assume_unique=True)) / union if union else 0.0
+
+
+class MinHasher:
+    """Multiply-add-shift hash functions ((a * x + b) mod 2**64) >> 32 shared by every signature in an index.
+
+    Unlike (a * x + b) mod p this needs no division, and numpy's wrapping
+    uint64 arithmetic gives the mod 2**64 for free.
+    """
+
+    def __init__(self, num_perm: int = QUESTION_MINHASH_PERMUTATIONS, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self._a = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        return self.signatures([hashes])[0]
+
+    def signatures(self, hash_lists: list) -> np.ndarray:
+        """One row of `num_perm` minimums per shingle hash array; empty inputs get all-max rows"""
+        result = np.full((len(hash_lists), self.num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+        lengths = np.array([len(hashes) for hashes in hash_lists], dtype=np.int64)
+        rows = np.flatnonzero(lengths)
+
+        buffer = np.empty((self.num_perm, min(_SIGNATURE_CHUNK_SHINGLES, int(lengths.sum()))), dtype=np.uint64)
+        start = 0
+        while start < len(rows):
+            # Take whole rows until the chunk holds enough shingles; a longer row is hashed alone
+            end = start + 1
+            total = lengths[rows[start]]
+            while end < len(rows) and total + lengths[rows[end]] <= _SIGNATURE_CHUNK_SHINGLES:
+                total += lengths[rows[end]]
+                end += 1
+            chunk = rows[start:end]
+            flat = np.concatenate([hash_lists[row] for row in chunk])
+            offsets = np.concatenate(([0], np.cumsum(lengths[chunk])[:-1]))
+            permuted = buffer[:, :len(flat)] if len(flat) <= buffer.shape[1] else np.empty((self.num_perm, len(flat)), dtype=np.uint64)
+            np.multiply(self._a, flat, out=permuted)
+            permuted += self._b
+            permuted >>= np.uint64(32)
+            result[chunk] = np.minimum.reduceat(permuted, offsets, axis=1).T
+            start = end
+        return result
+
+
+def band_hashes(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """FNV-1a style hash of each band of rows, shape (len(signatures), bands)"""
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    banded = signatures[:, :bands * rows].reshape(count, bands, rows).astype(np.uint64)
+    hashes = np.full((count, bands), _FNV_OFFSET, dtype=np.uint64)
+    for row in range(rows):
+        hashes = (hashes ^ banded[:, :, row]) * _FNV_PRIME
+    return hashes
+
+
+class QuestionSimilarityIndex:
+    """MinHash LSH index over questions, keyed by whatever identifies them in the bank.
+
+    Each signature is split into `bands` bands; two questions become
+    candidates when any band matches exactly, so a lookup touches only the
+    buckets its own bands fall in. Candidates are then scored by the fraction
+    of equal MinHash values, an estimate of the Jaccard similarity of their
+    shingle sets. With 128 permutations in 32 bands of 4, pairs at 0.5 are
+    found ~87% of the time and pairs at 0.8 ~100%.
+
+    Buckets are per-band sorted arrays searched with binary search, plus a
+    small dict of recent additions that is merged in once it grows.
+    """
+
+    def __init__(self, num_perm: int = QUESTION_MINHASH_PERMUTATIONS, bands: int = QUESTION_LSH_BANDS, seed: int = 1):
+        if bands < 1 or num_perm < bands:
+            raise ValueError("QUESTION_LSH_BANDS must be between 1 and QUESTION_MINHASH_PERMUTATIONS")
+        self.hasher = MinHasher(num_perm, seed)
+        self.bands = bands
+        self.keys = []
+        self.standard_codes = []
+        self.numbers = []
+        self._positions = {}
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._table_hashes = np.empty((bands, 0), dtype=np.uint64)
+        self._table_positions = np.empty((bands, 0), dtype=np.int32)
+        self._recent = [{} for _ in range(bands)]
+        self._recent_count = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._positions
+
+    def signature(self, question: dict) -> np.ndarray:
+        return self.hasher.signature(shingle_hashes(question_similarity_text(question)))
+
+    def compute_signatures(self, questions: list) -> np.ndarray:
+        """Signatures for many questions at once; safe to run in a worker thread"""
+        return self.hasher.signatures([shingle_hashes(question_similarity_text(q)) for q in questions])
+
+    def add(self, key, question: dict, standard_code: str = None):
+        self.add_signatures([key], self.signature(question)[np.newaxis, :], [standard_code], [question_numbers(question)])
+
+    def add_signatures(self, keys: list, signatures: np.ndarray, standard_codes: list = None, numbers: list = None):
+        """Index precomputed signatures; keys already in the index are skipped.
+
+        `numbers` holds each question's question_numbers(), which duplicate
+        lookups require to match.
+        """
+        standard_codes = standard_codes or [None] * len(keys)
+        numbers = numbers or [None] * len(keys)
+        fresh = [idx for idx, key in enumerate(keys) if key not in self._positions]
+        if not fresh:
+            return
+        first = len(self.keys)
+        for offset, idx in enumerate(fresh):
+            self._positions[keys[idx]] = first + offset
+            self.keys.append(keys[idx])
+            self.standard_codes.append(standard_codes[idx])
+            self.numbers.append(numbers[idx])
+        self._append_signatures(signatures[fresh])
+
+        if self._recent_count + len(fresh) > max(256, self._table_hashes.shape[1] // 8):
+            self._rebuild_tables()
+            return
+        new_hashes = band_hashes(signatures[fresh], self.bands)
+        for offset, row in enumerate(new_hashes):
+            for band, bucket in enumerate(row.tolist()):
+                self._recent[band].setdefault(bucket, []).append(first + offset)
+        self._recent_count += len(fresh)
+
+    def _append_signatures(self, signatures: np.ndarray):
+        used = len(self.keys) - len(signatures)
+        if len(self.keys) > len(self._signatures):
+            grown = np.empty((max(len(self.keys), 2 * len(self._signatures), 64), self.hasher.num_perm), dtype=np.uint32)
+            grown[:used] = self._signatures[:used]
+            self._signatures = grown
+        self._signatures[used:len(self.keys)] = signatures
+
+    def _rebuild_tables(self):
+        hashes = band_hashes(self._signatures[:len(self.keys)], self.bands).T
+        order = np.argsort(hashes, axis=1, kind='stable')
+        self._table_hashes = np.take_along_axis(hashes, order, axis=1)
+        self._table_positions = order.astype(np.int32)
+        self._recent = [{} for _ in range(self.bands)]
+        self._recent_count = 0
+
+    def _candidates(self, signature: np.ndarray) -> np.ndarray:
+        buckets = band_hashes(signature[np.newaxis, :], self.bands)[0]
+        found = []
+        for band, bucket in enumerate(buckets):
+            table = self._table_hashes[band]
+            lo = np.searchsorted(table, bucket, side='left')
+            hi = np.searchsorted(table, bucket, side='right')
+            if hi > lo:
+                found.append(self._table_positions[band, lo:hi])
+            recent = self._recent[band].get(int(bucket))
+            if recent:
+                found.append(np.array(recent, dtype=np.int64))
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def query_signature(self, signature: np.ndarray, threshold: float = QUESTION_SIMILAR_THRESHOLD,
+                        standard_code: str = None, limit: int = 10, numbers: tuple = None) -> list:
+        """[(key, estimated similarity)] most similar first, at or above `threshold`"""
+        candidates = self._candidates(signature)
+        if standard_code is not None or numbers is not None:
+            candidates = np.array([
+                pos for pos in candidates
+                if (standard_code is None or self.standard_codes[pos] == standard_code)
+                and (numbers is None or self.numbers[pos] == numbers)
+            ], dtype=np.int64)
+        if len(candidates) == 0:
+            return []
+        scores = (self._signatures[candidates] == signature).mean(axis=1)
+        keep = scores >= threshold
+        candidates, scores = candidates[keep], scores[keep]
+        order = np.argsort(-scores, kind='stable')[:limit]
+        return [(self.keys[candidates[idx]], float(scores[idx])) for idx in order]
+
+    def query(self, question: dict, threshold: float = QUESTION_SIMILAR_THRESHOLD,
+              standard_code: str = None, limit: int = 10) -> list:
+        return self.query_signature(self.signature(question), threshold, standard_code, limit)
+
+    def find_duplicate_signature(self, signature: np.ndarray, numbers: tuple, standard_code: str = None,
+                                 threshold: float = QUESTION_DUPLICATE_THRESHOLD):
+        """Key of the closest indexed question at or above `threshold` with the same numbers, or None"""
+        matches = self.query_signature(signature, threshold, standard_code, limit=1, numbers=numbers)
+        return matches[0][0] if matches else None
+
+    def find_duplicate(self, question: dict, standard_code: str = None, threshold: float = QUESTION_DUPLICATE_THRESHOLD):
+        return self.find_duplicate_signature(self.signature(question), question_numbers(question), standard_code, threshold)
+
+    def get_stats(self) -> dict:
+        return {
+            "questions": len(self.keys),
+            "permutations": self.hasher.num_perm,
+            "bands": self.bands,
+            "rows_per_band": self.hasher.num_perm // self.bands,
+            "pending_merge": self._recent_count,
+            "memory_bytes": int(self._signatures.nbytes + self._table_hashes.nbytes + self._table_positions.nbytes)
+        }
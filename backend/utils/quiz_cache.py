@@ -0,0 +1,140 @@
+"""In-process cache of published quizzes as students fetch them, answers stripped"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+QUIZ_CACHE_ENABLED = os.environ.get('QUIZ_CACHE_ENABLED', 'true').lower() == 'true'
+QUIZ_CACHE_MAX_ENTRIES = int(os.environ.get('QUIZ_CACHE_MAX_ENTRIES', 256))
+# Bounds how long another worker can serve a quiz after it was edited (edits in this worker invalidate at once)
+QUIZ_CACHE_TTL_SECONDS = int(os.environ.get('QUIZ_CACHE_TTL_SECONDS', 60))
+
+# Question fields that would give away the answer
+ANSWER_FIELDS = ('correct_answer', 'explanation')
+
+
+def student_quiz_payload(quiz: dict) -> dict:
+    """The quiz as a student may see it: every question without its answer"""
+    return {
+        **quiz,
+        'questions': [
+            {key: value for key, value in question.items() if key not in ANSWER_FIELDS}
+            for question in quiz.get('questions', [])
+        ]
+    }
+
+
+def encode_payload(payload: dict) -> bytes:
+    """JSON body the way FastAPI's JSONResponse renders it"""
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode('utf-8')
+
+
+class StudentQuiz:
+    """A cached student payload and its pre-rendered JSON body"""
+    __slots__ = ('payload', 'body', 'expires_at')
+
+    def __init__(self, payload: dict, body: bytes, expires_at: float):
+        self.payload = payload
+        self.body = body
+        self.expires_at = expires_at
+
+
+class QuizCache:
+    """LRU of student-safe quiz payloads with TTL, keyed by quiz id.
+
+    Only published quizzes are kept. Concurrent misses for the same quiz
+    share one Mongo read. `invalidate` drops the entry and detaches any read
+    in flight; a read only stores its result while it is still the quiz's
+    current load, so a read that started before an edit never stores the old
+    quiz. Callers that wrote to a quiz invalidate it after the write.
+    """
+
+    def __init__(self, max_entries: int = QUIZ_CACHE_MAX_ENTRIES, ttl_seconds: int = QUIZ_CACHE_TTL_SECONDS,
+                 enabled: bool = QUIZ_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries = OrderedDict()  # quiz id -> StudentQuiz
+        self._loads = {}  # quiz id -> Task reading it (the only read allowed to store)
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0, 'uncacheable': 0}
+
+    async def get(self, db, quiz_id: str):
+        """The student view of a quiz, or None if it does not exist"""
+        if not self.enabled:
+            quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+            return self._render(quiz) if quiz else None
+
+        entry = self._entries.get(quiz_id)
+        if entry is not None:
+            if entry.expires_at > time.monotonic():
+                self._entries.move_to_end(quiz_id)
+                self.stats['hits'] += 1
+                return entry
+            del self._entries[quiz_id]
+
+        load = self._loads.get(quiz_id)
+        if load is None:
+            self.stats['misses'] += 1
+            load = asyncio.ensure_future(self._load(db, quiz_id))
+            self._loads[quiz_id] = load
+            load.add_done_callback(lambda task: self._finish_load(quiz_id, task))
+        else:
+            self.stats['coalesced'] += 1
+        # Shielded so one cancelled request does not cancel the read the others are waiting on
+        return await asyncio.shield(load)
+
+    async def _load(self, db, quiz_id: str):
+        quiz = await db.quizzes.find_one({"id": quiz_id}, {"_id": 0})
+        if not quiz:
+            return None
+        entry = self._render(quiz)
+        if quiz.get('status') != 'published':
+            self.stats['uncacheable'] += 1  # Drafts can still change without an assignment to warm them
+        elif self._loads.get(quiz_id) is asyncio.current_task():
+            self._entries[quiz_id] = entry
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def _finish_load(self, quiz_id: str, task):
+        if self._loads.get(quiz_id) is task:
+            del self._loads[quiz_id]
+        if not task.cancelled() and task.exception() is not None:
+            logging.warning(f"Quiz cache load for {quiz_id} failed: {str(task.exception())}")
+
+    def _render(self, quiz: dict) -> StudentQuiz:
+        payload = student_quiz_payload(quiz)
+        return StudentQuiz(payload, encode_payload(payload), time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, quiz_id: str):
+        """Forget a quiz after it was edited or deleted"""
+        self.stats['invalidations'] += 1
+        self._entries.pop(quiz_id, None)
+        # A read in flight may have seen the old quiz: it finishes for its callers, but no longer stores
+        self._loads.pop(quiz_id, None)
+
+    async def warm(self, db, quiz_id: str):
+        """Load a quiz fresh, e.g. when it is assigned and a class is about to open it"""
+        self.invalidate(quiz_id)
+        return await self.get(db, quiz_id)
+
+    def get_stats(self) -> dict:
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / lookups, 4) if lookups else 0,
+            'entries': len(self._entries),
+            'loads_in_flight': len(self._loads),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'enabled': self.enabled
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+
+quiz_cache = QuizCache()
@@ -0,0 +1,124 @@
+"""Quiz question generation helpers"""
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+from .llm import send_llm_message
+
+QUIZ_QUESTION_SYSTEM_MESSAGE = "You are an expert education assessment creator. Generate high-quality multiple choice questions aligned with state educational standards."
+
+# Maximum number of standards generated at the same time; the LLM scheduler's
+# per-teacher cap (LLM_PER_USER_CONCURRENCY) still applies on top of this
+QUIZ_GENERATION_CONCURRENCY = int(os.environ.get('QUIZ_GENERATION_CONCURRENCY', 10))
+
+
+def build_question_prompt(standard_code: str, count: int) -> str:
+    """Build the LLM prompt asking for `count` questions on one standard"""
+    return f"""Generate {count} multiple choice questions to assess student understanding of this educational standard:
+
+Standard: {standard_code}
+
+For each question:
+1. Make it grade-appropriate and aligned with the standard
+2. Provide exactly 4 answer options
+3. Indicate which option (0-3) is correct
+4. Ensure distractors are plausible but clearly wrong
+5. Questions should test knowledge, comprehension, or application related to this standard
+
+Return ONLY a JSON array in this exact format:
+[
+  {{
+    "question_text": "question here",
+    "options": ["option 1", "option 2", "option 3", "option 4"],
+    "correct_answer": 0,
+    "skill": "{standard_code}"
+  }}
+]
+
+Return ONLY the JSON array, no other text."""
+
+
+def parse_questions(response_text: str, standard_code: str) -> list:
+    """Pull the JSON array of questions out of a response; [] if there is none"""
+    try:
+        json_start = response_text.find('[')
+        json_end = response_text.rfind(']') + 1
+        if json_start == -1 or json_end <= json_start:
+            return []
+        questions = json.loads(response_text[json_start:json_end])
+        return [
+            {
+                'id': str(uuid.uuid4()),
+                'question_text': q['question_text'],
+                'options': q['options'],
+                'correct_answer': q['correct_answer'],
+                'skill': standard_code
+            }
+            for q in questions
+        ]
+    except Exception as e:
+        logging.error(f"Error parsing questions: {str(e)}")
+        return []
+
+
+async def generate_questions_for_standard(standard_code: str, count: int, session_id: str, user_id: str = None, bypass_cache: bool = False) -> list:
+    response_text = await send_llm_message(
+        session_id=session_id,
+        system_message=QUIZ_QUESTION_SYSTEM_MESSAGE,
+        prompt=build_question_prompt(standard_code, count),
+        bypass_cache=bypass_cache,
+        user_id=user_id,
+        call_site="quiz_questions"
+    )
+    return parse_questions(response_text, standard_code)
+
+
+async def generate_question_lists(standards: list, counts: list, user_id: str, session_prefix: str,
+                                  bypass_cache: bool = False, concurrency: int = None) -> list:
+    """Generate `counts[i]` questions for `standards[i]`, several standards at once.
+
+    At most `concurrency` standards (default QUIZ_GENERATION_CONCURRENCY) are
+    in flight. Each standard gets its own session, so no conversation history
+    carries over between them. Returns one entry per standard, in order: its
+    questions, or the exception its LLM call raised. A response without a
+    parsable JSON array gives an empty list.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency or QUIZ_GENERATION_CONCURRENCY))
+
+    async def run_standard(idx: int, standard_code: str, count: int) -> list:
+        async with semaphore:
+            return await generate_questions_for_standard(
+                standard_code, count, f"{session_prefix}_{idx}_{standard_code}", user_id, bypass_cache
+            )
+
+    results = await asyncio.gather(
+        *(run_standard(idx, standard_code, count) for idx, (standard_code, count) in enumerate(zip(standards, counts))),
+        return_exceptions=True
+    )
+    for standard_code, result in zip(standards, results):
+        if isinstance(result, BaseException):
+            logging.error(f"Error generating questions for {standard_code}: {str(result)}")
+    return results
+
+
+def merge_question_lists(standards: list, results: list):
+    """Flatten generate_question_lists output into (questions, {standard: error})"""
+    questions = []
+    failures = {}
+    for standard_code, result in zip(standards, results):
+        if isinstance(result, BaseException):
+            failures[standard_code] = str(result)
+        else:
+            questions.extend(result)
+    return questions, failures
+
+
+async def generate_questions_for_standards(standards: list, count: int, user_id: str, session_prefix: str,
+                                           bypass_cache: bool = False, concurrency: int = None):
+    """Generate `count` questions per standard concurrently; returns (questions in standard order, failures)"""
+    results = await generate_question_lists(
+        standards, [count] * len(standards), user_id, session_prefix, bypass_cache=bypass_cache, concurrency=concurrency
+    )
+    return merge_question_lists(standards, results)
@@ -0,0 +1,488 @@
+"""Standards registry: canonical standard codes, per-state catalogs and a prefix trie"""
+import asyncio
+import csv
+import io
+import json
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from models.standard import Standard
+
+STANDARDS_CACHE_TTL_SECONDS = int(os.environ.get('STANDARDS_CACHE_TTL_SECONDS', 300))
+STANDARDS_IMPORT_MAX_ROWS = int(os.environ.get('STANDARDS_IMPORT_MAX_ROWS', 20000))
+
+_CODE_DECORATION = re.compile(r'^[\s\-\*•\[\(]+|[\s\*\]\)\.]+$')
+_CODE_SHAPE = re.compile(r'^[\w-]+(?:\.[\w-]+)+$')
+_WHITESPACE = re.compile(r'\s+')
+_GRADE_PREFIX = re.compile(r'^(?:GRADE|GR\.?)\s*')
+
+US_STATE_ABBREVIATIONS = {
+    'ALABAMA': 'AL', 'ALASKA': 'AK', 'ARIZONA': 'AZ', 'ARKANSAS': 'AR', 'CALIFORNIA': 'CA',
+    'COLORADO': 'CO', 'CONNECTICUT': 'CT', 'DELAWARE': 'DE', 'DISTRICT OF COLUMBIA': 'DC', 'FLORIDA': 'FL',
+    'GEORGIA': 'GA', 'HAWAII': 'HI', 'IDAHO': 'ID', 'ILLINOIS': 'IL', 'INDIANA': 'IN',
+    'IOWA': 'IA', 'KANSAS': 'KS', 'KENTUCKY': 'KY', 'LOUISIANA': 'LA', 'MAINE': 'ME',
+    'MARYLAND': 'MD', 'MASSACHUSETTS': 'MA', 'MICHIGAN': 'MI', 'MINNESOTA': 'MN', 'MISSISSIPPI': 'MS',
+    'MISSOURI': 'MO', 'MONTANA': 'MT', 'NEBRASKA': 'NE', 'NEVADA': 'NV', 'NEW HAMPSHIRE': 'NH',
+    'NEW JERSEY': 'NJ', 'NEW MEXICO': 'NM', 'NEW YORK': 'NY', 'NORTH CAROLINA': 'NC', 'NORTH DAKOTA': 'ND',
+    'OHIO': 'OH', 'OKLAHOMA': 'OK', 'OREGON': 'OR', 'PENNSYLVANIA': 'PA', 'RHODE ISLAND': 'RI',
+    'SOUTH CAROLINA': 'SC', 'SOUTH DAKOTA': 'SD', 'TENNESSEE': 'TN', 'TEXAS': 'TX', 'UTAH': 'UT',
+    'VERMONT': 'VT', 'VIRGINIA': 'VA', 'WASHINGTON': 'WA', 'WEST VIRGINIA': 'WV', 'WISCONSIN': 'WI',
+    'WYOMING': 'WY'
+}
+
+
+def canonical_standard_code(code: str) -> str:
+    """Canonical form of a standard code: '**7.g.1**: Area' -> '7.G.1'.
+
+    Only code-shaped text (dot-separated parts, no spaces) is canonicalized;
+    a free-text skill such as 'Main idea' is kept as written, trimmed.
+    """
+    text = unicodedata.normalize('NFKC', code or '')
+    code = _CODE_DECORATION.sub('', text.split(':', 1)[0])
+    if _CODE_SHAPE.match(code):
+        return code.upper()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def canonical_standard_prefix(prefix: str) -> str:
+    """A code or its leading parts, for prefix lookups: ' 7.g' -> '7.G', 'k' -> 'K'"""
+    prefix = _CODE_DECORATION.sub('', unicodedata.normalize('NFKC', prefix or ''))
+    return _WHITESPACE.sub('', prefix).upper()
+
+
+def standard_code_segments(code: str) -> list:
+    """Dot-separated parts of a code or prefix: '7.G.1' -> ['7', 'G', '1']"""
+    return [segment for segment in canonical_standard_prefix(code).split('.') if segment]
+
+
+def standard_code_prefix(code: str, level: int) -> str:
+    """The first `level` segments of a code: ('7.G.1', 2) -> '7.G'; free-text skills are kept whole"""
+    code = canonical_standard_code(code)
+    if not _CODE_SHAPE.match(code):
+        return code
+    return '.'.join(code.split('.')[:level])
+
+
+def standard_code_sort_key(code: str) -> tuple:
+    """Sort numbered segments numerically, so 7.G.2 comes before 7.G.10"""
+    return tuple((0, int(segment), '') if segment.isdigit() else (1, 0, segment) for segment in code.split('.'))
+
+
+def canonical_state(state: str) -> str:
+    """'Mississippi', ' ms ' -> 'MS'; unknown names are kept, uppercased"""
+    state = _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', state or '')).strip().upper()
+    return US_STATE_ABBREVIATIONS.get(state, state)
+
+
+def canonical_grade(grade) -> str:
+    """'Grade 07', '7th' -> '7'; 'Kindergarten' -> 'K'"""
+    grade = _GRADE_PREFIX.sub('', _WHITESPACE.sub(' ', str(grade if grade is not None else '')).strip().upper())
+    if grade in ('K', 'KG', 'KINDERGARTEN'):
+        return 'K'
+    grade = re.sub(r'(?<=\d)(ST|ND|RD|TH)$', '', grade)
+    return grade.lstrip('0') or grade
+
+
+class _TrieNode:
+    __slots__ = ('children', 'count', 'terminal', 'ordered')
+
+    def __init__(self):
+        self.children = {}
+        self.count = 0  # Codes at or below this node
+        self.terminal = False
+        self.ordered = None  # Child segments in code order, built on first listing
+
+    def ordered_children(self) -> list:
+        if self.ordered is None:
+            self.ordered = sorted(self.children, key=standard_code_sort_key)
+        return self.ordered
+
+
+class StandardsTrie:
+    """Prefix tree over the segments of canonical standard codes.
+
+    Every node counts the codes beneath it, so the size of any prefix
+    ('7.G' -> every 7.G.* standard) is found by walking its segments, and
+    listing or grouping a prefix only visits that subtree.
+    """
+
+    def __init__(self, codes=()):
+        self._root = _TrieNode()
+        for code in codes:
+            self.add(code)
+
+    def __len__(self) -> int:
+        return self._root.count
+
+    def __contains__(self, code) -> bool:
+        node = self._node(code)
+        return node is not None and node.terminal
+
+    def add(self, code: str) -> bool:
+        """Insert a code; returns False if it was already present or is empty"""
+        segments = standard_code_segments(code)
+        if not segments or segments in self:
+            return False
+        node = self._root
+        node.count += 1
+        for segment in segments:
+            if segment not in node.children:
+                node.children[segment] = _TrieNode()
+                node.ordered = None
+            node = node.children[segment]
+            node.count += 1
+        node.terminal = True
+        return True
+
+    def _node(self, prefix):
+        segments = prefix if isinstance(prefix, list) else standard_code_segments(prefix)
+        node = self._root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                return None
+        return node
+
+    def count(self, prefix: str = '') -> int:
+        node = self._node(prefix)
+        return node.count if node else 0
+
+    def codes(self, prefix: str = '') -> list:
+        """Every code under `prefix` (including the prefix itself if it is a code), in code order"""
+        segments = standard_code_segments(prefix)
+        node = self._node(segments)
+        found = []
+        if node is not None:
+            self._collect(node, segments, found)
+        return found
+
+    def _collect(self, node: _TrieNode, segments: list, found: list):
+        if node.terminal:
+            found.append('.'.join(segments))
+        for segment in node.ordered_children():
+            self._collect(node.children[segment], segments + [segment], found)
+
+    def group_prefix(self, prefix: str = '') -> str:
+        """Where a prefix's standards first divide into groups.
+
+        Walks down from `prefix` while there is a single branch and no code
+        ends there, so catalog-wide rollups of a 7th grade catalog group by
+        '7.G', '7.RP', ... rather than lumping everything under '7'.
+        """
+        segments = standard_code_segments(prefix)
+        node = self._node(segments)
+        while node is not None and len(node.children) == 1 and not node.terminal:
+            segment, node = next(iter(node.children.items()))
+            segments.append(segment)
+        return '.'.join(segments)
+
+    def groups(self, prefix: str = '') -> list:
+        """[(child prefix, code count)] one level below group_prefix(prefix), in code order"""
+        base = self.group_prefix(prefix)
+        node = self._node(base)
+        if node is None:
+            return []
+        return [
+            (f"{base}.{segment}" if base else segment, node.children[segment].count)
+            for segment in node.ordered_children()
+        ]
+
+
+class StandardsCatalog:
+    """Registry standards for one state: a trie per grade plus each code's entries"""
+
+    def __init__(self, state: str, entries: list):
+        self.state = state
+        self.entries = {}  # code -> {grade: entry}
+        self._grades = {}  # grade -> StandardsTrie
+        self._combined = {}  # frozenset(grades) -> StandardsTrie
+        for entry in entries:
+            self.entries.setdefault(entry['code'], {})[entry['grade']] = entry
+            self._grades.setdefault(entry['grade'], StandardsTrie()).add(entry['code'])
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def grades(self) -> list:
+        return sorted(self._grades, key=standard_code_sort_key)
+
+    def grades_for(self, codes) -> list:
+        """Grades whose catalog contains any of `codes`"""
+        found = set()
+        for code in codes:
+            found.update(self.entries.get(code, {}))
+        return sorted(found, key=standard_code_sort_key)
+
+    def trie(self, grades=None) -> StandardsTrie:
+        """Trie of the given grades' standards (all grades if None)"""
+        key = frozenset(self._grades if grades is None else (canonical_grade(g) for g in grades))
+        if len(key) == 1:
+            return self._grades.get(next(iter(key))) or StandardsTrie()
+        if key not in self._combined:
+            trie = StandardsTrie()
+            for grade in key:
+                for code in (self._grades[grade].codes() if grade in self._grades else []):
+                    trie.add(code)
+            self._combined[key] = trie
+        return self._combined[key]
+
+    def describe(self, code: str, grades=None) -> dict:
+        """Registry entry for a code (the first matching grade), or {}"""
+        by_grade = self.entries.get(code, {})
+        for grade in (grades or sorted(by_grade)):
+            if grade in by_grade:
+                return by_grade[grade]
+        return {}
+
+
+class StandardsRegistry:
+    """In-process cache of per-state catalogs loaded from the `standards` collection.
+
+    Catalogs are reloaded after STANDARDS_CACHE_TTL_SECONDS, and at once in
+    the worker that imported new standards; concurrent misses for a state
+    share one load. Without a state there is no catalog: an empty one is
+    returned rather than every state's standards.
+    """
+
+    def __init__(self, ttl_seconds: int = STANDARDS_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._catalogs = {}  # state -> (loaded_at monotonic, StandardsCatalog)
+        self._loads = {}  # state -> Task loading it
+
+    async def get_catalog(self, db, state: str = None) -> StandardsCatalog:
+        state = canonical_state(state)
+        if not state:
+            return StandardsCatalog('', [])
+        cached = self._catalogs.get(state)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            return cached[1]
+
+        load = self._loads.get(state)
+        if load is None:
+            load = asyncio.ensure_future(self._load(db, state))
+            self._loads[state] = load
+            load.add_done_callback(lambda _: self._loads.pop(state, None))
+        return await asyncio.shield(load)
+
+    async def _load(self, db, state: str) -> StandardsCatalog:
+        entries = await db.standards.find(
+            {"state": state}, {"_id": 0, "code": 1, "grade": 1, "description": 1, "subject": 1}
+        ).to_list(None)
+        catalog = StandardsCatalog(state, entries)
+        self._catalogs[state] = (time.monotonic(), catalog)
+        return catalog
+
+    def invalidate(self, states=None):
+        if states is None:
+            self._catalogs.clear()
+            return
+        for state in states:
+            self._catalogs.pop(canonical_state(state), None)
+
+
+standards_registry = StandardsRegistry()
+
+
+async def ensure_standards_indexes(db):
+    await db.standards.create_index([("state", 1), ("grade", 1), ("code", 1)], unique=True)
+    await db.standards.create_index([("state", 1), ("code", 1)])
+
+
+_COLUMN_ALIASES = {
+    'code': 'code', 'standard': 'code', 'standard_code': 'code', 'id': 'code',
+    'description': 'description', 'text': 'description', 'statement': 'description', 'standard_text': 'description',
+    'grade': 'grade', 'grade_level': 'grade',
+    'state': 'state',
+    'subject': 'subject'
+}
+
+
+def parse_standards_file(content, file_format: str, state: str = None, grade: str = None, subject: str = None):
+    """Rows of a CSV or JSON standards file, as Standard models; returns (standards, errors).
+
+    CSV needs a header row with a `code` column (or `standard`) and may have
+    `description`, `grade`, `state` and `subject`. JSON is a list of objects
+    with the same keys, or {"state", "grade", "subject", "standards": [...]}.
+    `state`, `grade` and `subject` fill in rows that leave them out. Rows
+    repeated in the file keep their last occurrence.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if file_format == 'json':
+        data = json.loads(content)
+        if isinstance(data, dict):
+            state = data.get('state', state)
+            grade = data.get('grade', grade)
+            subject = data.get('subject', subject)
+            data = data.get('standards', [])
+        if not isinstance(data, list):
+            raise ValueError("JSON must be a list of standards or an object with a 'standards' list")
+        rows = data
+    elif file_format == 'csv':
+        rows = list(csv.DictReader(io.StringIO(content)))
+    else:
+        raise ValueError("format must be 'csv' or 'json'")
+
+    if len(rows) > STANDARDS_IMPORT_MAX_ROWS:
+        raise ValueError(f"At most {STANDARDS_IMPORT_MAX_ROWS} standards can be imported at once")
+
+    standards = {}
+    errors = []
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({"row": number, "error": "not an object"})
+            continue
+        fields = {}
+        for key, value in row.items():
+            column = _COLUMN_ALIASES.get(str(key or '').strip().lower())
+            if column and value is not None and str(value).strip():
+                fields[column] = str(value).strip()
+
+        code = canonical_standard_code(fields.get('code', ''))
+        row_state = canonical_state(fields.get('state') or state)
+        row_grade = canonical_grade(fields.get('grade') or grade)
+        if not code:
+            errors.append({"row": number, "error": "missing code"})
+            continue
+        if not row_state or not row_grade:
+            errors.append({"row": number, "error": "missing state or grade"})
+            continue
+        standards[(row_state, row_grade, code)] = Standard(
+            state=row_state,
+            grade=row_grade,
+            code=code,
+            description=fields.get('description', ''),
+            subject=fields.get('subject') or subject
+        )
+    return list(standards.values()), errors
+
+
+async def import_standards(db, standards: list, replace: bool = False) -> dict:
+    """Upsert standards into the registry by (state, grade, code).
+
+    With `replace`, codes missing from the import are removed from each
+    (state, grade) it covers, so re-importing a state's file is a sync.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    inserted = updated = removed = 0
+    if standards:
+        result = await db.standards.bulk_write([
+            UpdateOne(
+                {"state": std.state, "grade": std.grade, "code": std.code},
+                {
+                    "$set": {"description": std.description, "subject": std.subject, "updated_at": now},
+                    "$setOnInsert": {"id": std.id, "created_at": now}
+                },
+                upsert=True
+            )
+            for std in standards
+        ], ordered=False)
+        inserted = result.upserted_count
+        updated = result.modified_count
+
+    scopes = {}
+    for std in standards:
+        scopes.setdefault((std.state, std.grade), []).append(std.code)
+    if replace:
+        for (state, grade), codes in scopes.items():
+            result = await db.standards.delete_many({"state": state, "grade": grade, "code": {"$nin": codes}})
+            removed += result.deleted_count
+
+    standards_registry.invalidate({state for state, _ in scopes})
+    return {
+        "received": len(standards),
+        "inserted": inserted,
+        "updated": updated,
+        "removed": removed,
+        "scopes": [{"state": state, "grade": grade, "count": len(codes)} for (state, grade), codes in sorted(scopes.items())]
+    }
+
+
+def _percentage(part: int, whole: int):
+    return round(part / whole * 100, 1) if whole else None
+
+
+def compute_standards_coverage(assessed_standards: dict, trie: StandardsTrie = None, prefix: str = '') -> dict:
+    """Assessed standards, gaps and per-group rollups against a catalog trie.
+
+    `assessed_standards` maps canonical codes to {'times_assessed',
+    'total_score', 'count'}. Without a catalog (`trie` None or empty) there
+    is nothing to measure gaps against, so `not_assessed` is empty and
+    `coverage_percentage` is None. With `prefix`, only standards under it
+    count ('7.G' -> 7.G.1, 7.G.2, ...).
+    """
+    trie = trie if trie is not None and len(trie) else None
+    prefix = canonical_standard_prefix(prefix)
+    prefix_segments = standard_code_segments(prefix)
+
+    def under_prefix(code):
+        return code.split('.')[:len(prefix_segments)] == prefix_segments
+
+    catalog_codes = trie.codes(prefix) if trie is not None else []
+    catalog_set = set(catalog_codes)
+
+    assessed_list = []
+    for standard, data in assessed_standards.items():
+        if not under_prefix(standard):
+            continue
+        assessed_list.append({
+            'standard': standard,
+            'times_assessed': data['times_assessed'],
+            'average_score': (data['total_score'] / data['count']) if data['count'] > 0 else 0,
+            'in_catalog': standard in catalog_set
+        })
+    assessed_list.sort(key=lambda x: standard_code_sort_key(x['standard']))
+
+    if trie is None:
+        return {
+            'assessed': assessed_list,
+            'assessed_count': len(assessed_list),
+            'not_assessed': [],
+            'not_assessed_count': 0,
+            'coverage_percentage': None,
+            'catalog_count': 0,
+            'rollups': []
+        }
+
+    not_assessed = [code for code in catalog_codes if code not in assessed_standards]
+    covered = len(catalog_codes) - len(not_assessed)
+
+    # Group by the level below the prefix, e.g. 7.G / 7.RP / 7.NS for a 7th grade catalog;
+    # the catalog codes are already in hand, so each is bucketed by its group in one pass
+    groups = trie.groups(prefix)
+    group_depth = len(standard_code_segments(groups[0][0])) if groups else 0
+    assessed_by_group = {}
+    for code in catalog_codes:
+        if code in assessed_standards:
+            group = '.'.join(code.split('.')[:group_depth])
+            assessed_by_group.setdefault(group, []).append(assessed_standards[code])
+
+    rollups = []
+    for group, total in groups:
+        group_assessed = assessed_by_group.get(group, [])
+        score_count = sum(data['count'] for data in group_assessed)
+        rollups.append({
+            'prefix': group,
+            'total': total,
+            'assessed': len(group_assessed),
+            'not_assessed': total - len(group_assessed),
+            'coverage_percentage': _percentage(len(group_assessed), total),
+            'average_score': (sum(data['total_score'] for data in group_assessed) / score_count) if score_count else None
+        })
+
+    return {
+        'assessed': assessed_list,
+        'assessed_count': len(assessed_list),
+        'not_assessed': not_assessed,
+        'not_assessed_count': len(not_assessed),
+        'coverage_percentage': _percentage(covered, len(catalog_codes)),
+        'catalog_count': len(catalog_codes),
+        'rollups': rollups
+    }
@@ -12,6 +12,7 @@ const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const CreateLessonPlan = ({ user }) => {
   const navigate = useNavigate();
   const [loading, setLoading] = useState(false);
+  const [progress, setProgress] = useState(null);
   const [formData, setFormData] = useState({
     textbook: '',
     start_date: '',
@@ -27,7 +28,7 @@ const CreateLessonPlan = ({ user }) => {
     
     try {
       const token = localStorage.getItem('token');
-      const response = await fetch(`${BACKEND_URL}/api/lesson-plans`, {
+      const response = await fetch(`${BACKEND_URL}/api/lesson-plans?background=true`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -38,16 +39,38 @@ const CreateLessonPlan = ({ user }) => {
       
       const data = await response.json();
       
-      if (response.ok) {
-        toast.success('Lesson plan created successfully!');
-        navigate(`/lesson/${data.id}`);
-      } else {
+      if (!response.ok) {
         toast.error(data.detail || 'Failed to create lesson plan');
+        return;
+      }
+      
+      // Generation runs in the background; poll the job until it finishes
+      setProgress({ done: 0, total: data.days_total });
+      while (true) {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        const jobRes = await fetch(`${BACKEND_URL}/api/lesson-plans/jobs/${data.job_id}`, {
+          headers: { 'Authorization': `Bearer ${token}` }
+        });
+        const job = await jobRes.json();
+        
+        if (!jobRes.ok || job.status === 'failed') {
+          toast.error(job.error || job.detail || 'Failed to create lesson plan');
+          return;
+        }
+        
+        setProgress({ done: job.days_completed, total: job.days_total });
+        
+        if (job.status === 'completed') {
+          toast.success('Lesson plan created successfully!');
+          navigate(`/lesson/${job.lesson_plan_id}`);
+          return;
+        }
       }
     } catch (error) {
       toast.error('Error connecting to server');
     } finally {
       setLoading(false);
+      setProgress(null);
     }
   };
 
@@ -165,7 +188,7 @@ const CreateLessonPlan = ({ user }) => {
                   {loading ? (
                     <>
                       <div className="animate-spin rounded-full h-5 w-5 border-b-2 border-white"></div>
-                      Generating Lesson Plan...
+                      {progress ? `Generating Lesson Plan... (${progress.done}/${progress.total} days)` : 'Generating Lesson Plan...'}
                     </>
                   ) : (
                     <>
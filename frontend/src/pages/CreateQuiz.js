@@ -153,7 +153,8 @@ const CreateQuiz = ({ user }) => {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
         },
-        body: JSON.stringify({ standards: [skill], count: 5 })
+        // Skip the response cache so we get new questions, not the ones already shown
+        body: JSON.stringify({ standards: [skill], count: 5, bypass_cache: true })
       });
       
       if (response.ok) {
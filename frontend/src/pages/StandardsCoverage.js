@@ -35,6 +35,9 @@ const StandardsCoverage = ({ user }) => {
     }
   };
 
+  // Without a standards catalog the backend cannot measure gaps, and sends coverage_percentage: null
+  const hasCatalog = coverage?.coverage_percentage != null;
+
   if (loading) {
     return (
       <div className="min-h-screen flex items-center justify-center" style={{ background: 'linear-gradient(135deg, #e0f2fe 0%, #ddd6fe 100%)' }}>
@@ -92,7 +95,7 @@ const StandardsCoverage = ({ user }) => {
             <CardContent className="pt-6">
               <div className="flex items-center justify-between">
                 <div>
-                  <div className="text-3xl font-bold text-red-600">{coverage?.not_assessed_count || 0}</div>
+                  <div className="text-3xl font-bold text-red-600">{hasCatalog ? coverage.not_assessed_count : '—'}</div>
                   <div className="text-sm text-gray-600">Not Yet Assessed</div>
                 </div>
                 <XCircle className="w-10 h-10 text-red-400" />
@@ -104,8 +107,8 @@ const StandardsCoverage = ({ user }) => {
             <CardContent className="pt-6">
               <div className="flex items-center justify-between">
                 <div>
-                  <div className="text-3xl font-bold text-blue-600">{coverage?.coverage_percentage || 0}%</div>
-                  <div className="text-sm text-gray-600">Coverage Rate</div>
+                  <div className="text-3xl font-bold text-blue-600">{hasCatalog ? `${coverage.coverage_percentage}%` : '—'}</div>
+                  <div className="text-sm text-gray-600">{hasCatalog ? 'Coverage Rate' : 'No standards catalog'}</div>
                 </div>
                 <AlertCircle className="w-10 h-10 text-blue-400" />
               </div>
@@ -142,7 +145,11 @@ const StandardsCoverage = ({ user }) => {
             <CardDescription>Standards that haven't been assessed yet</CardDescription>
           </CardHeader>
           <CardContent>
-            {coverage?.not_assessed && coverage.not_assessed.length > 0 ? (
+            {!hasCatalog ? (
+              <div className="text-center py-8 text-gray-500">
+                No standards catalog has been imported, so coverage gaps can't be measured.
+              </div>
+            ) : coverage.not_assessed.length > 0 ? (
               <div className="grid grid-cols-2 md:grid-cols-4 gap-3">
                 {coverage.not_assessed.map((std, idx) => (
                   <div key={idx} className="border rounded-lg p-3 bg-red-50">
@@ -61,13 +61,11 @@ const TakeQuiz = () => {
           const optionsWithIndex = question.options.map((opt, idx) => ({ option: opt, originalIndex: idx }));
           const shuffledOptions = shuffleArray(optionsWithIndex);
           
-          // Find new position of correct answer
-          const newCorrectIndex = shuffledOptions.findIndex(item => item.originalIndex === question.correct_answer);
-          
+          // Answers are graded against the original option order, so keep it for submission
           return {
             ...question,
             options: shuffledOptions.map(item => item.option),
-            correct_answer: newCorrectIndex
+            originalIndices: shuffledOptions.map(item => item.originalIndex)
           };
         });
         
@@ -92,9 +90,9 @@ const TakeQuiz = () => {
 
     setSubmitting(true);
     try {
-      const formattedAnswers = Object.entries(answers).map(([question_id, selected_answer]) => ({
-        question_id,
-        selected_answer: parseInt(selected_answer)
+      const formattedAnswers = quiz.questions.map(question => ({
+        question_id: question.id,
+        selected_answer: question.originalIndices[parseInt(answers[question.id])]
       }));
 
       const response = await fetch(`${BACKEND_URL}/api/submissions`, {
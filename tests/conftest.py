@@ -0,0 +1,11 @@
+"""Backend unit tests: run from the repository root with `python -m pytest tests`"""
+import os
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+# utils.database builds a Motor client on import; it never connects unless queried
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'lesson_plan_tests')
+os.environ.setdefault('LLM_CACHE_ENABLED', 'false')
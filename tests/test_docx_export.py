@@ -0,0 +1,48 @@
+"""DOCX export: the template renderer matches the original document builder and exports are valid"""
+import asyncio
+import zipfile
+
+from docx import Document
+
+from benchmarks.docx_export import make_plan
+from benchmarks.docx_template import legacy_render
+from utils.docx_export import DocxExporter, render_lesson_plan_docx
+
+
+def describe(file) -> list:
+    """Everything a reader of the document sees, paragraph by paragraph (the original's '**' markers aside)"""
+    doc = Document(file)
+    return [
+        (p.style.name, p.text.replace('**', ''), [r.bold for r in p.runs], p.alignment,
+         len(p._p.xpath('.//w:br[@w:type="page"]')))
+        for p in doc.paragraphs
+    ]
+
+
+def test_template_render_matches_original_paragraphs():
+    plan = make_plan(3)
+    plan['daily_plans'][0]['modeling'] = "Step 1\n\tStep 2\r\nStep 3 "
+    plan['daily_plans'][1]['closure'] = ''
+    plan['daily_plans'][2].pop('standards')
+
+    legacy = describe(legacy_render(plan))
+    with render_lesson_plan_docx(plan) as file:
+        current = describe(file)
+    assert len(current) == len(legacy)
+    for index, (old, new) in enumerate(zip(legacy, current)):
+        assert new == old, f"paragraph {index} differs"
+
+
+def test_pooled_exports_are_valid_docx():
+    exporter = DocxExporter(executor='thread', workers=2)
+    try:
+        files = asyncio.run(_render_all(exporter, make_plan(5), 3))
+    finally:
+        exporter.shutdown()
+    for file in files:
+        with file:
+            assert zipfile.is_zipfile(file)
+
+
+async def _render_all(exporter, plan, count):
+    return await asyncio.gather(*(exporter.render(plan) for _ in range(count)))
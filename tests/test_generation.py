@@ -0,0 +1,39 @@
+"""Concurrent generation: lesson plan days and quiz questions come back in request order"""
+import asyncio
+
+import utils.llm as llm
+from models.lesson_plan import LessonPlanCreate
+from utils.helpers import get_weekdays_between
+from utils.lesson_generation import generate_daily_plans
+from utils.llm_providers import FakeLlmProvider
+from utils.llm_scheduler import LlmScheduler
+from utils.quiz_generation import generate_questions_for_standards
+
+
+def use_fake_llm(monkeypatch) -> FakeLlmProvider:
+    provider = FakeLlmProvider(latency='fixed:0.005')
+    monkeypatch.setattr(llm, 'llm_provider', provider)
+    monkeypatch.setattr(llm, 'llm_scheduler', LlmScheduler(max_concurrency=8, per_user_concurrency=8))
+    return provider
+
+
+def test_days_are_generated_once_each_in_date_order(monkeypatch):
+    provider = use_fake_llm(monkeypatch)
+    weekdays = get_weekdays_between("2025-01-06", "2025-01-17")
+    plan_data = LessonPlanCreate(
+        textbook="Life Science", start_date=weekdays[0]['date'], end_date=weekdays[-1]['date'],
+        lesson_range="Chapter 1", next_major_assessment="Chapter 1 Test"
+    )
+
+    daily_plans = asyncio.run(generate_daily_plans(plan_data, weekdays, "teacher", concurrency=4))
+    assert [day.day_date for day in daily_plans] == [day['date'] for day in weekdays]
+    assert provider.stats['calls'] == len(weekdays)
+
+
+def test_questions_are_generated_in_standard_order(monkeypatch):
+    use_fake_llm(monkeypatch)
+    standards = [f"7.L.{idx + 1}" for idx in range(6)]
+
+    questions, failures = asyncio.run(generate_questions_for_standards(standards, 3, "teacher", "quiz_test"))
+    assert not failures
+    assert [q['skill'] for q in questions] == [code for code in standards for _ in range(3)]
@@ -0,0 +1,123 @@
+"""Lesson plan job queue: a job is generated by one process even when several enqueue it"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from mongomock_motor import AsyncMongoMockClient
+
+import utils.jobs as jobs
+from models.lesson_plan import LessonPlanCreate
+
+PLAN = LessonPlanCreate(
+    textbook='Life Science', start_date='2025-01-06', end_date='2025-01-10',
+    lesson_range='Ch 1', next_major_assessment='Test'
+)
+
+
+class Draft:
+    def __init__(self, plan_id):
+        self.id = plan_id
+
+
+def fake_generation(monkeypatch, runs: list, delay: float = 0.02):
+    async def create_draft_plan(db, user_id, plan_data):
+        await db.lesson_plans.insert_one({"id": f"plan-{len(runs)}", "daily_plans": []})
+        return Draft(f"plan-{len(runs)}")
+
+    async def generate_plan_days(db, plan_id, plan_data, weekdays, user_id, on_day_complete=None):
+        runs.append(plan_id)
+        await asyncio.sleep(delay)
+
+    monkeypatch.setattr(jobs, 'create_draft_plan', create_draft_plan)
+    monkeypatch.setattr(jobs, 'generate_plan_days', generate_plan_days)
+
+
+def test_job_enqueued_by_two_processes_runs_once(monkeypatch):
+    runs = []
+    fake_generation(monkeypatch, runs)
+
+    async def run():
+        db = AsyncMongoMockClient()['jobs']
+        first, second = jobs.LessonPlanJobQueue(db), jobs.LessonPlanJobQueue(db)
+        job = await first.submit('teacher1', PLAN, 5)
+        second.queue.put_nowait(job.id)  # e.g. a second worker resuming it at start-up
+        await second.start()
+        await first.start()
+        await asyncio.gather(first.queue.join(), second.queue.join())
+        stored = await db.lesson_plan_jobs.find_one({"id": job.id})
+        await first.stop()
+        await second.stop()
+        return stored
+
+    stored = asyncio.run(run())
+    assert len(runs) == 1
+    assert stored['status'] == 'completed'
+
+
+def test_running_job_is_resumed_only_after_its_lease_expires(monkeypatch):
+    runs = []
+    fake_generation(monkeypatch, runs, delay=0)
+
+    async def run():
+        db = AsyncMongoMockClient()['jobs']
+        now = datetime.now(timezone.utc)
+        await db.lesson_plan_jobs.insert_many([
+            {"id": "held", "user_id": "t", "request": PLAN.model_dump(), "status": "running",
+             "owner": "other", "lease_until": now + timedelta(minutes=5), "created_at": "1"},
+            {"id": "expired", "user_id": "t", "request": PLAN.model_dump(), "status": "running",
+             "owner": "other", "lease_until": now - timedelta(seconds=1), "created_at": "2"},
+        ])
+        queue = jobs.LessonPlanJobQueue(db)
+        await queue.start()
+        await queue.queue.join()
+        await queue.stop()
+        return {job['id']: job for job in await db.lesson_plan_jobs.find({}).to_list(None)}
+
+    stored = asyncio.run(run())
+    assert runs == ['plan-0']
+    assert stored['expired']['status'] == 'completed'
+    assert stored['held']['status'] == 'running' and stored['held']['owner'] == 'other'
+
+
+def test_lost_lease_stops_generation(monkeypatch):
+    runs = []
+    fake_generation(monkeypatch, runs, delay=1)
+
+    async def run():
+        db = AsyncMongoMockClient()['jobs']
+        queue = jobs.LessonPlanJobQueue(db, lease_seconds=0.06)
+        job = await queue.submit('teacher1', PLAN, 5)
+        await queue.start()
+        await asyncio.sleep(0.01)
+        await db.lesson_plan_jobs.update_one({"id": job.id}, {"$set": {"owner": "other"}})  # taken over
+        await asyncio.wait_for(queue.queue.join(), 0.5)
+        stored = await db.lesson_plan_jobs.find_one({"id": job.id})
+        await queue.stop()
+        return stored
+
+    stored = asyncio.run(run())
+    assert stored['status'] == 'running' and stored['owner'] == 'other'
+
+
+def test_jobs_beyond_the_queue_size_are_picked_up_without_a_restart(monkeypatch):
+    runs = []
+    fake_generation(monkeypatch, runs, delay=0)
+
+    async def run():
+        db = AsyncMongoMockClient()['jobs']
+        await db.lesson_plan_jobs.insert_many([
+            {"id": f"job-{n}", "user_id": "t", "request": PLAN.model_dump(), "status": "queued", "created_at": str(n)}
+            for n in range(5)
+        ])
+        queue = jobs.LessonPlanJobQueue(db, workers=1, maxsize=2, poll_seconds=60)
+        await queue.start()
+        for _ in range(100):
+            if await db.lesson_plan_jobs.count_documents({"status": "completed"}) == 5:
+                break
+            await asyncio.sleep(0.01)
+        stored = await db.lesson_plan_jobs.find({}).to_list(None)
+        await queue.stop()
+        return stored
+
+    stored = asyncio.run(run())
+    assert len(runs) == 5
+    assert all(job['status'] == 'completed' for job in stored)
@@ -0,0 +1,29 @@
+"""Section parser: recorded corpus responses and random responses parse as the original parser did"""
+import json
+import random
+
+import pytest
+
+from benchmarks.section_parser import (
+    CORPUS_DIR, EXPECTED_FILE, legacy_parse_lesson_plan_response, load_corpus, random_response
+)
+from utils.lesson_parser import parse_lesson_plan_response
+
+EXPECTED = json.loads(EXPECTED_FILE.read_text())
+
+
+@pytest.mark.parametrize('name', sorted(path.name for path in CORPUS_DIR.glob('*.md')))
+def test_corpus_response_parses_to_recorded_sections(name):
+    assert parse_lesson_plan_response(load_corpus()[name]) == EXPECTED[name]
+
+
+def test_random_responses_parse_like_the_original_parser():
+    rng = random.Random(1234)
+    for _ in range(300):
+        text = random_response(rng, rng.randint(1, 80))
+        assert parse_lesson_plan_response(text) == legacy_parse_lesson_plan_response(text), text
+
+
+def test_unstructured_response_goes_to_teaching_lesson():
+    text = "Just a paragraph of notes with no headers at all."
+    assert parse_lesson_plan_response(text)['teaching_lesson'] == text
@@ -0,0 +1,35 @@
+"""LLM client manager: settings resolved once per model, a fresh chat per call"""
+import sys
+import types
+
+from utils.llm_client import LlmClientManager
+
+
+class RecordingChat:
+    def __init__(self, api_key=None, session_id=None, system_message=None):
+        self.api_key = api_key
+        self.session_id = session_id
+        self.model = None
+
+    def with_model(self, provider, model):
+        self.model = (provider, model)
+        return self
+
+
+def test_chats_are_built_per_call_from_cached_settings(monkeypatch):
+    chat_module = types.ModuleType('emergentintegrations.llm.chat')
+    chat_module.LlmChat = RecordingChat
+    monkeypatch.setitem(sys.modules, 'emergentintegrations', types.ModuleType('emergentintegrations'))
+    monkeypatch.setitem(sys.modules, 'emergentintegrations.llm', types.ModuleType('emergentintegrations.llm'))
+    monkeypatch.setitem(sys.modules, 'emergentintegrations.llm.chat', chat_module)
+
+    manager = LlmClientManager(api_key='key')
+    first = manager.get_chat('s1', 'system', 'anthropic', 'claude')
+    second = manager.get_chat('s2', 'system', 'anthropic', 'claude')
+
+    assert first is not second
+    assert (first.session_id, second.session_id) == ('s1', 's2')
+    assert first.model == second.model == ('anthropic', 'claude')
+    assert first.api_key == 'key'
+    assert manager.model_config('anthropic', 'claude') is manager.model_config('anthropic', 'claude')
+    assert manager.get_stats() == {'chats_created': 2, 'models': ['anthropic/claude']}
@@ -0,0 +1,69 @@
+"""LLM call policy: deadlines, retries, give-up, hedging and backoff against a scripted provider"""
+import asyncio
+import time
+
+import pytest
+
+from utils.llm_resilience import LlmCallPolicy, LlmCallTimeout, call_with_policy
+
+FAST = dict(base_delay=0.001, max_delay=0.01)
+
+
+class ScriptedProvider:
+    """Answers after `latency`, or per call as scripted by (delay, fail) pairs"""
+
+    def __init__(self, latency: float, script=(), always_fail: bool = False):
+        self.latency = latency
+        self.script = list(script)
+        self.always_fail = always_fail
+        self.calls = 0
+
+    async def send(self):
+        self.calls += 1
+        delay, fail = self.script.pop(0) if self.script else (self.latency, self.always_fail)
+        await asyncio.sleep(delay)
+        if fail:
+            raise ConnectionError("injected provider failure")
+        return "ok"
+
+
+def test_call_past_its_deadline_is_abandoned_and_retried():
+    provider = ScriptedProvider(0.01, script=[(1.0, False)])
+    start = time.perf_counter()
+    result = asyncio.run(call_with_policy(provider.send, LlmCallPolicy(timeout=0.05, max_retries=1, **FAST)))
+    assert result == "ok"
+    assert provider.calls == 2
+    assert time.perf_counter() - start < 0.5
+
+
+def test_transient_failures_are_retried():
+    provider = ScriptedProvider(0.001, script=[(0.001, True), (0.001, True)])
+    assert asyncio.run(call_with_policy(provider.send, LlmCallPolicy(timeout=1, max_retries=2, **FAST))) == "ok"
+    assert provider.calls == 3
+
+
+def test_retries_are_bounded_and_the_last_error_is_raised():
+    provider = ScriptedProvider(0.001, always_fail=True)
+    with pytest.raises(ConnectionError):
+        asyncio.run(call_with_policy(provider.send, LlmCallPolicy(timeout=1, max_retries=2, **FAST)))
+    assert provider.calls == 3
+
+
+def test_slow_call_without_retries_times_out():
+    provider = ScriptedProvider(1.0)
+    with pytest.raises(LlmCallTimeout):
+        asyncio.run(call_with_policy(provider.send, LlmCallPolicy(timeout=0.01, max_retries=0, **FAST)))
+
+
+def test_hedge_wins_against_a_slow_first_attempt():
+    provider = ScriptedProvider(0.01, script=[(1.0, False)])
+    start = time.perf_counter()
+    result = asyncio.run(call_with_policy(provider.send, LlmCallPolicy(timeout=5, max_retries=0), hedge_delay=0.02))
+    assert result == "ok"
+    assert provider.calls == 2
+    assert time.perf_counter() - start < 0.2
+
+
+def test_backoff_is_jittered_within_its_cap():
+    policy = LlmCallPolicy(base_delay=1, max_delay=5)
+    assert all(0 <= policy.backoff(n) <= min(5, 2 ** n) for n in range(6) for _ in range(50))
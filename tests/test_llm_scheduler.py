@@ -0,0 +1,27 @@
+"""LLM scheduler: a small request is not stuck behind another teacher's large one"""
+import asyncio
+
+from utils.llm_scheduler import LlmScheduler
+
+
+def test_small_request_finishes_before_large_one_and_slots_drain():
+    scheduler = LlmScheduler(max_concurrency=2, per_user_concurrency=2)
+    finished = []
+
+    async def teacher(user_id: str, calls: int, delay: float):
+        await asyncio.sleep(delay)
+
+        async def call():
+            async with scheduler.slot(user_id):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(call() for _ in range(calls)))
+        finished.append(user_id)
+
+    async def run():
+        await asyncio.gather(teacher('teacher_a', 20, 0), teacher('teacher_b', 3, 0.001))
+
+    asyncio.run(run())
+    assert finished == ['teacher_b', 'teacher_a']
+    stats = scheduler.get_stats()
+    assert stats['in_flight'] == 0 and stats['queue_depth'] == 0
@@ -0,0 +1,74 @@
+"""Stored plan extractions: status changes keep them current without touching plans that have none"""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+from pymongo.errors import WriteError
+
+import utils.plan_extraction as plan_extraction
+
+PLAN = {
+    'version': 2,
+    'daily_plans': [{
+        'day_date': '2025-01-06',
+        'objective': 'Students will be able to identify the parts of a cell.',
+        'standards': '[7.L.1.1]'
+    }]
+}
+
+
+class LessonPlans:
+    """mongomock collection that rejects $inc under a null parent the way MongoDB does
+    (mongomock skips the field silently)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    async def update_one(self, query, update, **kwargs):
+        for field in update.get('$inc', {}):
+            parent = field.split('.')[0]
+            if '.' in field and await self.collection.find_one({"$and": [query, {parent: {"$exists": True, "$in": [None]}}]}):
+                raise WriteError(f"Cannot create field '{field.split('.', 1)[1]}' in element {{{parent}: null}}")
+        return await self.collection.update_one(query, update, **kwargs)
+
+
+class FakeDb:
+    def __init__(self):
+        self.lesson_plans = LessonPlans(AsyncMongoMockClient()['plans'].lesson_plans)
+
+
+def submit(db, plan_id):
+    asyncio.run(plan_extraction.update_plan_status(db, plan_id, {'submission_status': 'pending'}))
+    return asyncio.run(db.lesson_plans.find_one({'id': plan_id}, {'_id': 0}))
+
+
+def test_submitting_a_plan_whose_extraction_is_null():
+    db = FakeDb()
+    asyncio.run(db.lesson_plans.insert_one({**PLAN, 'id': 'draft', 'extracted': None}))
+
+    plan = submit(db, 'draft')
+    assert plan['submission_status'] == 'pending'
+    assert plan['version'] == 3
+    assert plan['extracted'] is None
+
+
+def test_submitting_a_plan_without_an_extraction_does_not_invent_one():
+    db = FakeDb()
+    asyncio.run(db.lesson_plans.insert_one({**PLAN, 'id': 'legacy'}))
+
+    plan = submit(db, 'legacy')
+    assert plan['version'] == 3
+    assert 'extracted' not in plan
+
+
+def test_submitting_keeps_a_stored_extraction_current():
+    db = FakeDb()
+    asyncio.run(db.lesson_plans.insert_one({**PLAN, 'id': 'extracted'}))
+    asyncio.run(plan_extraction.refresh_plan_extraction(db, 'extracted'))
+
+    plan = submit(db, 'extracted')
+    assert plan['version'] == 3
+    assert plan_extraction.is_extraction_current(plan)
+    assert plan['extracted']['standards'] == ['7.L.1.1']
@@ -0,0 +1,85 @@
+"""Question bank lookups: similar questions come from the standard they were asked for"""
+import asyncio
+
+import utils.question_bank as question_bank
+
+QUESTION = {
+    'question_text': 'A map uses a scale of 1 inch to 20 miles. How far apart are two towns 3 inches apart on the map?',
+    'options': ['20 miles', '40 miles', '60 miles', '80 miles']
+}
+
+
+def matches(entry: dict, query: dict) -> bool:
+    for field, condition in query.items():
+        if field == '$or':
+            if not any(matches(entry, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = entry.get(field)
+            if '$gte' in condition and not value >= condition['$gte']:
+                return False
+            if '$in' in condition and value not in condition['$in']:
+                return False
+        elif entry.get(field) != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    """Motor cursor stand-in: to_list(length) returns at most `length` documents, as Motor's does"""
+
+    def __init__(self, entries: list):
+        self.entries = entries
+
+    def sort(self, field, direction=1):
+        self.entries = sorted(self.entries, key=lambda entry: entry[field], reverse=direction < 0)
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for entry in self.entries:
+            yield entry
+
+    async def to_list(self, length):
+        return self.entries[:length] if length else self.entries
+
+
+class FakeQuestionBank:
+    """question_bank collection stand-in, in insertion order like an unindexed Mongo scan"""
+
+    def __init__(self, entries: list):
+        self.entries = entries
+
+    def find(self, query: dict, projection: dict = None):
+        return FakeCursor([dict(entry) for entry in self.entries if matches(entry, query)])
+
+
+class FakeDb:
+    def __init__(self, entries: list):
+        self.question_bank = FakeQuestionBank(entries)
+
+
+def bank_entry(standard_code: str, created_at: str) -> dict:
+    return {
+        **QUESTION,
+        'standard_code': standard_code,
+        'fingerprint': question_bank.question_fingerprint(QUESTION),
+        'created_at': created_at,
+        'quiz_count': 0,
+        'times_served': 0
+    }
+
+
+def test_similar_questions_are_not_crowded_out_by_other_standards(monkeypatch):
+    monkeypatch.setattr(question_bank, 'question_bank_similarity', question_bank.QuestionBankSimilarity())
+    # The same question banked under other standards first, so a fingerprint-only lookup finds those
+    db = FakeDb([bank_entry(f"6.RP.{n}", f"2025-01-0{n}") for n in range(1, 6)] + [bank_entry('7.G.1', '2025-01-09')])
+
+    similar = asyncio.run(question_bank.find_similar_questions(db, QUESTION, standard_code='7.g.1'))
+    assert [entry['standard_code'] for entry in similar] == ['7.G.1']
+    assert similar[0]['similarity'] == 1.0
@@ -0,0 +1,112 @@
+"""Student quiz cache: answers stripped, coalesced misses, invalidation during a read"""
+import asyncio
+
+from utils.quiz_cache import QuizCache
+
+
+class FakeQuizzes:
+    """quizzes collection whose reads snapshot the document, then wait `delays[n]` seconds"""
+
+    def __init__(self, doc: dict, delays=()):
+        self.doc = doc
+        self.delays = list(delays)
+        self.reads = 0
+
+    async def find_one(self, query, projection=None):
+        delay = self.delays[self.reads] if self.reads < len(self.delays) else 0
+        self.reads += 1
+        snapshot = {**self.doc, 'questions': [dict(q) for q in self.doc['questions']]}
+        await asyncio.sleep(delay)
+        return snapshot if query.get('id') == self.doc['id'] else None
+
+
+class FakeDb:
+    def __init__(self, quizzes: FakeQuizzes):
+        self.quizzes = quizzes
+
+
+def make_quiz(title: str = 'old', status: str = 'published') -> dict:
+    return {
+        'id': 'quiz-1', 'title': title, 'status': status,
+        'questions': [{'id': 'q1', 'question_text': '2 + 2?', 'options': ['3', '4'], 'correct_answer': 1, 'skill': '1.OA.1'}]
+    }
+
+
+def test_payload_has_no_answers():
+    async def run():
+        cache = QuizCache()
+        entry = await cache.get(FakeDb(FakeQuizzes(make_quiz())), 'quiz-1')
+        assert 'correct_answer' not in entry.payload['questions'][0]
+        assert b'correct_answer' not in entry.body
+        assert entry.payload['questions'][0]['options'] == ['3', '4']
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_read():
+    async def run():
+        cache = QuizCache()
+        db = FakeDb(FakeQuizzes(make_quiz(), delays=[0.02]))
+        entries = await asyncio.gather(*[cache.get(db, 'quiz-1') for _ in range(50)])
+        assert db.quizzes.reads == 1
+        assert all(entry is entries[0] for entry in entries)
+        assert cache.get_stats()['coalesced'] == 49
+
+    asyncio.run(run())
+
+
+def test_drafts_are_not_cached():
+    async def run():
+        cache = QuizCache()
+        db = FakeDb(FakeQuizzes(make_quiz(status='draft')))
+        await cache.get(db, 'quiz-1')
+        await cache.get(db, 'quiz-1')
+        assert db.quizzes.reads == 2
+
+    asyncio.run(run())
+
+
+def test_invalidate_drops_entry():
+    async def run():
+        cache = QuizCache()
+        db = FakeDb(FakeQuizzes(make_quiz()))
+        await cache.get(db, 'quiz-1')
+        db.quizzes.doc['title'] = 'new'
+        cache.invalidate('quiz-1')
+        assert (await cache.get(db, 'quiz-1')).payload['title'] == 'new'
+
+    asyncio.run(run())
+
+
+def test_read_started_before_edit_never_stores_old_quiz():
+    """Slow read A sees the old quiz; an edit invalidates; fast read B finishes before A"""
+    async def run():
+        cache = QuizCache()
+        db = FakeDb(FakeQuizzes(make_quiz(), delays=[0.05, 0]))
+        load_a = asyncio.ensure_future(cache.get(db, 'quiz-1'))
+        await asyncio.sleep(0.01)  # A has read the old document and is waiting
+
+        db.quizzes.doc['title'] = 'new'
+        cache.invalidate('quiz-1')
+        assert (await cache.get(db, 'quiz-1')).payload['title'] == 'new'  # B
+
+        assert (await load_a).payload['title'] == 'old'  # A still answers its own callers...
+        assert cache._entries['quiz-1'].payload['title'] == 'new'  # ...but did not store
+        assert (await cache.get(db, 'quiz-1')).payload['title'] == 'new'
+        assert db.quizzes.reads == 2
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_does_not_cancel_shared_read():
+    async def run():
+        cache = QuizCache()
+        db = FakeDb(FakeQuizzes(make_quiz(), delays=[0.02]))
+        first = asyncio.ensure_future(cache.get(db, 'quiz-1'))
+        second = asyncio.ensure_future(cache.get(db, 'quiz-1'))
+        await asyncio.sleep(0.005)
+        first.cancel()
+        assert (await second).payload['title'] == 'old'
+        assert db.quizzes.reads == 1
+
+    asyncio.run(run())
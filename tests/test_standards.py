@@ -0,0 +1,78 @@
+"""Standards registry: canonical codes, prefix lookups, catalogs and coverage rollups"""
+import asyncio
+import random
+
+from benchmarks.standards_registry import make_catalog, messy, scan_coverage
+from utils.standards import (
+    StandardsCatalog, StandardsRegistry, canonical_standard_code, canonical_standard_prefix,
+    compute_standards_coverage, standard_code_prefix
+)
+
+
+class FakeStandards:
+    def __init__(self):
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        return self
+
+    async def to_list(self, length):
+        return [{'code': '7.G.1', 'grade': '7', 'description': 'Scale drawings'}]
+
+
+class FakeDb:
+    def __init__(self):
+        self.standards = FakeStandards()
+
+
+def test_code_shaped_skills_are_canonicalized():
+    assert canonical_standard_code('**7.g.1**: Area') == '7.G.1'
+    assert canonical_standard_code('[RL.7.1] ') == 'RL.7.1'
+    assert canonical_standard_code(' ccss.math.content.7.g.a.1') == 'CCSS.MATH.CONTENT.7.G.A.1'
+
+
+def test_free_text_skills_keep_their_display_text():
+    assert canonical_standard_code('Main idea') == 'Main idea'
+    assert canonical_standard_code('  Main   idea ') == 'Main idea'
+    assert canonical_standard_code('Fractions') == 'Fractions'
+    assert canonical_standard_code(None) == ''
+    assert standard_code_prefix('Main idea', 2) == 'Main idea'
+    assert standard_code_prefix('7.g.1', 2) == '7.G'
+
+
+def test_prefixes_are_canonicalized_without_a_dot():
+    assert canonical_standard_prefix(' k ') == 'K'
+    assert canonical_standard_prefix('7.g') == '7.G'
+
+
+def test_catalog_without_state_is_empty_and_not_loaded():
+    registry = StandardsRegistry()
+    db = FakeDb()
+    for state in (None, '', '  '):
+        catalog = asyncio.run(registry.get_catalog(db, state))
+        assert len(catalog) == 0
+    assert db.standards.queries == []
+
+    catalog = asyncio.run(registry.get_catalog(db, 'Mississippi'))
+    assert len(catalog) == 1
+    assert db.standards.queries == [{'state': 'MS'}]
+
+
+def test_coverage_from_trie_matches_a_catalog_scan():
+    rng = random.Random(7)
+    catalog = StandardsCatalog('MS', make_catalog(rng, 8, 4, 12))
+    grade_codes = catalog.trie(['7']).codes()
+    assessed = {}
+    for code in rng.sample(grade_codes, len(grade_codes) // 3):
+        skill = canonical_standard_code(messy(rng, code))
+        assert skill == code
+        assessed[skill] = {'times_assessed': 1, 'total_score': 75, 'count': 1}
+
+    trie = catalog.trie(['7'])
+    for prefix in ('7', '7.G'):
+        coverage = compute_standards_coverage(assessed, trie, prefix)
+        scanned = scan_coverage(assessed, trie.codes(), prefix)
+        assert coverage['not_assessed_count'] == scanned['not_assessed']
+        assert coverage['catalog_count'] == scanned['catalog_count']
+        assert [(r['prefix'], r['total'], r['assessed']) for r in coverage['rollups']] == scanned['rollups']